@@ -6,6 +6,8 @@ import json
 import subprocess
 import sys
 
+from sync_jobs import get_sync_manager, handle_google_notification
+
 class SyncHandler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         """CORS preflight"""
@@ -15,52 +17,44 @@ class SyncHandler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
     
+    def send_json(self, status, data):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+    
+    def read_json_body(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length <= 0:
+            return {}
+        body = self.rfile.read(content_length)
+        try:
+            data = json.loads(body.decode('utf-8'))
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    
     def do_POST(self):
         """동기화 또는 Watch 재설정"""
         if self.path == '/sync':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            # 동기화는 백그라운드 worker 에서 실행, job id 바로 반환
+            data = self.read_json_body()
+            job = get_sync_manager().submit(data.get('rooms'), full=bool(data.get('full')))
             
-            try:
-                # 요청 body에서 선택된 연습실 확인
-                content_length = int(self.headers.get('Content-Length', 0))
-                selected_rooms = None
-                
-                if content_length > 0:
-                    body = self.rfile.read(content_length)
-                    try:
-                        data = json.loads(body.decode('utf-8'))
-                        selected_rooms = data.get('rooms')  # ['a', 'b', 'c']
-                    except:
-                        pass
-                
-                # Python 스크립트 실행
-                cmd = [sys.executable, 'sync_calendar.py']
-                if selected_rooms:
-                    cmd.extend(selected_rooms)  # 선택된 연습실을 인자로 전달
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=300
-                )
-                
-                response = {
-                    'success': result.returncode == 0,
-                    'output': result.stdout,
-                    'error': result.stderr
-                }
-                
-            except Exception as e:
-                response = {
-                    'success': False,
-                    'error': str(e)
-                }
+            if data.get('wait'):
+                job.done.wait(timeout=300)
+                self.send_json(200, job.to_dict())
+            else:
+                self.send_json(202, dict(job.to_dict(), success=True))
             
-            self.wfile.write(json.dumps(response).encode())
+        elif self.path == '/google-webhook':
+            # Google Calendar push 알림 → 해당 연습실만 모아서 증분 동기화
+            response = handle_google_notification(
+                self.headers.get('X-Goog-Channel-Token'),
+                self.headers.get('X-Goog-Resource-State'),
+            )
+            self.send_json(200, response)
             
         elif self.path == '/setup-watches':
             self.send_response(200)
@@ -94,20 +88,28 @@ class SyncHandler(BaseHTTPRequestHandler):
             self.send_error(404)
     
     def do_GET(self):
-        """헬스 체크"""
+        """헬스 체크 / 동기화 진행 상황"""
         if self.path == '/health':
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             self.wfile.write(json.dumps({'status': 'ok'}).encode())
+        elif self.path.startswith('/sync/'):
+            job = get_sync_manager().get(self.path[len('/sync/'):])
+            if job is None:
+                self.send_json(404, {'success': False, 'error': 'job not found'})
+            else:
+                self.send_json(200, job.to_dict())
         else:
             self.send_error(404)
 
 if __name__ == '__main__':
     server = HTTPServer(('0.0.0.0', 8000), SyncHandler)
     print('🚀 API 서버 시작: http://0.0.0.0:8000')
-    print('   POST /sync - 동기화 실행')
+    print('   POST /sync - 동기화 시작 (job id 반환)')
+    print('   GET /sync/<job_id> - 동기화 진행 상황')
+    print('   POST /google-webhook - Google push 알림 (연습실별 증분 동기화)')
     print('   POST /setup-watches - Watch 채널 재설정')
     print('   GET /health - 상태 확인')
     server.serve_forever()
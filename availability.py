@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+연습실 빈 시간 조회 (GET /api/availability)
+
+연습실별로 겹치거나 맞닿은 예약을 병합한 바쁜 구간(시작/끝 정렬 배열)을 메모리에 들고 있다가,
+요청 범위 안의 빈 구간 중 min_duration 이상인 것만 잘라 가격 견적과 함께 돌려준다.
+- 처음 조회할 때 예약 스냅샷(event_snapshot, 없으면 booking_events)에서 한 번 채우고, 이후에는
+  sync_calendar 변경 알림(write_changes)으로 바뀐 예약 주변 구간만 다시 병합
+- 종일 이벤트(날짜만 있는 경우)는 주간 화면과 마찬가지로 예약으로 보지 않음
+- RECURRENCE_EXPANSION=local 이면 반복 예약은 조회할 때 그 범위 회차만 펼쳐 바쁜 구간에 합침
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+
+import price_engine
+import recurrence
+import sync_calendar
+from price_policy import get_price_policy_service
+from week_index import KST, kst_iso
+
+AVAILABILITY_COLUMNS = 'google_event_id,room_id,start_time,end_time'
+
+# min_duration 을 안 주면 1시간
+DEFAULT_MIN_DURATION = 3600
+# 한 번에 조회할 수 있는 최대 범위
+MAX_RANGE_DAYS = 93
+
+
+def parse_time(value, end=False):
+    """ISO 시간/날짜 → epoch 초. 날짜만 오면 KST 0시 (end=True 면 그날 끝 = 다음날 0시)"""
+    if len(value) == 10:
+        day = date.fromisoformat(value) + timedelta(days=1 if end else 0)
+        return int(datetime(day.year, day.month, day.day, tzinfo=KST).timestamp())
+    return price_engine.to_epoch(value)
+
+
+def parse_duration(value):
+    """분 단위 숫자 ('90') 또는 'HH:MM' → 초"""
+    if not value:
+        return DEFAULT_MIN_DURATION
+    if ':' in value:
+        hours, minutes = value.split(':', 1)
+        seconds = (int(hours) * 60 + int(minutes)) * 60
+    else:
+        seconds = int(float(value) * 60)
+    if seconds <= 0:
+        raise ValueError(f'min_duration 은 0보다 커야 합니다: {value!r}')
+    return seconds
+
+
+def booking_span(record):
+    """booking_events 레코드 → (start, end) epoch 초, 종일 이벤트는 None"""
+    start_time = record.get('start_time') or ''
+    end_time = record.get('end_time') or ''
+    if 'T' not in start_time:
+        return None
+    start = price_engine.to_epoch(start_time)
+    end = price_engine.to_epoch(end_time) if 'T' in end_time else start
+    return start, end
+
+
+class BusyIntervals:
+    """한 연습실의 바쁜 구간 (겹치거나 맞닿은 예약은 한 구간으로 병합)
+
+    예약 하나가 바뀌면 그 예약의 이전/새 범위에 닿는 병합 구간만 지우고
+    그 범위 안의 예약으로 다시 병합한다. (다른 구간은 그대로)
+    """
+
+    def __init__(self):
+        self.events = {}      # google_event_id → (start, end)
+        self.keys = []        # (start, google_event_id) 정렬
+        self.max_length = 0   # 가장 긴 예약 길이 (겹침 탐색 범위)
+        self.starts = []      # 병합 구간 시작 (정렬)
+        self.ends = []        # 병합 구간 끝 (starts 와 같은 순서)
+
+    def load(self, spans):
+        """{google_event_id: (start, end)} 로 전부 다시 채우기"""
+        self.events = {event_id: span for event_id, span in spans.items() if span[1] > span[0]}
+        self.keys = sorted((start, event_id) for event_id, (start, _) in self.events.items())
+        self.max_length = max((end - start for start, end in self.events.values()), default=0)
+        self.starts, self.ends = [], []
+        for start, end in merge_spans(self.events[event_id] for _, event_id in self.keys):
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def put(self, event_id, span):
+        """예약 추가/교체 (span 이 None 이면 삭제)"""
+        old = self.events.pop(event_id, None)
+        if old is not None:
+            key = (old[0], event_id)
+            i = bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+        if span is not None and span[1] > span[0]:
+            self.events[event_id] = span
+            insort(self.keys, (span[0], event_id))
+            self.max_length = max(self.max_length, span[1] - span[0])
+        else:
+            span = None
+        if old is None and span is None:
+            return
+        changed = [s for s in (old, span) if s is not None]
+        self._remerge(min(s[0] for s in changed), max(s[1] for s in changed))
+
+    def _remerge(self, lo, hi):
+        # [lo, hi] 에 닿는 병합 구간 i..j-1 을 지우고 그 범위 안의 예약으로 다시 병합
+        i = bisect_left(self.ends, lo)
+        j = bisect_right(self.starts, hi)
+        if i < j:
+            lo = min(lo, self.starts[i])
+            hi = max(hi, self.ends[j - 1])
+        k = bisect_left(self.keys, (lo - self.max_length,))
+        spans = []
+        while k < len(self.keys) and self.keys[k][0] <= hi:
+            start, end = self.events[self.keys[k][1]]
+            if end >= lo:
+                spans.append((start, end))
+            k += 1
+        merged = merge_spans(spans)
+        self.starts[i:j] = [start for start, _ in merged]
+        self.ends[i:j] = [end for _, end in merged]
+
+    def free(self, start, end, min_duration, extra=()):
+        """[start, end) 안에서 min_duration 이상 비어 있는 구간 목록 (extra: 더 막을 (start, end) 구간)"""
+        busy = []
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            busy.append((self.starts[i], self.ends[i]))
+            i += 1
+        if extra:
+            busy = merge_spans(sorted(busy + list(extra)))
+        slots = []
+        cursor = start
+        for busy_start, busy_end in busy:
+            if busy_start - cursor >= min_duration:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if end - cursor >= min_duration:
+            slots.append((cursor, end))
+        return slots
+
+
+def merge_spans(spans):
+    """시작 순으로 정렬된 (start, end) → 겹치거나 맞닿은 것끼리 병합"""
+    merged = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def quote(room_id, start, end):
+    """그 시간 예약 가격 (수수료 적용 전 정가), 정책 없으면 None"""
+    policy = get_price_policy_service().policy_for_booking(room_id, start)
+    if policy is None:
+        return None
+    return {
+        'start': kst_iso(start),
+        'end': kst_iso(end),
+        'price': round(price_engine.gross_price(start, end, policy.tariff)),
+        'priceType': price_engine.price_type(start, end),
+    }
+
+
+class AvailabilityIndex:
+    """연습실별 BusyIntervals"""
+
+    def __init__(self, room_ids):
+        self.rooms = {room_id: BusyIntervals() for room_id in room_ids}
+        self.lock = threading.Lock()
+
+    def load(self, rows):
+        """booking_events 전체로 채우기"""
+        spans = {room_id: {} for room_id in self.rooms}
+        for row in rows:
+            room_spans = spans.get(row.get('room_id'))
+            span = booking_span(row)
+            if room_spans is not None and span is not None and row.get('google_event_id'):
+                room_spans[row['google_event_id']] = span
+        self.load_spans(spans)
+
+    def load_spans(self, spans):
+        """{room_id: {google_event_id: (start, end)}} 로 채우기 (event_snapshot 에서 바로 적재)"""
+        with self.lock:
+            for room_id, room in self.rooms.items():
+                room.load(spans.get(room_id, {}))
+
+    def apply(self, room_id, records=(), deleted_ids=()):
+        """동기화 변경분 반영"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        with self.lock:
+            for event_id in deleted_ids:
+                room.put(event_id, None)
+            for record in records:
+                if record.get('google_event_id'):
+                    room.put(record['google_event_id'], booking_span(record))
+
+    def free_slots(self, start, end, min_duration=DEFAULT_MIN_DURATION, room_ids=None):
+        """연습실별 빈 구간 [(start, end), ...]"""
+        if end <= start:
+            raise ValueError('to 는 from 보다 뒤여야 합니다')
+        if end - start > MAX_RANGE_DAYS * price_engine.DAY_SECONDS:
+            raise ValueError(f'조회 범위는 최대 {MAX_RANGE_DAYS}일입니다')
+        recurring = {}
+        for record in recurrence.window_instances(start, end, room_ids):
+            span = booking_span(record)
+            if span is not None:
+                recurring.setdefault(record['room_id'], []).append(span)
+        with self.lock:
+            return {
+                room_id: self.rooms[room_id].free(start, end, min_duration, recurring.get(room_id, ()))
+                for room_id in (room_ids or self.rooms) if room_id in self.rooms
+            }
+
+    def availability(self, start, end, min_duration=DEFAULT_MIN_DURATION, room_ids=None):
+        """API 응답용: 빈 구간마다 길이(분)와 그 구간 시작부터 min_duration 예약 견적"""
+        result = {}
+        for room_id, slots in self.free_slots(start, end, min_duration, room_ids).items():
+            result[room_id] = [{
+                'start': kst_iso(slot_start),
+                'end': kst_iso(slot_end),
+                'minutes': int((slot_end - slot_start) // 60),
+                'quote': quote(room_id, slot_start, slot_start + min_duration),
+            } for slot_start, slot_end in slots]
+        return result
+
+
+def _load():
+    import event_snapshot
+
+    index = AvailabilityIndex([room['id'] for room in sync_calendar.ROOMS])
+    # 모든 연습실 스냅샷이 있으면 Supabase 조회 없이 적재
+    snapshots = event_snapshot.open_snapshots(index.rooms)
+    if snapshots is not None:
+        index.load_spans({room_id: snapshot.spans() for room_id, snapshot in snapshots.items()})
+        for snapshot in snapshots.values():
+            snapshot.close()
+    else:
+        index.load(sync_calendar.fetch_rows('booking_events', {'select': AVAILABILITY_COLUMNS, 'order': 'id'}))
+    return index
+
+
+_live = sync_calendar.LiveIndex(_load, AvailabilityIndex.apply)
+
+
+def get_availability_index():
+    """프로세스 공용 AvailabilityIndex (처음 호출 시 스냅샷/booking_events 에서 채우고 변경 알림 구독)"""
+    return _live.get()
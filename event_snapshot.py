@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+연습실별 예약 스냅샷 (mmap 으로 여는 열 단위 파일)
+
+동기화가 끝날 때마다 연습실별로 <EVENT_SNAPSHOT_DIR>/<room>.snap 을 원자적으로 다시 쓴다.
+예약마다 dict 대신 같은 종류 값끼리 배열로 저장해 두고 mmap + memoryview 로 바로 읽으므로
+서버 재시작 / 가격 재계산 / 분석이 Google, Supabase 없이 전체 이력을 밀리초 단위로 올린다.
+
+파일 구조 (little-endian, 예약은 시작 시각 → id 순):
+  헤더     magic, version, 연습실 코드, 예약 수 n, 제목 수 t, 문자열 blob 크기, meta(JSON) 크기
+  start    int64[n]   시작 epoch 초
+  end      int64[n]   끝 epoch 초
+  updated  int64[n]   Google updated (epoch ms, 없으면 0)
+  id_off   uint32[n+1]  blob 안 google_event_id 위치
+  title_off uint32[t+1] blob 안 제목 위치 (같은 제목은 한 번만 저장)
+  title    uint32[n]  제목 번호
+  flags    uint8[n]   1 = 네이버 예약, 2 = 종일 이벤트
+  blob     utf-8 문자열 (id, 제목)
+  meta     {"room_id", "sync_token", "written_at"}
+
+사용법:
+  python3 event_snapshot.py             # 스냅샷 요약 (네트워크 없음)
+  python3 event_snapshot.py --rebuild   # booking_events 에서 다시 만들기
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+
+import price_engine
+
+EVENT_SNAPSHOT_DIR = os.environ.get(
+    'EVENT_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.event_snapshot')
+)
+
+MAGIC = b'RJSNAP\x00\x01'
+VERSION = 1
+HEADER = struct.Struct('<8sH2sIIII')
+
+FLAG_NAVER = 1
+FLAG_ALL_DAY = 2
+
+SNAPSHOT_COLUMNS = 'google_event_id,room_id,title,description,start_time,end_time,updated_at'
+
+
+def snapshot_path(room_id, directory=None):
+    return os.path.join(directory or EVENT_SNAPSHOT_DIR, f'{room_id}.snap')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def record_to_row(record):
+    """booking_events 레코드 → (google_event_id, start, end, updated_ms, flags, title)"""
+    from sync_calendar import is_naver_booking, parse_timestamp
+
+    start_time = record.get('start_time') or ''
+    end_time = record.get('end_time') or start_time
+    flags = FLAG_NAVER if is_naver_booking(record.get('description')) else 0
+    if 'T' not in start_time:
+        flags |= FLAG_ALL_DAY
+    updated = parse_timestamp(record.get('updated_at'))
+    return (
+        record['google_event_id'],
+        int(price_engine.to_epoch(start_time)) if start_time else 0,
+        int(price_engine.to_epoch(end_time)) if end_time else 0,
+        int(updated.timestamp() * 1000) if updated else 0,
+        flags,
+        record.get('title') or '',
+    )
+
+
+def write_snapshot(room_id, rows, sync_token=None, directory=None):
+    """rows(record_to_row 결과) 로 연습실 스냅샷 파일 쓰기 (임시 파일 → rename)"""
+    rows = sorted(rows, key=lambda row: (row[1], row[0]))
+    n = len(rows)
+    starts = array('q', (row[1] for row in rows))
+    ends = array('q', (row[2] for row in rows))
+    updated = array('q', (row[3] for row in rows))
+    flags = array('B', (row[4] for row in rows))
+
+    blob = bytearray()
+    id_off = array('I', [0]) * (n + 1)
+    for i, row in enumerate(rows):
+        blob += row[0].encode('utf-8')
+        id_off[i + 1] = len(blob)
+
+    titles = {}
+    title_off = array('I', [len(blob)])
+    title_index = array('I', [0]) * n
+    for i, row in enumerate(rows):
+        index = titles.get(row[5])
+        if index is None:
+            index = titles[row[5]] = len(titles)
+            blob += row[5].encode('utf-8')
+            title_off.append(len(blob))
+        title_index[i] = index
+
+    meta = json.dumps({'room_id': room_id, 'sync_token': sync_token, 'written_at': time.time()}).encode()
+    header = HEADER.pack(MAGIC, VERSION, room_id.encode()[:2].ljust(2), n, len(titles), len(blob), len(meta))
+
+    return _write_parts(snapshot_path(room_id, directory),
+                        (header, starts, ends, updated, id_off, title_off, title_index, flags, blob, meta))
+
+
+def _write_parts(path, parts):
+    """각 부분을 8바이트 경계에 맞춰 이어 쓰기 (임시 파일 → rename)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        offset = 0
+        for part in parts:
+            data = part if isinstance(part, (bytes, bytearray, memoryview)) else part.tobytes()
+            padding = _align(offset) - offset
+            f.write(b'\0' * padding)
+            f.write(data)
+            offset += padding + len(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def retoken_snapshot(snapshot, sync_token):
+    """예약은 그대로 두고 meta 의 sync_token 만 바꿔 다시 쓰기 (변경 없는 증분 동기화)"""
+    meta = json.dumps(dict(snapshot.meta, sync_token=sync_token, written_at=time.time())).encode()
+    view = memoryview(snapshot._mmap)
+    try:
+        fields = list(HEADER.unpack_from(view))
+        fields[-1] = len(meta)
+        return _write_parts(snapshot.path, (HEADER.pack(*fields) + view[HEADER.size:snapshot.meta_offset], meta))
+    finally:
+        view.release()
+
+
+class EventRecord:
+    """스냅샷 안 예약 하나 (값은 접근할 때 배열에서 읽음)"""
+
+    __slots__ = ('snapshot', 'index')
+
+    def __init__(self, snapshot, index):
+        self.snapshot = snapshot
+        self.index = index
+
+    @property
+    def google_event_id(self):
+        return self.snapshot.event_id(self.index)
+
+    @property
+    def room_id(self):
+        return self.snapshot.room_id
+
+    @property
+    def start(self):
+        return self.snapshot.starts[self.index]
+
+    @property
+    def end(self):
+        return self.snapshot.ends[self.index]
+
+    @property
+    def updated_ms(self):
+        return self.snapshot.updated[self.index]
+
+    @property
+    def is_naver(self):
+        return bool(self.snapshot.flags[self.index] & FLAG_NAVER)
+
+    @property
+    def all_day(self):
+        return bool(self.snapshot.flags[self.index] & FLAG_ALL_DAY)
+
+    @property
+    def title(self):
+        return self.snapshot.title(self.index)
+
+    def __repr__(self):
+        return f'EventRecord({self.room_id!r}, {self.google_event_id!r}, {self.start}, {self.end})'
+
+
+class RoomSnapshot:
+    """연습실 스냅샷 파일 (mmap, 열은 memoryview 로 복사 없이 접근)"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # 열은 모두 이 view 에서 잘라 쓰므로 close 에서 view 까지 놓아야 mmap 을 닫을 수 있음
+        self._view = memoryview(self._mmap)
+        self._columns = []
+        self.path = path
+        try:
+            self._read(self._view)
+        except (struct.error, ValueError):
+            # 잘리거나 덜 쓰인 파일: 만든 view 를 모두 놓고 닫은 뒤 호출 측이 다시 만들게 함
+            self.close()
+            raise
+
+    def _read(self, view):
+        magic, version, room, n, title_count, blob_size, meta_size = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'스냅샷 형식이 다릅니다: {self.path}')
+        self.count = n
+        offset = HEADER.size
+        layout = []
+        for code, length in (('q', n), ('q', n), ('q', n), ('I', n + 1), ('I', title_count + 1), ('I', n), ('B', n)):
+            offset = _align(offset)
+            size = struct.calcsize(code) * length
+            layout.append((offset, size, code))
+            offset += size
+        blob_offset = _align(offset)
+        self.meta_offset = _align(blob_offset + blob_size)
+        if self.meta_offset + meta_size > len(view):
+            raise ValueError(f'스냅샷이 잘렸습니다: {self.path}')
+        for offset, size, code in layout:
+            self._columns.append(view[offset:offset + size].cast(code))
+        self._columns.append(view[blob_offset:blob_offset + blob_size])
+        (self.starts, self.ends, self.updated, self._id_off, self._title_off, self._title_index,
+         self.flags, self._blob) = self._columns
+        self.meta = json.loads(bytes(view[self.meta_offset:self.meta_offset + meta_size]))
+        self.room_id = self.meta.get('room_id') or room.decode().strip()
+        self.sync_token = self.meta.get('sync_token')
+        self._titles = {}
+        self._ids = None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return EventRecord(self, index)
+
+    def __iter__(self):
+        return (EventRecord(self, i) for i in range(self.count))
+
+    def event_id(self, index):
+        return bytes(self._blob[self._id_off[index]:self._id_off[index + 1]]).decode('utf-8')
+
+    def event_ids(self):
+        """전체 google_event_id 목록 (id blob 을 한 번에 decode)"""
+        offsets = self._id_off
+        text = bytes(self._blob[:offsets[self.count]]).decode('utf-8')
+        if len(text) != offsets[self.count]:
+            # ASCII 가 아닌 id 가 있으면 바이트 위치 ≠ 글자 위치
+            return [self.event_id(i) for i in range(self.count)]
+        return [text[offsets[i]:offsets[i + 1]] for i in range(self.count)]
+
+    def title(self, index):
+        return self.title_by_number(self._title_index[index])
+
+    def title_by_number(self, title_number):
+        title = self._titles.get(title_number)
+        if title is None:
+            start, end = self._title_off[title_number], self._title_off[title_number + 1]
+            title = self._titles[title_number] = bytes(self._blob[start:end]).decode('utf-8')
+        return title
+
+    def find(self, event_id):
+        """google_event_id → EventRecord (처음 찾을 때 id 사전을 만듦)"""
+        if self._ids is None:
+            self._ids = {event_id: i for i, event_id in enumerate(self.event_ids())}
+        index = self._ids.get(event_id)
+        return None if index is None else EventRecord(self, index)
+
+    def spans(self):
+        """google_event_id → (start, end), 종일 이벤트 제외 (availability 적재용)"""
+        starts, ends, flags = self.starts.tolist(), self.ends.tolist(), self.flags.tolist()
+        return {
+            event_id: (start, end)
+            for event_id, start, end, flag in zip(self.event_ids(), starts, ends, flags)
+            if not flag & FLAG_ALL_DAY
+        }
+
+    def rows(self):
+        """record_to_row 와 같은 튜플 목록 (스냅샷 갱신용)"""
+        titles = [self.title_by_number(n) for n in range(len(self._title_off) - 1)]
+        return [
+            (event_id, start, end, updated, flag, titles[title])
+            for event_id, start, end, updated, flag, title in zip(
+                self.event_ids(), self.starts.tolist(), self.ends.tolist(), self.updated.tolist(),
+                self.flags.tolist(), self._title_index.tolist())
+        ]
+
+    def prices(self, service=None):
+        """전체 예약 가격 (수수료 적용 후) 을 가격 정책으로 한 번에 계산 (price_policy.price_batch)"""
+        from price_policy import get_price_policy_service
+
+        service = service or get_price_policy_service()
+        naver = [bool(flag & FLAG_NAVER) for flag in self.flags.tolist()]
+        return service.price_batch(self.room_id, self.starts.tolist(), self.ends.tolist(), naver)
+
+    def close(self):
+        for view in self._columns + [self._view]:
+            view.release()
+        self._mmap.close()
+
+
+def open_snapshot(room_id, directory=None):
+    """연습실 스냅샷 열기, 없거나 형식이 다르거나 잘렸으면 None (호출 측이 다시 만듦)"""
+    try:
+        return RoomSnapshot(snapshot_path(room_id, directory))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def open_snapshots(room_ids, directory=None):
+    """모든 연습실 스냅샷 {room_id: RoomSnapshot}, 하나라도 없으면 None"""
+    snapshots = {}
+    for room_id in room_ids:
+        snapshot = open_snapshot(room_id, directory)
+        if snapshot is None:
+            return None
+        snapshots[room_id] = snapshot
+    return snapshots
+
+
+# ── 동기화 연동 ────────────────────────────────────────────────
+
+class SnapshotRecorder:
+    """sync_calendar 변경 알림을 연습실별로 모았다가 동기화가 끝나면 스냅샷에 반영
+
+    전체 동기화는 캘린더의 모든 예약을 한 번씩 보므로 (full_collector) 그것만으로 새로 쓴다.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.changes = {}    # room_id → [(records, deleted_ids), ...]
+        self.full = {}       # room_id → {google_event_id: row} (전체 동기화 중 본 예약)
+        self.lock = threading.Lock()
+
+    def on_sync_changes(self, room_id, records, deleted_ids):
+        with self.lock:
+            self.changes.setdefault(room_id, []).append(([record_to_row(r) for r in records], list(deleted_ids)))
+
+    def full_collector(self, room_id):
+        """전체 동기화에서 본 예약(record)을 받을 함수"""
+        rows = {}
+        with self.lock:
+            self.full[room_id] = rows
+
+        def collect(record):
+            rows[record['google_event_id']] = record_to_row(record)
+        return collect
+
+    def invalidate(self, room_id):
+        """동기화 실패: 일부만 기록됐을 수 있으니 모은 변경분과 스냅샷을 버림 (다음 성공 때 다시 만듦)"""
+        with self.lock:
+            self.changes.pop(room_id, None)
+            self.full.pop(room_id, None)
+        try:
+            os.remove(snapshot_path(room_id, self.directory))
+        except FileNotFoundError:
+            pass
+
+    def commit(self, room_id, previous_token, sync_token, exact=True):
+        """동기화 성공 후 호출. 전체 동기화였으면 본 예약으로 새로 쓰고, 이전 스냅샷이 previous_token
+        시점이면 변경분만 합치고, 아니면 (스냅샷 없음, 체크포인트에서 이어서 함 등) booking_events 에서 다시 만든다."""
+        with self.lock:
+            changes = self.changes.pop(room_id, [])
+            full = self.full.pop(room_id, None)
+        if full is not None and exact:
+            return write_snapshot(room_id, full.values(), sync_token, self.directory)
+        snapshot = open_snapshot(room_id, self.directory)
+        if snapshot is None or not exact or snapshot.sync_token != previous_token:
+            if snapshot is not None:
+                snapshot.close()
+            return rebuild_room(room_id, sync_token, self.directory)
+        try:
+            if not changes:
+                return retoken_snapshot(snapshot, sync_token)
+            rows = {row[0]: row for row in snapshot.rows()}
+        finally:
+            snapshot.close()
+        for records, deleted_ids in changes:
+            for event_id in deleted_ids:
+                rows.pop(event_id, None)
+            for row in records:
+                rows[row[0]] = row
+        return write_snapshot(room_id, rows.values(), sync_token, self.directory)
+
+
+def rebuild_room(room_id, sync_token=None, directory=None):
+    """booking_events 에서 연습실 스냅샷 다시 만들기"""
+    from sync_calendar import fetch_rows
+
+    rows = [record_to_row(r) for r in fetch_rows('booking_events', {
+        'select': SNAPSHOT_COLUMNS, 'room_id': f'eq.{room_id}', 'order': 'id',
+    })]
+    return write_snapshot(room_id, rows, sync_token, directory)
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_snapshot_recorder():
+    """프로세스 공용 SnapshotRecorder (처음 호출 시 변경 알림 구독)"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            import sync_calendar
+            _recorder = SnapshotRecorder()
+            sync_calendar.add_change_listener(_recorder.on_sync_changes)
+        return _recorder
+
+
+def print_summary(room_ids):
+    for room_id in room_ids:
+        started = time.perf_counter()
+        snapshot = open_snapshot(room_id)
+        if snapshot is None:
+            print(f'  ⚪ {room_id.upper()}홀: 스냅샷 없음')
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        written = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.meta.get('written_at', 0)))
+        size = os.path.getsize(snapshot.path) / 1024
+        print(f'  ✅ {room_id.upper()}홀: {len(snapshot)}개 예약, {size:.0f}KB, {written} 저장 (열기 {elapsed:.2f}ms)')
+        snapshot.close()
+
+
+if __name__ == '__main__':
+    import sys
+    from sync_calendar import ROOMS, load_sync_state
+
+    args = sys.argv[1:]
+    room_ids = [a for a in args if not a.startswith('--')] or [room['id'] for room in ROOMS]
+    if '--rebuild' in args:
+        state = load_sync_state()
+        for room_id in room_ids:
+            rebuild_room(room_id, state.get(room_id, {}).get('sync_token'))
+    print(f'📦 예약 스냅샷 ({EVENT_SNAPSHOT_DIR})')
+    print_summary(room_ids)
@@ -0,0 +1,782 @@
+#!/usr/bin/env python3
+"""
+로컬 테스트/벤치마크용 가짜 Google Calendar + Supabase(PostgREST) 서버
+
+- Google: GET /calendar/v3/calendars/<id>/events (maxResults/pageToken 페이징, 잘못된 pageToken 은 400, syncToken 증분, 만료 시 410,
+  timeMin/timeMax 기간, fields= 부분 응답, 반복 예약은 singleEvents=true 면 회차로 펼치고 false 면 원본+예외 그대로)
+  POST /calendar/v3/calendars/<id>/events/watch (7일짜리 채널), POST /calendar/v3/channels/stop (모르는 채널은 404)
+- 요청이 Accept-Encoding: gzip 이면 1KB 넘는 응답은 gzip 으로 압축 (Google 은 User-Agent 에도 gzip 이 있을 때만)
+- Supabase: /rest/v1/<table> GET / POST(on_conflict upsert) / DELETE
+  (eq, neq, gt, gte, lt, lte, in, is 필터, and=(...), select 컬럼/임베드, order, limit, offset, count=exact)
+- 관리용: GET /__stats (요청 수, 주고받은 바이트), POST /__reset, POST /__seed (recurring: 반복 예약 수), POST /__mutate,
+  POST /__latency {"google": 초} (Google 응답마다 지연, 병렬 조회 효과 측정용),
+  POST /__fail_stops {"count": n} (다음 channels/stop n 번은 403),
+  POST /__fail_next {"responses": [{"status": 429, "retry_after": 1}, {"status": 503}]} (다음 요청들은 차례로 그 오류)
+
+sync_calendar 를 붙일 때:
+  GOOGLE_CALENDAR_API_URL=http://127.0.0.1:<port>/calendar/v3
+  SUPABASE_URL=http://127.0.0.1:<port>
+  HTTP_RATE_LIMIT=0
+
+사용법:
+  python3 fake_services.py [--port 8900]
+"""
+
+import gzip
+import json
+import random
+import time
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import recurrence
+
+KST = timezone(timedelta(hours=9))
+
+DEFAULT_PAGE_SIZE = 250
+MAX_PAGE_SIZE = 2500
+
+# 이보다 작은 응답은 압축하지 않음
+GZIP_MIN_SIZE = 1024
+
+
+def iso_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+# ── Google Calendar ──────────────────────────────────────────────
+
+class FakeCalendar:
+    """캘린더 하나: 이벤트 + 변경 순번 (sync token = 순번)"""
+
+    def __init__(self):
+        self.events = {}        # id → 이벤트 (삭제된 것은 status=cancelled 로 남김)
+        self.changed_at = {}    # id → 마지막 변경 순번
+        self.seq = 0
+        self.min_valid_seq = 0  # 이보다 작은 sync token 은 만료
+        self._sorted = None
+        self._windows = {}      # (timeMin, timeMax) → 기간 필터 결과 (페이지마다 다시 거르지 않도록, 변경 시 비움)
+        self._spans = {}        # id → event_span (구간마다 시간 문자열을 다시 파싱하지 않도록)
+        self._series = {}       # 반복 원본 id → recurrence.Series (변경 시 비움)
+        self._removed_masters = {}   # 삭제된 반복 원본 (singleEvents 증분에서 회차 취소를 만들 때)
+
+    def put(self, event):
+        self.seq += 1
+        event = dict(event, updated=iso_now())
+        self.events[event['id']] = event
+        self.changed_at[event['id']] = self.seq
+        self._sorted = None
+        self._windows = {}
+        self._series = {}
+        self._spans.pop(event['id'], None)
+
+    def cancel(self, event_id):
+        old = self.events.get(event_id)
+        if old is None:
+            return
+        if old.get('recurrence'):
+            self._removed_masters[event_id] = old
+        # 취소된 회차(예외)는 Google 처럼 원본 id 와 원래 시각을 남김
+        keep = {key: old[key] for key in ('recurringEventId', 'originalStartTime') if key in old}
+        self.put(dict(keep, id=event_id, status='cancelled'))
+
+    def active(self):
+        """취소되지 않은 이벤트 (id 순, 변경 전까지 캐시)"""
+        if self._sorted is None:
+            self._sorted = [
+                e for _, e in sorted(self.events.items()) if e.get('status') != 'cancelled'
+            ]
+        return self._sorted
+
+    def changes_since(self, seq, single=False):
+        changes = [self.events[i] for i, s in sorted(self.changed_at.items()) if s > seq]
+        if not single:
+            return changes
+        # singleEvents=true 면 바뀐 반복 원본 대신 모든 회차 (삭제된 원본은 회차마다 취소)
+        low, high = (event_epoch(value) for value in default_window())
+        items = []
+        for event in changes:
+            if event.get('recurrence'):
+                items.extend(self.expand(event, low, high))
+            elif event['id'] in self._removed_masters and event.get('status') == 'cancelled':
+                items.extend({'id': instance['id'], 'status': 'cancelled'}
+                             for instance in self.expand(self._removed_masters[event['id']], low, high))
+            else:
+                items.append(event)
+        return items
+
+    def series(self, master):
+        """반복 원본 → recurrence.Series (예외 회차는 펼치지 않음)"""
+        series = self._series.get(master['id'])
+        if series is None:
+            if not self._series:
+                # 원본별 예외 원래 시각 (변경될 때마다 한 번만 모음)
+                self._exception_starts = {}
+                for event in self.events.values():
+                    original = event.get('originalStartTime')
+                    if event.get('recurringEventId') and original:
+                        self._exception_starts.setdefault(event['recurringEventId'], set()).add(
+                            event_epoch(original.get('dateTime') or original.get('date')))
+            series = self._series[master['id']] = recurrence.Series(
+                series_record(master), self._exception_starts.get(master['id'], ()))
+        return series
+
+    def expand(self, master, low, high):
+        """[low, high) 와 겹치는 회차 → Google 회차 이벤트 목록"""
+        return [instance_event(master, record) for _, record in self.series(master).instances(low, high)]
+
+    def listing(self, time_min, time_max, single):
+        """기간 조회 결과 (id 순)
+
+        single 이면 반복 원본을 회차로 펼치고, 아니면 기간에 회차가 있는 원본과 취소된 회차를 그대로
+        """
+        items = [
+            event for _, event in sorted(self.events.items())
+            if not event.get('recurrence') and (event.get('status') != 'cancelled'
+                                                or (not single and event.get('recurringEventId')))
+        ]
+        if time_min or time_max:
+            items = self.window(items, time_min, time_max)
+        masters = [event for event in self.active() if event.get('recurrence')]
+        if masters:
+            default_min, default_max = default_window()
+            low, high = event_epoch(time_min or default_min), event_epoch(time_max or default_max)
+            for master in masters:
+                if single:
+                    items.extend(self.expand(master, low, high))
+                elif next(self.series(master).instances(low, high), None) is not None:
+                    items.append(master)
+            items.sort(key=lambda event: event['id'])
+        return items
+
+    def window(self, items, time_min, time_max):
+        """timeMin 이후에 끝나고 timeMax 전에 시작하는 이벤트 (Google 과 같은 겹침 기준)"""
+        low = event_epoch(time_min) if time_min else float('-inf')
+        high = event_epoch(time_max) if time_max else float('inf')
+        spans = self._spans
+        result = []
+        for event in items:
+            if event['id'] not in spans:
+                spans[event['id']] = event_span(event)
+            span = spans[event['id']]
+            if span is None or (span[0] < high and span[1] > low):
+                result.append(event)
+        return result
+
+    def list(self, params):
+        """events.list 응답 (status, body)"""
+        page_size = min(int(params.get('maxResults', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        try:
+            offset = int(params.get('pageToken', 0) or 0)
+        except ValueError:
+            return 400, {'error': {'code': 400, 'message': 'Invalid page token value'}}
+        single = params.get('singleEvents') == 'true'
+        sync_token = params.get('syncToken')
+        if sync_token:
+            try:
+                since = int(sync_token.split('-', 1)[1])
+            except (IndexError, ValueError):
+                since = -1
+            if since < self.min_valid_seq:
+                return 410, {'error': {'code': 410, 'message': 'Sync token is no longer valid'}}
+            items = self.changes_since(since, single)
+        else:
+            key = (params.get('timeMin'), params.get('timeMax'), single)
+            if key not in self._windows:
+                self._windows[key] = self.listing(*key)
+            items = self._windows[key]
+
+        page = items[offset:offset + page_size]
+        body = {'kind': 'calendar#events', 'items': page}
+        if offset + page_size < len(items):
+            body['nextPageToken'] = str(offset + page_size)
+        else:
+            body['nextSyncToken'] = f'seq-{self.seq}'
+        if params.get('fields'):
+            body = project_fields(body, parse_fields(params['fields']))
+        return 200, body
+
+
+def parse_fields(spec):
+    """Google fields= 문법 ('items(id,start(dateTime)),nextPageToken', 'a/b') → {이름: 하위 spec 또는 None}"""
+    fields = {}
+    for part in split_top(spec):
+        part = part.strip()
+        if '(' in part:
+            name, sub = part.split('(', 1)
+            sub = parse_fields(sub[:-1])
+        else:
+            name, sub = part, None
+        # a/b 는 a(b) 와 같음
+        path = name.split('/')
+        for inner in reversed(path[1:]):
+            sub = {inner: sub}
+        name = path[0]
+        if sub is None or fields.get(name, {}) is None:
+            fields[name] = None
+        else:
+            fields.setdefault(name, {}).update(sub)
+    return fields
+
+
+def project_fields(data, fields):
+    """parse_fields 결과대로 응답을 잘라냄 (리스트는 항목마다)"""
+    if isinstance(data, list):
+        return [project_fields(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: data[key] if sub is None else project_fields(data[key], sub)
+        for key, sub in fields.items() if key in data
+    }
+
+
+def event_epoch(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def event_span(event):
+    """(시작, 끝) epoch 초, 날짜만 있는 이벤트는 None (기간 필터에서 항상 포함)"""
+    start = event.get('start', {}).get('dateTime')
+    end = event.get('end', {}).get('dateTime')
+    if not start or not end:
+        return None
+    return event_epoch(start), event_epoch(end)
+
+
+def default_window():
+    """기간 없이 반복 예약을 펼칠 때 쓰는 기간 (sync_calendar 전체 동기화 기간과 같음)"""
+    return '2020-01-01T00:00:00Z', f'{datetime.now().year + 2}-12-31T23:59:59Z'
+
+
+def series_record(event):
+    """Google 반복 원본 → recurrence.Series 가 읽는 레코드"""
+    start = event.get('start', {})
+    end = event.get('end', {})
+    return {
+        'google_event_id': event['id'],
+        'summary': event.get('summary'),
+        'start_time': start.get('dateTime') or start.get('date'),
+        'end_time': end.get('dateTime') or end.get('date'),
+        'time_zone': start.get('timeZone'),
+        'recurrence': event['recurrence'],
+    }
+
+
+def instance_event(master, record):
+    """recurrence 회차 레코드 → Google singleEvents 회차 이벤트"""
+    key = 'date' if 'T' not in record['start_time'] else 'dateTime'
+    time_zone = master.get('start', {}).get('timeZone')
+    start = {key: record['start_time'], **({'timeZone': time_zone} if time_zone else {})}
+    end = {key: record['end_time'], **({'timeZone': time_zone} if time_zone else {})}
+    instance = {key: value for key, value in master.items() if key not in ('recurrence', 'id', 'start', 'end')}
+    return dict(instance, id=record['google_event_id'], start=start, end=end,
+                recurringEventId=master['id'], originalStartTime=start)
+
+
+def recurring_event(room_id, index, rng, base=datetime(2024, 1, 1, 10, tzinfo=KST)):
+    """벤치마크용 정기 대관 (2024년 초에 시작하는 매주 반복, 1/4 은 COUNT 로 끝남)"""
+    start = base + timedelta(days=rng.randrange(0, 56), minutes=30 * rng.randrange(0, 20))
+    end = start + timedelta(hours=rng.choice((2, 3)))
+    rule = f'RRULE:FREQ=WEEKLY;BYDAY={recurrence.WEEKDAYS[start.weekday()]}'
+    if rng.random() < 0.25:
+        rule += f';COUNT={rng.randrange(20, 100)}'
+    created = iso_now()
+    return {
+        'kind': 'calendar#event',
+        'id': f'{room_id}r{index:06d}',
+        'status': 'confirmed',
+        'summary': f'{room_id.upper()}홀 정기 대관 {index}',
+        'description': '정기 대관 (매주)',
+        'start': {'dateTime': start.isoformat(), 'timeZone': 'Asia/Seoul'},
+        'end': {'dateTime': end.isoformat(), 'timeZone': 'Asia/Seoul'},
+        'recurrence': [rule],
+        'created': created,
+        'updated': created,
+    }
+
+
+def synthetic_event(room_id, index, rng, base=datetime(2024, 1, 1, 9, tzinfo=KST)):
+    """벤치마크용 예약 (2024~2026 사이 30분 단위, 1~4시간, 일부 네이버 예약)"""
+    start = base + timedelta(minutes=30 * rng.randrange(0, 3 * 365 * 48))
+    end = start + timedelta(minutes=30 * rng.randrange(2, 9))
+    naver = rng.random() < 0.6
+    created = iso_now()
+    return {
+        'kind': 'calendar#event',
+        'id': f'{room_id}{index:07d}',
+        'status': 'confirmed',
+        'summary': f'{room_id.upper()}홀 예약 {index}',
+        'description': f'예약번호: {rng.randrange(10 ** 8)}\n예약자: 홍길동' if naver else '전화 예약',
+        'start': {'dateTime': start.isoformat(), 'timeZone': 'Asia/Seoul'},
+        'end': {'dateTime': end.isoformat(), 'timeZone': 'Asia/Seoul'},
+        'created': created,
+        'updated': created,
+    }
+
+
+# ── PostgREST ───────────────────────────────────────────────────
+
+def split_top(text, sep=','):
+    """괄호 밖의 sep 로만 분리"""
+    parts, depth, current = [], 0, ''
+    for ch in text:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def coerce(value, sample):
+    if isinstance(sample, bool):
+        return value == 'true'
+    if isinstance(sample, (int, float)):
+        try:
+            return type(sample)(value)
+        except ValueError:
+            return value
+    return value
+
+
+def column_value(row, column):
+    """'data->>frozen' 같은 JSON 경로도 처리"""
+    if '->>' in column:
+        name, key = column.split('->>', 1)
+        value = (row.get(name) or {}).get(key)
+        return None if value is None else (json.dumps(value) if isinstance(value, bool) else str(value))
+    return row.get(column)
+
+
+def make_filter(column, expression):
+    op, _, raw = expression.partition('.')
+    if op == 'in':
+        values = {v.strip().strip('"') for v in split_top(raw.strip('()'))}
+        return lambda row: str(column_value(row, column)) in values
+    if op == 'is':
+        return lambda row: column_value(row, column) is None if raw == 'null' else column_value(row, column) == (raw == 'true')
+    compare = {
+        'eq': lambda a, b: a == b, 'neq': lambda a, b: a != b,
+        'gt': lambda a, b: a > b, 'gte': lambda a, b: a >= b,
+        'lt': lambda a, b: a < b, 'lte': lambda a, b: a <= b,
+    }.get(op)
+    if compare is None:
+        raise ValueError(f'unsupported operator: {op}')
+
+    def check(row):
+        value = column_value(row, column)
+        if value is None:
+            return False
+        try:
+            return compare(value, coerce(raw, value))
+        except TypeError:
+            return False
+    return check
+
+
+class FakeTable:
+    """행 목록 + on_conflict 컬럼별 색인 + 조회 결과 캐시 (쓰기마다 generation 증가)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = {}          # id → row (삽입 순서 유지)
+        self.indexes = {}       # conflict 컬럼 tuple → {값 tuple: id}
+        self.next_id = 1
+        self.generation = 0
+        self.query_cache = {}   # 조회 조건 → (generation, 정렬된 행 목록)
+
+    def index(self, columns):
+        if columns not in self.indexes:
+            self.indexes[columns] = {tuple(r.get(c) for c in columns): i for i, r in self.rows.items()}
+        return self.indexes[columns]
+
+    def upsert(self, records, conflict_columns):
+        columns = tuple(conflict_columns)
+        index = self.index(columns) if columns else None
+        for record in records:
+            key = tuple(record.get(c) for c in columns)
+            if index is not None and key in index:
+                self.rows[index[key]].update(record)
+                continue
+            row = dict(record)
+            if not isinstance(row.get('id'), int):
+                row.setdefault('id', self.next_id)
+            if isinstance(row['id'], int):
+                self.next_id = max(self.next_id, row['id'] + 1)
+            self.rows[row['id']] = row
+            for cols, other in self.indexes.items():
+                other[tuple(row.get(c) for c in cols)] = row['id']
+        self.generation += 1
+
+    def delete(self, filters):
+        removed = [i for i, r in self.rows.items() if all(f(r) for f in filters)]
+        for row_id in removed:
+            del self.rows[row_id]
+        if removed:
+            self.indexes.clear()
+            self.generation += 1
+        return len(removed)
+
+
+class FakePostgrest:
+    def __init__(self):
+        self.tables = {}
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name)
+        return self.tables[name]
+
+    @staticmethod
+    def parse_filters(params):
+        filters = []
+        for key, value in params:
+            if key in ('select', 'order', 'limit', 'offset', 'on_conflict', 'columns'):
+                continue
+            if key in ('and', 'or'):
+                parts = [split_top(p, '.') for p in split_top(value.strip('()'))]
+                checks = [make_filter(p[0], '.'.join(p[1:])) for p in parts]
+                if key == 'and':
+                    filters.extend(checks)
+                else:
+                    filters.append(lambda row, checks=checks: any(c(row) for c in checks))
+                continue
+            filters.append(make_filter(key, value))
+        return filters
+
+    def select(self, name, params):
+        """(rows, 전체 개수, offset)"""
+        table = self.table(name)
+        query = dict(params)
+        # 같은 조건의 페이지 조회(limit/offset 만 다름)는 정렬 결과를 재사용
+        cache_key = tuple(sorted((k, v) for k, v in params if k not in ('limit', 'offset')))
+        cached = table.query_cache.get(cache_key)
+        if cached is not None and cached[0] == table.generation:
+            rows = cached[1]
+        else:
+            filters = self.parse_filters(params)
+            rows = [r for r in table.rows.values() if all(f(r) for f in filters)]
+            for part in reversed(split_top(query.get('order', ''))):
+                column, _, direction = part.partition('.')
+                rows.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith('desc'))
+            if len(table.query_cache) > 64:
+                table.query_cache.clear()
+            table.query_cache[cache_key] = (table.generation, rows)
+
+        total = len(rows)
+        offset = int(query.get('offset', 0))
+        limit = query.get('limit')
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        return [self.project(name, row, query.get('select', '*')) for row in rows], total, offset
+
+    def project(self, name, row, select):
+        if select == '*':
+            return dict(row)
+        result = {}
+        for column in split_top(select):
+            if '(' in column:
+                # 임베드: 상대 테이블에서 <단수 테이블명>_id 로 연결 (booking_events → booking_event_id)
+                embedded, inner = column.split('(', 1)
+                key = f'{name.rstrip("s")}_id'
+                match = self.table(embedded).index((key,)).get((row.get('id'),))
+                match = self.table(embedded).rows.get(match) if match is not None else None
+                result[embedded] = self.project(embedded, match, inner.rstrip(')')) if match else None
+            else:
+                result[column] = column_value(row, column)
+        return result
+
+
+# ── HTTP 서버 ──────────────────────────────────────────────────
+
+class FakeServices:
+    """서버 상태 (캘린더, 테이블, 통계) — 스레드 간 공유"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.google_latency = 0.0   # Google 응답마다 지연 (초, reset 해도 유지)
+        self.reset()
+
+    def reset(self):
+        self.calendars = {}
+        self.postgrest = FakePostgrest()
+        self.channels = {}          # Watch 채널 id → resourceId
+        self.stop_failures = 0      # 남은 channels/stop 실패 횟수
+        self.fail_next = []         # 다음 요청들에 차례로 돌려줄 오류 (status, Retry-After 또는 None)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.google_bytes_out = 0
+
+    def calendar(self, calendar_id):
+        if calendar_id not in self.calendars:
+            self.calendars[calendar_id] = FakeCalendar()
+        return self.calendars[calendar_id]
+
+    def seed(self, calendar_id, room_id, count, seed=0, recurring=0):
+        rng = random.Random(f'{seed}-{room_id}')
+        calendar = self.calendar(calendar_id)
+        for i in range(count):
+            calendar.put(synthetic_event(room_id, i, rng))
+        for i in range(recurring):
+            master = recurring_event(room_id, i, rng)
+            calendar.put(master)
+            # 회차 하나는 1시간 늦추고 하나는 취소 (예외)
+            low = event_epoch(master['start']['dateTime'])
+            instances = calendar.expand(master, low, low + 20 * 7 * 86400)
+            moved, cancelled = rng.sample(instances, 2)
+            start = datetime.fromisoformat(moved['start']['dateTime']) + timedelta(hours=1)
+            end = datetime.fromisoformat(moved['end']['dateTime']) + timedelta(hours=1)
+            calendar.put(dict(moved, summary=moved['summary'] + ' (시간 변경)',
+                              start={'dateTime': start.isoformat(), 'timeZone': 'Asia/Seoul'},
+                              end={'dateTime': end.isoformat(), 'timeZone': 'Asia/Seoul'}))
+            calendar.put({'id': cancelled['id'], 'status': 'cancelled', 'recurringEventId': master['id'],
+                          'originalStartTime': cancelled['originalStartTime']})
+
+    def expected_rows(self, calendar_id, local=False):
+        """동기화가 끝났을 때 booking_events / recurring_events 에 있어야 할 행 수
+
+        local 이면 booking_events 는 단일 예약 + 바뀐 회차, recurring_events 는 원본 + 예외(취소 포함).
+        server 면 booking_events 는 전체 동기화 기간을 회차로 펼친 결과, recurring_events 는 0
+        """
+        calendar = self.calendar(calendar_id)
+        if not local:
+            return len(calendar.listing(*default_window(), True)), 0
+        events = calendar.events.values()
+        bookings = sum(1 for e in events if e.get('status') != 'cancelled' and not e.get('recurrence'))
+        recurring = sum(1 for e in events if (e.get('recurrence') and e.get('status') != 'cancelled')
+                        or e.get('recurringEventId'))
+        return bookings, recurring
+
+    def mutate(self, calendar_id, room_id, updated=0, deleted=0, added=0, seed=1):
+        """증분 동기화용 변경: 기존 예약 수정/삭제 + 새 예약 추가"""
+        rng = random.Random(f'{seed}-{room_id}-mutate')
+        calendar = self.calendar(calendar_id)
+        ids = [e['id'] for e in calendar.active()]
+        picked = rng.sample(ids, min(len(ids), updated + deleted))
+        for event_id in picked[:updated]:
+            event = dict(calendar.events[event_id])
+            event['summary'] = event['summary'] + ' (변경)'
+            calendar.put(event)
+        for event_id in picked[updated:]:
+            calendar.cancel(event_id)
+        first = len(calendar.events)
+        for i in range(added):
+            calendar.put(synthetic_event(room_id, first + i, rng))
+
+    def watch(self, calendar_id, params):
+        """events.watch 응답 (status, body)"""
+        if not params.get('id') or not params.get('address'):
+            return 400, {'error': {'code': 400, 'message': 'id, address 가 필요합니다'}}
+        resource_id = f'resource-{calendar_id}'
+        self.channels[params['id']] = resource_id
+        expiration = int((time.time() + 7 * 86400) * 1000)
+        return 200, {'kind': 'api#channel', 'id': params['id'], 'resourceId': resource_id,
+                     'resourceUri': f'/calendar/v3/calendars/{calendar_id}/events', 'expiration': str(expiration)}
+
+    def stop(self, params):
+        """channels.stop 응답 (status, body)"""
+        if self.stop_failures:
+            self.stop_failures -= 1
+            return 403, {'error': {'code': 403, 'message': 'rateLimitExceeded'}}
+        if self.channels.get(params.get('id')) != params.get('resourceId'):
+            return 404, {'error': {'code': 404, 'message': 'Channel not found'}}
+        del self.channels[params['id']]
+        return 204, None
+
+    def stats(self):
+        return {
+            'requests': {f'{k[0]} {k[1]}': v for k, v in sorted(self.requests.items())},
+            'total_requests': sum(self.requests.values()),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'google_bytes_out': self.google_bytes_out,
+            'tables': {name: len(t.rows) for name, t in self.postgrest.tables.items()},
+            'calendars': {cid: len(c.active()) for cid, c in self.calendars.items()},
+        }
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    services: FakeServices = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length > 0 else b''
+        return body
+
+    def accepts_gzip(self, service):
+        """Google 은 Accept-Encoding 과 함께 User-Agent 에 'gzip' 이 있어야 압축함"""
+        if 'gzip' not in (self.headers.get('Accept-Encoding') or ''):
+            return False
+        return service != 'google' or 'gzip' in (self.headers.get('User-Agent') or '')
+
+    def reply(self, status, data=None, headers=None, count=True, service=None):
+        body = b'' if data is None else json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        if len(body) >= GZIP_MIN_SIZE and self.accepts_gzip(service):
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        if count:
+            with self.services.lock:
+                self.services.bytes_out += len(body)
+                if service == 'google':
+                    self.services.google_bytes_out += len(body)
+
+    def route(self, method):
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        body = self.read_body()
+        services = self.services
+        path = url.path
+
+        if path.startswith('/__'):
+            return self.admin(method, path, body)
+
+        # 상태 변경/조회만 잠금 안에서, 응답 직렬화/전송은 밖에서
+        service = None
+        with services.lock:
+            services.bytes_in += len(body)
+            if services.fail_next:
+                status, retry_after = services.fail_next.pop(0)
+                services.requests[('fail', str(status))] += 1
+                headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+                result = (status, {'message': 'injected failure'}, headers)
+            elif path.startswith('/calendar/v3/calendars/') and path.endswith('/events') and method == 'GET':
+                service = 'google'
+                services.requests[('google', 'events.list')] += 1
+                calendar_id = unquote(path[len('/calendar/v3/calendars/'):-len('/events')])
+                result = services.calendar(calendar_id).list(dict(params))
+                latency = services.google_latency
+            elif path.startswith('/calendar/v3/calendars/') and path.endswith('/events/watch') and method == 'POST':
+                services.requests[('google', 'events.watch')] += 1
+                calendar_id = unquote(path[len('/calendar/v3/calendars/'):-len('/events/watch')])
+                result = services.watch(calendar_id, json.loads(body or b'{}'))
+            elif path == '/calendar/v3/channels/stop' and method == 'POST':
+                services.requests[('google', 'channels.stop')] += 1
+                result = services.stop(json.loads(body or b'{}'))
+            elif path.startswith('/rest/v1/'):
+                table = path[len('/rest/v1/'):]
+                services.requests[('supabase', f'{method} {table}')] += 1
+                result = self.postgrest(method, table, params, body)
+            else:
+                result = (404, {'error': 'not found'})
+        if service == 'google' and latency:
+            time.sleep(latency)
+        self.reply(*result, service=service)
+
+    def postgrest(self, method, table, params, body):
+        """(status, data[, headers])"""
+        postgrest = self.services.postgrest
+        try:
+            if method == 'GET':
+                rows, total, offset = postgrest.select(table, params)
+                end = offset + len(rows) - 1
+                exact = 'count=exact' in (self.headers.get('Prefer') or '')
+                content_range = f'{offset}-{end}/{total if exact else "*"}' if rows else f'*/{total if exact else "*"}'
+                return 200, rows, {'Content-Range': content_range}
+            if method == 'POST':
+                records = json.loads(body or b'[]')
+                if isinstance(records, dict):
+                    records = [records]
+                conflict = dict(params).get('on_conflict')
+                postgrest.table(table).upsert(records, conflict.split(',') if conflict else [])
+                return 201, None
+            if method == 'DELETE':
+                filters = postgrest.parse_filters(params)
+                if not filters:
+                    return 400, {'message': 'DELETE requires a filter'}
+                postgrest.table(table).delete(filters)
+                return 204, None
+        except ValueError as e:
+            return 400, {'message': str(e)}
+        return 405, {'message': 'method not allowed'}
+
+    def admin(self, method, path, body):
+        services = self.services
+        data = json.loads(body or b'{}')
+        with services.lock:
+            if path == '/__stats':
+                return self.reply(200, services.stats(), count=False)
+            if path == '/__reset' and method == 'POST':
+                if data.get('stats_only'):
+                    services.reset_stats()
+                else:
+                    services.reset()
+                return self.reply(200, {'ok': True}, count=False)
+            if path == '/__seed' and method == 'POST':
+                for room in data['rooms']:
+                    services.seed(room['calendar_id'], room['id'], data['count'], data.get('seed', 0),
+                                  data.get('recurring', 0))
+                return self.reply(200, {'ok': True}, count=False)
+            if path == '/__mutate' and method == 'POST':
+                for room in data['rooms']:
+                    services.mutate(room['calendar_id'], room['id'], data.get('updated', 0),
+                                    data.get('deleted', 0), data.get('added', 0), data.get('seed', 1))
+                return self.reply(200, {'ok': True}, count=False)
+            if path == '/__latency' and method == 'POST':
+                services.google_latency = float(data.get('google', 0))
+                return self.reply(200, {'ok': True}, count=False)
+            if path == '/__fail_stops' and method == 'POST':
+                services.stop_failures = int(data.get('count', 1))
+                return self.reply(200, {'ok': True}, count=False)
+            if path == '/__fail_next' and method == 'POST':
+                services.fail_next.extend((r['status'], r.get('retry_after')) for r in data['responses'])
+                return self.reply(200, {'ok': True}, count=False)
+            if path == '/__expire_tokens' and method == 'POST':
+                for calendar in services.calendars.values():
+                    calendar.min_valid_seq = calendar.seq + 1
+                return self.reply(200, {'ok': True}, count=False)
+        self.reply(404, {'error': 'not found'}, count=False)
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def do_DELETE(self):
+        self.route('DELETE')
+
+
+def start_fake_services(port=0):
+    """백그라운드 스레드로 서버 시작 → (server, base_url)"""
+    handler = type('BoundFakeHandler', (FakeHandler,), {'services': FakeServices()})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-services', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+if __name__ == '__main__':
+    import sys
+    port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv else 8900
+    server, base_url = start_fake_services(port)
+    print(f'🧪 가짜 Google/Supabase 서버: {base_url}')
+    print(f'   GOOGLE_CALENDAR_API_URL={base_url}/calendar/v3')
+    print(f'   SUPABASE_URL={base_url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
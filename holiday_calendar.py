@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+한국 공휴일 / 요금 요일 구분 테이블
+
+data/korean_holidays.json 의 여러 해 공휴일을 읽어, 수록된 첫해 1월 1일부터
+마지막 해 12월 31일까지 날짜별 요일 구분(평일/주말/공휴일)을 bytearray 로 미리 만든다.
+조회는 date ordinal 인덱싱 한 번 (문자열 변환 없음).
+새 연도는 JSON 에 날짜만 추가하면 된다.
+"""
+
+import json
+import os
+from datetime import date
+
+HOLIDAYS_PATH = os.environ.get(
+    'HOLIDAYS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'korean_holidays.json')
+)
+
+# 요일 구분 (요금표 기준)
+WEEKDAY = 0
+WEEKEND = 1
+HOLIDAY = 2
+
+# 1970-01-01 의 ordinal (epoch 일수 ↔ date.toordinal 변환용)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _weekday_class(ordinal):
+    # ordinal 1 (0001-01-01) 이 월요일
+    return WEEKEND if (ordinal - 1) % 7 >= 5 else WEEKDAY
+
+
+class HolidayCalendar:
+    """연도별 공휴일 집합 + 날짜별 요일 구분 테이블"""
+
+    def __init__(self, holidays_by_year):
+        # 연도 → {ordinal: 이름}
+        self.years = {
+            int(year): {date.fromisoformat(d).toordinal(): name for d, name in days.items()}
+            for year, days in holidays_by_year.items()
+        }
+        if self.years:
+            self.first_ordinal = date(min(self.years), 1, 1).toordinal()
+            self.last_ordinal = date(max(self.years), 12, 31).toordinal()
+        else:
+            self.first_ordinal = self.last_ordinal = 0
+
+        self.table = bytearray(
+            _weekday_class(o) for o in range(self.first_ordinal, self.last_ordinal + 1)
+        ) if self.years else bytearray()
+        for days in self.years.values():
+            for ordinal in days:
+                self.table[ordinal - self.first_ordinal] = HOLIDAY
+
+    @classmethod
+    def from_file(cls, path=HOLIDAYS_PATH):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def covers(self, ordinal):
+        return self.first_ordinal <= ordinal <= self.last_ordinal
+
+    def day_class(self, ordinal):
+        """WEEKDAY / WEEKEND / HOLIDAY (데이터 없는 해는 요일만 판단)"""
+        if self.first_ordinal <= ordinal <= self.last_ordinal:
+            return self.table[ordinal - self.first_ordinal]
+        return _weekday_class(ordinal)
+
+    def is_weekend_or_holiday(self, ordinal):
+        return self.day_class(ordinal) != WEEKDAY
+
+    def holiday_name(self, ordinal):
+        days = self.years.get(date.fromordinal(ordinal).year)
+        return days.get(ordinal) if days else None
+
+    def holidays_in(self, year):
+        """해당 연도 공휴일 날짜 문자열 (정렬)"""
+        return [date.fromordinal(o).isoformat() for o in sorted(self.years.get(year, {}))]
+
+    def epoch_day_classes(self, first_day, last_day):
+        """epoch 일수 범위(양 끝 포함)의 요일 구분 bytes (NumPy 일괄 계산용)"""
+        first = first_day + EPOCH_ORDINAL
+        last = last_day + EPOCH_ORDINAL
+        if self.first_ordinal <= first and last <= self.last_ordinal:
+            return bytes(self.table[first - self.first_ordinal:last - self.first_ordinal + 1])
+        return bytes(self.day_class(o) for o in range(first, last + 1))
+
+
+_calendar = None
+
+
+def get_holiday_calendar():
+    """프로세스 공용 HolidayCalendar (처음 호출 시 파일 로드)"""
+    global _calendar
+    if _calendar is None:
+        _calendar = HolidayCalendar.from_file()
+    return _calendar
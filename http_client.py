@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+공용 HTTP 클라이언트
+- 호스트별 keep-alive 세션 재사용 (매 요청마다 TLS 연결 새로 열지 않음)
+- 호스트별 초당 요청 수 제한
+- 429/5xx 응답과 연결 오류는 jitter 가 들어간 지수 backoff 로 재시도
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import metrics
+
+# requests 는 import 가 무거워서 (~0.1초) 처음 요청할 때 불러옴
+
+POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '10'))
+MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', '4'))
+BACKOFF_BASE = float(os.environ.get('HTTP_BACKOFF_BASE', '0.5'))
+BACKOFF_MAX = 16.0
+DEFAULT_TIMEOUT = 30
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 호스트별 초당 최대 요청 수 (없으면 DEFAULT_RATE_LIMIT)
+HOST_RATE_LIMITS = {
+    'www.googleapis.com': float(os.environ.get('GOOGLE_RATE_LIMIT', '10')),
+}
+DEFAULT_RATE_LIMIT = float(os.environ.get('HTTP_RATE_LIMIT', '20'))
+
+
+class RateLimiter:
+    """요청 간 최소 간격을 보장하는 단순 limiter (스레드 안전)"""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_for = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+_sessions = {}
+_limiters = {}
+_lock = threading.Lock()
+
+
+def get_session(host):
+    """호스트별 공유 세션 (연결 풀 크기 POOL_SIZE)"""
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[host] = session
+            _limiters[host] = RateLimiter(HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT))
+        return session
+
+
+def backoff_delay(attempt, response=None):
+    """재시도 대기 시간 (Retry-After 우선, 없으면 full jitter 지수 backoff)"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def request(method, url, **kwargs):
+    """공유 세션으로 요청 (429/5xx, 연결 오류는 재시도)"""
+    import requests
+    host = urlsplit(url).netloc
+    session = get_session(host)
+    limiter = _limiters[host]
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.wait()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.HTTP_REQUESTS.inc(host=host, method=method, status='error')
+            if attempt == MAX_RETRIES:
+                raise
+            _retry(host, method, type(e).__name__, attempt)
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        _record(host, method, response, time.perf_counter() - started)
+        if response.status_code in RETRY_STATUS and attempt < MAX_RETRIES:
+            _retry(host, method, str(response.status_code), attempt)
+            time.sleep(backoff_delay(attempt, response))
+            continue
+        return response
+
+
+def _record(host, method, response, elapsed):
+    """요청 수/시간/바이트 계측 (받은 바이트는 gzip 이면 압축된 크기)"""
+    metrics.HTTP_REQUESTS.inc(host=host, method=method, status=str(response.status_code))
+    metrics.HTTP_SECONDS.observe(elapsed, host=host, method=method)
+    body = response.request.body if response.request is not None else None
+    if body:
+        metrics.HTTP_SENT_BYTES.inc(len(body), host=host)
+    content = response.content
+    try:
+        # urllib3 는 실제로 읽은 (압축된) 바이트 수를 알고 있음
+        received = response.raw.tell() or len(content)
+    except AttributeError:
+        received = len(content)
+    metrics.HTTP_RECEIVED_BYTES.inc(received, host=host)
+
+
+def _retry(host, method, reason, attempt):
+    metrics.HTTP_RETRIES.inc(host=host, reason=reason)
+    metrics.log('http_retry', host=host, method=method, reason=reason, attempt=attempt + 1)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+동기화 계측 (프로세스 메모리, Prometheus 텍스트 형식으로 노출)
+
+- 연습실 × 단계별 소요 시간 histogram (fetch / read_db / write / save / sync / price / watch ...)
+- HTTP 요청 수(호스트, 메서드, 상태), 재시도, 주고받은 바이트
+- 가져온 이벤트 / upsert / 삭제 건수
+SYNC_LOG_FORMAT=json 이면 단계 완료, 재시도 등을 JSON 한 줄 로그로 stderr 에도 남긴다.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_registry = []
+
+
+def json_logs_enabled():
+    return os.environ.get('SYNC_LOG_FORMAT', '').lower() == 'json'
+
+
+def log(event, **fields):
+    """구조화 로그 한 줄 (SYNC_LOG_FORMAT=json 일 때만)"""
+    if not json_logs_enabled():
+        return
+    record = {'ts': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'event': event}
+    record.update(fields)
+    sys.stderr.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, '') for n in self.labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(tuple(labels.get(n, '') for n in self.labels), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}   # 라벨 → [버킷별 개수..., 합계, 개수]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, '') for n in self.labels)
+        with _lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series):
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {count}')
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {series[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {series[-1]}')
+        return lines
+
+
+# ── 동기화 ─────────────────────────────────────────────────────
+
+PHASE_SECONDS = Histogram(
+    'sync_phase_seconds', '연습실별 동기화 단계 소요 시간 (초)', ('room', 'phase'))
+SYNC_RUNS = Counter(
+    'sync_runs_total', '연습실 동기화 실행 수', ('room', 'mode', 'result'))
+SYNC_EVENTS = Counter(
+    'sync_events_total', '동기화 이벤트 수 (fetched / upserted / deleted)', ('room', 'kind'))
+SYNC_TOKEN_EXPIRED = Counter(
+    'sync_token_expired_total', 'sync token 만료(410)로 전체 동기화한 횟수', ('room',))
+
+# ── HTTP ───────────────────────────────────────────────────────
+
+HTTP_REQUESTS = Counter(
+    'http_client_requests_total', '외부 HTTP 요청 수', ('host', 'method', 'status'))
+HTTP_RETRIES = Counter(
+    'http_client_retries_total', '재시도 수', ('host', 'reason'))
+HTTP_SECONDS = Histogram(
+    'http_client_request_seconds', '외부 HTTP 요청 시간 (초, 재시도 각각)', ('host', 'method'))
+HTTP_SENT_BYTES = Counter(
+    'http_client_sent_bytes_total', '요청 본문 바이트', ('host',))
+HTTP_RECEIVED_BYTES = Counter(
+    'http_client_received_bytes_total', '응답 본문 바이트 (압축된 크기)', ('host',))
+
+
+@contextmanager
+def timed(phase, room='', **fields):
+    """with 블록 소요 시간을 sync_phase_seconds 에 기록 (JSON 로그 켜져 있으면 한 줄 남김)"""
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_SECONDS.observe(elapsed, room=room, phase=phase)
+        log('phase', room=room, phase=phase, seconds=round(elapsed, 6),
+            error=str(error) if error else None, **fields)
+
+
+def render():
+    """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+    lines = []
+    with _lock:
+        for metric in _registry:
+            if metric.values:
+                lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """모든 값 초기화 (테스트/벤치마크용)"""
+    with _lock:
+        for metric in _registry:
+            metric.values.clear()
@@ -154,12 +154,14 @@ async function calculatePrice(startTime, endTime, roomId, description = '') {
     }
   }
 
-  // 수수료 적용
+  // 수수료 적용 (정가는 정산 화면용으로 함께 반환)
+  const grossPrice = Math.round(totalPrice);
   const commission = isNaver ? 0.9802 : 0.9;
   totalPrice = Math.round(totalPrice * commission);
 
   return {
     price: totalPrice,
+    grossPrice: grossPrice,
     priceType: priceType,
     isNaver: isNaver
   };
@@ -0,0 +1,52 @@
+// 월 정산 (Netlify 배포용) - Python 서버(simple_server)의 /api/settlement 로 그대로 넘김
+// GET /api/settlement?month=YYYY-MM&format=json|csv
+// 계산과 끝난 달 캐시는 settlement.py 한 곳에서만 (SETTLEMENT_API_URL = Python 서버 주소)
+
+const corsHeaders = {
+  'Access-Control-Allow-Origin': '*',
+  'Access-Control-Allow-Headers': 'Content-Type',
+  'Access-Control-Allow-Methods': 'GET, OPTIONS',
+};
+
+// 정산 응답에서 그대로 전달할 헤더
+const PASS_HEADERS = ['content-type', 'content-disposition', 'etag', 'cache-control'];
+
+export async function handler(event, context) {
+  if (event.httpMethod === 'OPTIONS') {
+    return { statusCode: 204, headers: corsHeaders, body: '' };
+  }
+  if (event.httpMethod !== 'GET') {
+    return {
+      statusCode: 405,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+      body: JSON.stringify({ error: 'Method not allowed' })
+    };
+  }
+
+  const baseUrl = process.env.SETTLEMENT_API_URL;
+  if (!baseUrl) {
+    return {
+      statusCode: 503,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+      body: JSON.stringify({ error: 'SETTLEMENT_API_URL 이 설정되지 않았습니다' })
+    };
+  }
+
+  try {
+    const query = new URLSearchParams(event.queryStringParameters || {}).toString();
+    const response = await fetch(`${baseUrl.replace(/\/$/, '')}/api/settlement?${query}`);
+    const headers = { ...corsHeaders };
+    for (const name of PASS_HEADERS) {
+      const value = response.headers.get(name);
+      if (value) headers[name] = value;
+    }
+    return { statusCode: response.status, headers, body: await response.text() };
+  } catch (error) {
+    console.error('❌ 정산 서버 요청 실패:', error);
+    return {
+      statusCode: 502,
+      headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+      body: JSON.stringify({ error: error.message })
+    };
+  }
+}
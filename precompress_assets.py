@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+정적 자원 미리 압축 (simple_server 운영 모드용)
+
+www/js 아래 js/css 와 style.css 파일마다 옆에 .gz (brotli 모듈이 있으면 .br 도)를 만든다.
+원본보다 새 압축본이 이미 있으면 건너뛴다. 서버는 원본보다 오래된 압축본은 쓰지 않는다.
+
+사용법:
+  python3 precompress_assets.py            # 기본 대상
+  python3 precompress_assets.py www/css    # 디렉토리/파일 지정
+"""
+
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WWW_DIR = os.path.join(BASE_DIR, 'www')
+DEFAULT_TARGETS = [os.path.join(WWW_DIR, 'js'), os.path.join(WWW_DIR, 'style.css')]
+EXTENSIONS = ('.js', '.css')
+
+# 이보다 작은 파일은 압축 이득이 거의 없음
+MIN_SIZE = 1024
+
+
+def iter_assets(targets):
+    for target in targets:
+        if os.path.isfile(target):
+            yield target
+            continue
+        for root, _, files in os.walk(target):
+            for name in files:
+                if name.endswith(EXTENSIONS) or name == 'style.css':
+                    yield os.path.join(root, name)
+
+
+def is_fresh(path, compressed_path):
+    try:
+        return os.stat(compressed_path).st_mtime_ns >= os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def write_variant(path, suffix, compress):
+    """압축본 저장 (원본보다 작을 때만). 저장했으면 압축 크기 반환"""
+    target = path + suffix
+    if is_fresh(path, target):
+        return None
+    with open(path, 'rb') as f:
+        data = compress(f.read())
+    if len(data) >= os.path.getsize(path):
+        return None
+    tmp_path = target + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, target)
+    return len(data)
+
+
+def precompress(targets=None):
+    """(처리한 파일 수, 원본 바이트, 압축 바이트) 반환"""
+    variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+    files = original = compressed = 0
+    for path in iter_assets(targets or DEFAULT_TARGETS):
+        size = os.path.getsize(path)
+        if size < MIN_SIZE:
+            continue
+        written = [write_variant(path, suffix, compress) for suffix, compress in variants]
+        written = [n for n in written if n is not None]
+        if written:
+            files += 1
+            original += size
+            compressed += min(written)
+    return files, original, compressed
+
+
+if __name__ == '__main__':
+    targets = [os.path.abspath(a) for a in sys.argv[1:]] or None
+    if brotli is None:
+        print('⚠️ brotli 모듈 없음: .gz 만 생성 (pip install brotli)')
+    files, original, compressed = precompress(targets)
+    print(f'✅ {files}개 파일 압축: {original / 1024:.0f}KB → {compressed / 1024:.0f}KB')
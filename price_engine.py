@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+예약 가격 계산 엔진
+
+예약을 KST 날짜 × 요금 구간(새벽 0~6시, 16시 이전, 16시 이후, 주말/공휴일)으로 나눠
+구간별 초 단위 이용 시간 × 시간당 요금으로 계산한다. (1시간씩 반복하지 않음)
+90분 예약은 1.5시간으로 계산된다.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from holiday_calendar import EPOCH_ORDINAL, WEEKDAY, get_holiday_calendar
+
+KST_OFFSET = 9 * 3600
+DAY_SECONDS = 86400
+DAWN_END = 6 * 3600        # 새벽 구간 끝 (06:00)
+EVENING_START = 16 * 3600  # 16시 이후 요금 시작
+OVERNIGHT_SECONDS = 6 * 3600
+
+NAVER_COMMISSION = 0.9802
+DIRECT_COMMISSION = 0.9
+
+# 요금 구간
+BAND_DAWN = 'dawn'
+BAND_BEFORE16 = 'before16'
+BAND_AFTER16 = 'after16'
+BAND_WEEKEND = 'weekend'
+BANDS = (BAND_DAWN, BAND_BEFORE16, BAND_AFTER16, BAND_WEEKEND)
+
+# 시간당 요금 (새벽, 평일 16시 이전, 평일 16시 이후, 주말/공휴일) + 새벽 통대관 가격
+Tariff = namedtuple('Tariff', 'dawn before16 after16 weekend overnight')
+
+def is_weekend_or_holiday_ordinal(ordinal):
+    """주말 또는 공휴일 체크 (date.toordinal() 값 기준)"""
+    return get_holiday_calendar().day_class(ordinal) != WEEKDAY
+
+
+def to_epoch(value):
+    """ISO 시간 문자열/datetime → epoch 초 (timezone 없으면 UTC 로 간주)"""
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    timestamp = value.timestamp()
+    return int(timestamp) if timestamp.is_integer() else timestamp
+
+
+def day_segments(start_epoch, end_epoch):
+    """예약을 KST 날짜별로 분할: (date ordinal, 시작 초, 끝 초) — 초는 그날 0시 기준"""
+    start = start_epoch + KST_OFFSET
+    end = end_epoch + KST_OFFSET
+    while start < end:
+        day, offset = divmod(start, DAY_SECONDS)
+        day_end = (day + 1) * DAY_SECONDS
+        segment_end = min(end, day_end)
+        yield EPOCH_ORDINAL + int(day), offset, offset + (segment_end - start)
+        start = segment_end
+
+
+def _overlap(a_start, a_end, b_start, b_end):
+    return max(0, min(a_end, b_end) - max(a_start, b_start))
+
+
+def price_breakdown(start_epoch, end_epoch):
+    """요금 구간별 이용 시간(초)"""
+    seconds = dict.fromkeys(BANDS, 0)
+    day_class = get_holiday_calendar().day_class
+    for ordinal, seg_start, seg_end in day_segments(start_epoch, end_epoch):
+        seconds[BAND_DAWN] += _overlap(seg_start, seg_end, 0, DAWN_END)
+        if day_class(ordinal) != WEEKDAY:
+            seconds[BAND_WEEKEND] += _overlap(seg_start, seg_end, DAWN_END, DAY_SECONDS)
+        else:
+            seconds[BAND_BEFORE16] += _overlap(seg_start, seg_end, DAWN_END, EVENING_START)
+            seconds[BAND_AFTER16] += _overlap(seg_start, seg_end, EVENING_START, DAY_SECONDS)
+    return seconds
+
+
+def is_overnight_package(start_epoch, end_epoch):
+    """새벽 통대관: KST 0시대 시작, 정확히 6시간"""
+    start_of_day = (start_epoch + KST_OFFSET) % DAY_SECONDS
+    return start_of_day < 3600 and end_epoch - start_epoch == OVERNIGHT_SECONDS
+
+
+def gross_price(start_epoch, end_epoch, tariff):
+    """수수료 적용 전 가격"""
+    if is_overnight_package(start_epoch, end_epoch):
+        return tariff.overnight
+    seconds = price_breakdown(start_epoch, end_epoch)
+    # 일괄 계산(누적합 차이)과 반올림 결과가 같도록 소수점 6자리로 정리
+    return round(sum(seconds[band] * getattr(tariff, band) for band in BANDS) / 3600, 6)
+
+
+def price_type(start_epoch, end_epoch):
+    """가격 타입 (새벽통대관/새벽/주말/공휴일/저녁/일반, Netlify price-calculator 와 동일 기준)"""
+    if is_overnight_package(start_epoch, end_epoch):
+        return '새벽통대관'
+    day, start_of_day = divmod(start_epoch + KST_OFFSET, DAY_SECONDS)
+    if start_of_day < DAWN_END:
+        return '새벽'
+    if get_holiday_calendar().day_class(EPOCH_ORDINAL + int(day)) != WEEKDAY:
+        return '주말/공휴일'
+    if start_of_day >= EVENING_START:
+        return '저녁'
+    return '일반'
+
+
+def commission_rate(is_naver):
+    return NAVER_COMMISSION if is_naver else DIRECT_COMMISSION
+
+
+def price_booking(start, end, tariff, is_naver=False):
+    """예약 하나 가격 (수수료 적용 후, 원 단위)"""
+    start_epoch = to_epoch(start)
+    end_epoch = to_epoch(end)
+    return round(gross_price(start_epoch, end_epoch, tariff) * commission_rate(is_naver))
+
+
+def _calendar_arrays(np, first_day, last_day):
+    """epoch 일수 범위의 주말/공휴일 여부 배열 (요일 구분 테이블 그대로 사용)"""
+    classes = get_holiday_calendar().epoch_day_classes(first_day, last_day)
+    return np.frombuffer(classes, dtype=np.uint8) != WEEKDAY
+
+
+def price_bookings_batch(starts, ends, tariff, naver=None):
+    """여러 예약 가격 일괄 계산 (starts/ends 는 epoch 초 배열)
+
+    NumPy 가 있으면 누적 요금 함수 F(t) 로 F(end) - F(start) 를 한 번에 계산:
+    F(t) = (그 전날까지의 일별 요금 누적합) + (그날 0시부터 t 까지의 구간 요금).
+    NumPy 가 없으면 price_booking 을 반복한다. 반환은 원 단위 정수 리스트.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        naver = naver if naver is not None else [False] * len(starts)
+        return [price_booking(s, e, tariff, n) for s, e, n in zip(starts, ends, naver)]
+
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if starts.size == 0:
+        return []
+
+    start_days, start_secs = np.divmod(starts + KST_OFFSET, DAY_SECONDS)
+    end_days, end_secs = np.divmod(ends + KST_OFFSET, DAY_SECONDS)
+    first_day = int(start_days.min())
+    weekend = _calendar_arrays(np, first_day, int(end_days.max()))
+
+    # 하루 전체 요금 (초 단위 요금 × 초)
+    dawn = tariff.dawn * DAWN_END
+    weekday_total = dawn + tariff.before16 * (EVENING_START - DAWN_END) + tariff.after16 * (DAY_SECONDS - EVENING_START)
+    weekend_total = dawn + tariff.weekend * (DAY_SECONDS - DAWN_END)
+    daily = np.where(weekend, weekend_total, weekday_total) / 3600
+    cumulative = np.concatenate(([0.0], np.cumsum(daily)))
+
+    def cost_until(days, secs):
+        index = days - first_day
+        is_weekend = weekend[index]
+        within = tariff.dawn * np.minimum(secs, DAWN_END)
+        day_rate = np.where(
+            is_weekend,
+            tariff.weekend * np.clip(secs - DAWN_END, 0, DAY_SECONDS - DAWN_END),
+            tariff.before16 * np.clip(secs - DAWN_END, 0, EVENING_START - DAWN_END)
+            + tariff.after16 * np.clip(secs - EVENING_START, 0, DAY_SECONDS - EVENING_START),
+        )
+        return cumulative[index] + (within + day_rate) / 3600
+
+    gross = np.round(cost_until(end_days, end_secs) - cost_until(start_days, start_secs), 6)
+    overnight = (start_secs < 3600) & (ends - starts == OVERNIGHT_SECONDS)
+    gross = np.where(overnight, tariff.overnight, gross)
+
+    if naver is None:
+        rate = DIRECT_COMMISSION
+    else:
+        rate = np.where(np.asarray(naver, dtype=bool), NAVER_COMMISSION, DIRECT_COMMISSION)
+    return np.rint(gross * rate).astype(np.int64).tolist()
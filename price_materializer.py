@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+event_prices 갱신 (바뀐 예약만 다시 계산)
+
+가격 계산 입력(시작/종료 시각, 네이버 여부, 적용 정책 id/요금)의 fingerprint 를
+event_prices.price_metadata 에 저장해 두고, 다음 실행에서는 fingerprint 가 달라진
+예약만 다시 계산해 booking_event_id 기준으로 일괄 upsert 한다.
+
+사용법:
+  python3 price_materializer.py            # 전체 점검 (바뀐 것만 기록)
+  python3 price_materializer.py a b        # 선택한 연습실만
+  python3 price_materializer.py --force    # fingerprint 무시하고 모두 다시 계산
+"""
+
+import hashlib
+import json
+
+import http_client
+import metrics
+import price_engine
+from price_policy import get_price_policy_service
+from settings import get_settings
+from sync_calendar import (
+    WRITE_BATCH_SIZE, DELETE_BATCH_SIZE,
+    supabase_headers, chunked, fetch_rows, is_naver_booking,
+)
+
+# 계산 방식이 바뀌면 올려서 전체 재계산 유도
+ENGINE_VERSION = 1
+
+EVENT_COLUMNS = 'id,room_id,google_event_id,start_time,end_time,description,updated_at'
+
+
+def in_filter(values):
+    return 'in.(' + ','.join(f'"{v}"' for v in values) + ')'
+
+
+def fetch_events(room_ids=None, google_event_ids=None):
+    """가격을 계산할 booking_events"""
+    if google_event_ids:
+        for batch in chunked(list(google_event_ids), DELETE_BATCH_SIZE):
+            yield from fetch_rows('booking_events', {
+                'select': EVENT_COLUMNS, 'google_event_id': in_filter(batch), 'order': 'id',
+            })
+        return
+    params = {'select': EVENT_COLUMNS, 'order': 'id'}
+    if room_ids:
+        params['room_id'] = in_filter(room_ids)
+    yield from fetch_rows('booking_events', params)
+
+
+def fetch_price_fingerprints(booking_event_ids=None):
+    """booking_event_id → 저장된 fingerprint (없으면 None)"""
+    params = {'select': 'booking_event_id,price_metadata', 'order': 'booking_event_id'}
+    if booking_event_ids is None:
+        rows = fetch_rows('event_prices', params)
+    else:
+        rows = (
+            row
+            for batch in chunked(list(booking_event_ids), DELETE_BATCH_SIZE)
+            for row in fetch_rows('event_prices', dict(params, booking_event_id=in_filter(batch)))
+        )
+    return {
+        row['booking_event_id']: (row.get('price_metadata') or {}).get('fingerprint')
+        for row in rows
+    }
+
+
+def price_inputs(service, event):
+    """가격 계산 입력 + fingerprint"""
+    start = price_engine.to_epoch(event['start_time'])
+    end = price_engine.to_epoch(event['end_time'])
+    is_naver = is_naver_booking(event.get('description'))
+    policy = service.policy_for_booking(event['room_id'], start)
+    key = json.dumps([
+        ENGINE_VERSION, start, end, is_naver,
+        policy.id if policy else None,
+        list(policy.tariff) if policy else None,
+    ])
+    fingerprint = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return start, end, is_naver, policy, fingerprint
+
+
+def build_price_record(event, start, end, is_naver, policy, fingerprint, price):
+    """event_prices 레코드 (price_metadata 에 계산 근거 저장)"""
+    return {
+        'booking_event_id': event['id'],
+        'calculated_price': price,
+        'price_type': price_engine.price_type(start, end),
+        'price_metadata': {
+            'fingerprint': fingerprint,
+            'engine_version': ENGINE_VERSION,
+            'policy_id': policy.id if policy else None,
+            'is_naver': is_naver,
+            'seconds': price_engine.price_breakdown(start, end),
+        },
+    }
+
+
+def price_records(pending):
+    """(예약, price_inputs 결과) 목록 → event_prices 레코드
+
+    같은 정책 예약끼리 묶어 price_engine.price_bookings_batch 로 한 번에 계산 (정책 없으면 0)
+    """
+    groups = {}
+    for i, (_, (_, _, _, policy, _)) in enumerate(pending):
+        if policy is not None:
+            groups.setdefault(policy.id, (policy, []))[1].append(i)
+    prices = [0] * len(pending)
+    for policy, indexes in groups.values():
+        starts = [pending[i][1][0] for i in indexes]
+        ends = [pending[i][1][1] for i in indexes]
+        naver = [pending[i][1][2] for i in indexes]
+        batch = price_engine.price_bookings_batch(starts, ends, policy.tariff, naver)
+        for i, price in zip(indexes, batch):
+            prices[i] = price
+    return [build_price_record(event, *inputs, price) for (event, inputs), price in zip(pending, prices)]
+
+
+def write_prices(pending):
+    """가격 일괄 계산(sync_phase_seconds 의 price 단계) 후 upsert"""
+    if not pending:
+        return
+    rooms = {event['room_id'] for event, _ in pending}
+    with metrics.timed('price', rooms.pop() if len(rooms) == 1 else '', priced=len(pending)):
+        records = price_records(pending)
+    upsert_prices(records)
+
+
+def upsert_prices(records):
+    url = f'{get_settings().supabase_url}/rest/v1/event_prices?on_conflict=booking_event_id'
+    headers = dict(supabase_headers(), Prefer='resolution=merge-duplicates,return=minimal')
+    for batch in chunked(records, WRITE_BATCH_SIZE):
+        response = http_client.post(url, headers=headers, json=batch)
+        response.raise_for_status()
+
+
+def materialize_prices(room_ids=None, google_event_ids=None, force=False):
+    """바뀐 예약만 가격 계산 후 event_prices upsert. (점검 수, 기록 수) 반환
+
+    google_event_ids 를 주면 해당 예약만, 아니면 (선택한 연습실) 전체를 점검한다.
+    """
+    service = get_price_policy_service()
+    if google_event_ids:
+        events = list(fetch_events(google_event_ids=google_event_ids))
+        stored = {} if force or not events else fetch_price_fingerprints([e['id'] for e in events])
+    else:
+        # 전체 점검: 저장된 fingerprint 만 먼저 읽고 예약은 페이지 단위로 흘려보냄
+        stored = {} if force else fetch_price_fingerprints()
+        events = fetch_events(room_ids)
+
+    checked = 0
+    pending = []
+    written = 0
+    for event in events:
+        checked += 1
+        inputs = price_inputs(service, event)
+        if stored.get(event['id']) == inputs[-1]:
+            continue
+        pending.append((event, inputs))
+        if len(pending) >= WRITE_BATCH_SIZE:
+            write_prices(pending)
+            written += len(pending)
+            pending = []
+
+    write_prices(pending)
+    written += len(pending)
+    return checked, written
+
+
+def on_sync_changes(room_id, records, deleted_ids):
+    """sync_calendar 변경 알림 → 바뀐 예약 가격만 갱신 (삭제는 ON DELETE CASCADE 로 처리됨)"""
+    if not records:
+        return
+    checked, written = materialize_prices(google_event_ids=[r['google_event_id'] for r in records])
+    print(f'  💰 {room_id.upper()}홀 가격 {written}/{checked}개 갱신')
+
+
+if __name__ == '__main__':
+    import sys
+    args = sys.argv[1:]
+    force = '--force' in args
+    selected = [a for a in args if not a.startswith('--')] or None
+
+    print('💰 event_prices 갱신 시작...')
+    checked, written = materialize_prices(room_ids=selected, force=force)
+    print(f'✅ {checked}개 예약 점검, {written}개 가격 기록')
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+날짜별 가격 정책 (price_history 테이블) 캐시
+
+price_history 를 한 번 읽어 연습실별로 effective_from 정렬 배열을 만들고,
+예약 시점에 적용되는 정책을 bisect 로 O(log n) 조회한다.
+테이블의 updated_at/행 수가 바뀌면 다시 읽는다 (확인은 POLICY_CHECK_INTERVAL 초마다 한 번).
+Supabase 설정이 없거나 조회에 실패하면 data/price_history.json 을 사용하고,
+조회 실패였다면 POLICY_CHECK_INTERVAL 마다 Supabase 를 다시 시도한다.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date
+
+import price_engine
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'price_history.json')
+POLICY_CHECK_INTERVAL = float(os.environ.get('POLICY_CHECK_INTERVAL', '60'))
+
+# 정책 id (price_history.id) + 요금
+Policy = namedtuple('Policy', 'id room_id effective_from effective_to tariff')
+
+_OPEN_END = date.max.toordinal()
+
+
+def _policy_from_row(row):
+    effective_to = row.get('effective_to')
+    return Policy(
+        id=row['id'],
+        room_id=row['room_id'],
+        effective_from=date.fromisoformat(row['effective_from']).toordinal(),
+        effective_to=date.fromisoformat(effective_to).toordinal() if effective_to else _OPEN_END,
+        tariff=price_engine.Tariff(
+            dawn=row.get('price_dawn_hourly') or row['price_overnight'] / 6,
+            before16=row['price_weekday_before16'],
+            after16=row['price_weekday_after16'],
+            weekend=row['price_weekend'],
+            overnight=row['price_overnight'],
+        ),
+    )
+
+
+def kst_ordinal(epoch):
+    """epoch 초 → KST 날짜 ordinal"""
+    return price_engine.EPOCH_ORDINAL + int((epoch + price_engine.KST_OFFSET) // price_engine.DAY_SECONDS)
+
+
+class PricePolicyService:
+    """price_history 메모리 인덱스 (연습실별 effective_from 정렬 배열)"""
+
+    def __init__(self, supabase_url=None, supabase_key=None, fixture_path=FIXTURE_PATH,
+                 check_interval=POLICY_CHECK_INTERVAL):
+        # None 이면 settings 에서 (설정이 없으면 fixture 만 사용)
+        self._supabase_url = supabase_url
+        self._supabase_key = supabase_key
+        self.fixture_path = fixture_path
+        self.check_interval = check_interval
+        self.source = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._index = {}
+        self._lock = threading.Lock()
+
+    # --- 로딩 ---
+
+    @property
+    def supabase_url(self):
+        return self._supabase_url if self._supabase_url is not None else self._setting('supabase_url')
+
+    @property
+    def supabase_key(self):
+        return self._supabase_key if self._supabase_key is not None else self._setting('supabase_key')
+
+    @staticmethod
+    def _setting(name):
+        from settings import ConfigError, get_settings
+        try:
+            return getattr(get_settings(), name)
+        except ConfigError:
+            return None
+
+    def _headers(self):
+        return {
+            'apikey': self.supabase_key,
+            'Authorization': f'Bearer {self.supabase_key}',
+        }
+
+    def _fetch_signature(self):
+        """테이블 변경 감지용 (최신 updated_at, 행 수)"""
+        import http_client
+        response = http_client.get(
+            f'{self.supabase_url}/rest/v1/price_history',
+            headers=dict(self._headers(), Prefer='count=exact'),
+            params={'select': 'updated_at', 'order': 'updated_at.desc', 'limit': 1},
+        )
+        response.raise_for_status()
+        rows = response.json()
+        return (rows[0]['updated_at'] if rows else None, response.headers.get('Content-Range'))
+
+    def _fetch_rows(self):
+        import http_client
+        response = http_client.get(
+            f'{self.supabase_url}/rest/v1/price_history',
+            headers=self._headers(),
+            params={'select': '*', 'order': 'room_id,effective_from'},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _load_fixture(self):
+        with open(self.fixture_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _build_index(self, rows):
+        index = {}
+        for row in rows:
+            policy = _policy_from_row(row)
+            index.setdefault(policy.room_id, []).append(policy)
+        for room_id, policies in index.items():
+            policies.sort(key=lambda p: p.effective_from)
+            index[room_id] = ([p.effective_from for p in policies], policies)
+        return index
+
+    def reload(self):
+        """price_history 전체 다시 읽기 (실패하면 fixture)"""
+        with self._lock:
+            rows = None
+            signature = None
+            if self.supabase_url and self.supabase_key:
+                try:
+                    signature = self._fetch_signature()
+                    rows = self._fetch_rows()
+                    self.source = 'supabase'
+                except Exception as e:
+                    print(f'⚠️  price_history 조회 실패, 기본 가격 사용: {e}')
+            if rows is None:
+                rows = self._load_fixture()
+                self.source = 'fixture'
+            self._index = self._build_index(rows)
+            self._signature = signature
+            self._checked_at = time.monotonic()
+
+    def refresh_if_changed(self):
+        """check_interval 마다 updated_at 확인, 바뀌었으면 다시 읽기"""
+        if self.source is None:
+            self.reload()
+            return
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        if self.source == 'fixture':
+            # Supabase 조회가 실패해 fixture 로 돌았던 경우 다시 시도
+            if self.supabase_url and self.supabase_key:
+                self.reload()
+            else:
+                self._checked_at = time.monotonic()
+            return
+        try:
+            signature = self._fetch_signature()
+        except Exception:
+            self._checked_at = time.monotonic()
+            return
+        if signature != self._signature:
+            self.reload()
+        else:
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        """캐시 초기화 (가격 정책 변경 직후 호출)"""
+        with self._lock:
+            self.source = None
+
+    # --- 조회 ---
+
+    def policy_at(self, room_id, ordinal):
+        """해당 날짜(ordinal)에 적용되는 정책, 없으면 None"""
+        self.refresh_if_changed()
+        return self._lookup(room_id, ordinal)
+
+    def _lookup(self, room_id, ordinal):
+        entry = self._index.get(room_id)
+        if not entry:
+            return None
+        starts, policies = entry
+        i = bisect_right(starts, ordinal) - 1
+        if i < 0 or policies[i].effective_to < ordinal:
+            return None
+        return policies[i]
+
+    def policy_for_booking(self, room_id, start):
+        """예약 시작 시각(KST 날짜 기준)에 적용되는 정책"""
+        return self.policy_at(room_id, kst_ordinal(price_engine.to_epoch(start)))
+
+    def price_booking(self, room_id, start, end, is_naver=False):
+        """예약 하나 가격, 정책 없으면 0"""
+        policy = self.policy_for_booking(room_id, start)
+        if policy is None:
+            return 0
+        return price_engine.price_booking(start, end, policy.tariff, is_naver)
+
+    def price_batch(self, room_id, starts, ends, naver=None):
+        """한 연습실 예약 일괄 가격 계산 (starts/ends 는 epoch 초)
+
+        예약마다 정책을 찾은 뒤 같은 정책끼리 묶어 price_engine.price_bookings_batch 로 계산
+        """
+        self.refresh_if_changed()
+        naver = list(naver) if naver is not None else [False] * len(starts)
+        groups = {}
+        policies = {}
+        for i, start in enumerate(starts):
+            policy = self._lookup(room_id, kst_ordinal(start))
+            if policy is not None:
+                groups.setdefault(policy.id, []).append(i)
+                policies[policy.id] = policy
+
+        prices = [0] * len(starts)
+        for policy_id, indexes in groups.items():
+            policy = policies[policy_id]
+            batch = price_engine.price_bookings_batch(
+                [starts[i] for i in indexes],
+                [ends[i] for i in indexes],
+                policy.tariff,
+                [naver[i] for i in indexes],
+            )
+            for i, price in zip(indexes, batch):
+                prices[i] = price
+        return prices
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_price_policy_service():
+    """프로세스 공용 PricePolicyService"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = PricePolicyService()
+        return _service
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+반복 예약 로컬 펼치기 (RECURRENCE_EXPANSION=local)
+
+Google 이 singleEvents=true 로 반복 예약을 회차마다 펼쳐 보내는 대신, 반복 원본(RRULE/EXDATE/RDATE)과
+예외(시간이 바뀌거나 취소된 회차)만 recurring_events 에 저장해 두고, 조회하는 기간만 여기서 펼친다.
+- RFC 5545 RRULE 중 Google 캘린더가 만드는 범위만 지원: FREQ=DAILY/WEEKLY/MONTHLY/YEARLY, INTERVAL,
+  COUNT, UNTIL, BYDAY(±n 포함), BYMONTHDAY, BYMONTH, WKST (그 밖의 규칙은 UnsupportedRule)
+- 회차 시작 시각은 generator 로 요청된 기간 끝까지만 만들고 규칙(RRULE/EXDATE + 시작 시각) 단위로 캐시
+  → 주간 화면, 월 정산, 빈 시간 조회가 같은 규칙을 다시 펼치지 않음
+- 회차 id 는 Google 과 같은 <원본 id>_<UTC YYYYMMDDTHHMMSSZ> (종일은 <원본 id>_<YYYYMMDD>)
+- 바뀐 회차(예외)는 booking_events 에 보통 예약으로 들어가므로, 그 원래 시각 회차는 여기서 만들지 않음
+
+사용법:
+  python3 recurrence.py 2025-03 [연습실...]   # 그 달 반복 예약 회차 출력
+"""
+
+import heapq
+import os
+import threading
+from bisect import bisect_left
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from operator import itemgetter
+
+import price_engine
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # tzdata 가 없으면 시작 시각의 UTC offset 고정으로 계산
+    ZoneInfo = None
+
+RECURRING_TABLE = 'recurring_events'
+RECURRING_COLUMNS = ('google_event_id,room_id,title,description,start_time,end_time,time_zone,'
+                     'recurrence,recurring_event_id,original_start_time,status,updated_at')
+
+# 펼친 결과를 들고 있을 규칙 수 (넘으면 오래 안 쓴 것부터 버림)
+RULE_CACHE_SIZE = int(os.environ.get('RULE_CACHE_SIZE', '1024'))
+# 회차가 하나도 없는 주기가 이만큼 이어지면 끝난 규칙으로 봄 (FREQ=MONTHLY;BYMONTHDAY=30;BYMONTH=2 같은 규칙)
+MAX_EMPTY_PERIODS = 1000
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+RULE_PARTS = {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY', 'BYMONTHDAY', 'BYMONTH', 'WKST'}
+
+
+class UnsupportedRule(ValueError):
+    """로컬에서 펼칠 수 없는 반복 규칙"""
+
+
+def _zone(name, fallback):
+    if name and ZoneInfo is not None:
+        try:
+            return ZoneInfo(name)
+        except (KeyError, ValueError, OSError):
+            pass
+    return fallback
+
+
+class Rule:
+    """RRULE 한 줄 (COUNT/UNTIL 은 시간대를 아는 Series 에서 적용)"""
+
+    __slots__ = ('text', 'freq', 'interval', 'count', 'until', 'byday', 'bymonthday', 'bymonth', 'wkst')
+
+    def __init__(self, text):
+        self.text = text
+        try:
+            parts = dict(part.split('=', 1) for part in text.split(';') if part)
+        except ValueError:
+            raise UnsupportedRule(f'잘못된 RRULE: {text!r}')
+        unknown = set(parts) - RULE_PARTS
+        if unknown:
+            raise UnsupportedRule(f'지원하지 않는 RRULE 항목 {sorted(unknown)}: {text!r}')
+        self.freq = parts.get('FREQ')
+        if self.freq not in ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY'):
+            raise UnsupportedRule(f'지원하지 않는 FREQ: {text!r}')
+        try:
+            self.interval = int(parts.get('INTERVAL', 1))
+            self.count = int(parts['COUNT']) if 'COUNT' in parts else None
+            self.byday = [(int(day[:-2]) if day[:-2] else 0, WEEKDAYS.index(day[-2:]))
+                          for day in parts['BYDAY'].split(',')] if 'BYDAY' in parts else []
+            self.bymonthday = [int(day) for day in parts['BYMONTHDAY'].split(',')] if 'BYMONTHDAY' in parts else []
+            self.bymonth = sorted(int(month) for month in parts['BYMONTH'].split(',')) if 'BYMONTH' in parts else []
+            self.wkst = WEEKDAYS.index(parts.get('WKST', 'MO'))
+        except ValueError:
+            raise UnsupportedRule(f'잘못된 RRULE: {text!r}')
+        self.until = parts.get('UNTIL')
+        if self.interval < 1:
+            raise UnsupportedRule(f'INTERVAL 은 1 이상이어야 합니다: {text!r}')
+        if any(n for n, _ in self.byday) and self.freq in ('DAILY', 'WEEKLY'):
+            raise UnsupportedRule(f'{self.freq} 에는 BYDAY 순번을 쓸 수 없습니다: {text!r}')
+        if self.byday and self.freq == 'YEARLY' and not self.bymonth:
+            raise UnsupportedRule(f'BYMONTH 없는 YEARLY BYDAY 는 지원하지 않습니다: {text!r}')
+
+    def dates(self, first):
+        """first(시작 날짜) 이후 규칙에 맞는 날짜를 순서대로 (끝없이, COUNT/UNTIL 은 호출 측에서)"""
+        empty = 0
+        for period in self._periods(first):
+            if period:
+                empty = 0
+            else:
+                empty += 1
+                if empty >= MAX_EMPTY_PERIODS:
+                    return
+            for day in period:
+                if day >= first:
+                    yield day
+
+    def _periods(self, first):
+        # 주기(일/주/월/년)마다 후보 날짜 목록
+        if self.freq == 'DAILY':
+            day, step = first, timedelta(days=self.interval)
+            while True:
+                yield [day] if self._matches(day) else []
+                day += step
+        elif self.freq == 'WEEKLY':
+            week = first - timedelta(days=(first.weekday() - self.wkst) % 7)
+            offsets = sorted({(weekday - self.wkst) % 7 for weekday in
+                              ([weekday for _, weekday in self.byday] or [first.weekday()])})
+            step = timedelta(days=7 * self.interval)
+            while True:
+                yield [week + timedelta(days=offset) for offset in offsets
+                       if not self.bymonth or (week + timedelta(days=offset)).month in self.bymonth]
+                week += step
+        elif self.freq == 'MONTHLY':
+            index = first.year * 12 + first.month - 1
+            while True:
+                year, month = divmod(index, 12)
+                yield self._month_days(year, month + 1, first) if not self.bymonth or month + 1 in self.bymonth else []
+                index += self.interval
+        else:
+            year = first.year
+            while True:
+                days = []
+                for month in self.bymonth or [first.month]:
+                    days.extend(self._month_days(year, month, first))
+                yield days
+                year += self.interval
+
+    def _matches(self, day):
+        # DAILY 필터 (BYDAY 는 요일만)
+        if self.bymonth and day.month not in self.bymonth:
+            return False
+        if self.bymonthday and day.day not in self._resolve_monthdays(day.year, day.month):
+            return False
+        if self.byday and day.weekday() not in {weekday for _, weekday in self.byday}:
+            return False
+        return True
+
+    def _resolve_monthdays(self, year, month):
+        last = monthrange(year, month)[1]
+        return {day if day > 0 else last + 1 + day for day in self.bymonthday} & set(range(1, last + 1))
+
+    def _month_days(self, year, month, first):
+        last = monthrange(year, month)[1]
+        days = self._resolve_monthdays(year, month) if self.bymonthday else None
+        if self.byday:
+            first_weekday = date(year, month, 1).weekday()
+            matched = set()
+            for n, weekday in self.byday:
+                candidates = list(range(1 + (weekday - first_weekday) % 7, last + 1, 7))
+                if n == 0:
+                    matched.update(candidates)
+                elif -len(candidates) <= n <= len(candidates):
+                    matched.add(candidates[n - 1 if n > 0 else n])
+            days = matched if days is None else days & matched
+        if days is None:
+            days = {first.day} if first.day <= last else set()
+        return [date(year, month, day) for day in sorted(days)]
+
+
+class Expansion:
+    """규칙 하나를 펼친 회차 시작 시각 (지금까지 요청된 기간 끝까지만 만들어 둠)"""
+
+    __slots__ = ('_starts_iter', 'starts', 'done', '_lock')
+
+    def __init__(self, starts_iter):
+        self._starts_iter = starts_iter
+        self.starts = []
+        self.done = False
+        self._lock = threading.Lock()
+
+    def between(self, start, end):
+        """[start, end) 에 시작하는 회차"""
+        with self._lock:
+            while not self.done and (not self.starts or self.starts[-1] < end):
+                try:
+                    self.starts.append(next(self._starts_iter))
+                except StopIteration:
+                    self.done = True
+            return self.starts[bisect_left(self.starts, start):bisect_left(self.starts, end)]
+
+
+_expansions = OrderedDict()
+_expansions_lock = threading.Lock()
+
+
+def _expansion(series):
+    """규칙별 캐시 (같은 RRULE/EXDATE/시작 시각이면 연습실, 원본이 달라도 공유)"""
+    with _expansions_lock:
+        expansion = _expansions.get(series.key)
+        if expansion is None:
+            expansion = _expansions[series.key] = Expansion(series.iter_starts())
+            while len(_expansions) > RULE_CACHE_SIZE:
+                _expansions.popitem(last=False)
+        else:
+            _expansions.move_to_end(series.key)
+        return expansion
+
+
+def clear_cache():
+    with _expansions_lock:
+        _expansions.clear()
+
+
+class Series:
+    """반복 원본 하나 (recurring_events 의 recurrence 가 있는 행)"""
+
+    def __init__(self, record, exceptions=()):
+        self.id = record['google_event_id']
+        self.record = record
+        start_time = record['start_time']
+        end_time = record.get('end_time') or start_time
+        self.all_day = 'T' not in start_time
+        recurrence = tuple(record.get('recurrence') or ())
+        self.key = (recurrence, start_time, record.get('time_zone'))
+        self.exceptions = set(exceptions)   # 예외 회차의 원래 시작 epoch
+        if self.all_day:
+            self.zone = timezone.utc
+            self.first = date.fromisoformat(start_time[:10])
+            self.clock = None
+            self.start = price_engine.to_epoch(self.first.isoformat())
+            self.duration = price_engine.to_epoch(end_time[:10]) - self.start
+        else:
+            start = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+            self.zone = _zone(record.get('time_zone'), start.tzinfo or timezone.utc)
+            local = start.astimezone(self.zone)
+            self.first = local.date()
+            self.clock = local.time().replace(tzinfo=None)
+            self.start = price_engine.to_epoch(start)
+            self.duration = price_engine.to_epoch(end_time) - self.start
+
+        self.rules, self.rdates, self.exdates = [], set(), set()
+        for line in recurrence:
+            name = line.split(':', 1)[0].split(';', 1)[0].upper()
+            if name == 'RRULE':
+                self.rules.append(Rule(line.split(':', 1)[1]))
+            elif name == 'RDATE':
+                self.rdates.update(self._parse_times(line))
+            elif name == 'EXDATE':
+                self.exdates.update(self._parse_times(line))
+            else:
+                raise UnsupportedRule(f'지원하지 않는 recurrence 항목: {line!r}')
+
+    def _epoch(self, day, clock=None, zone=None):
+        if self.all_day:
+            return price_engine.to_epoch(day.isoformat())
+        local = datetime.combine(day, clock or self.clock, tzinfo=zone or self.zone)
+        return price_engine.to_epoch(local)
+
+    def _parse_time(self, value, zone=None):
+        """RRULE/EXDATE 시각 값 → epoch (날짜만 있으면 그날 이 원본의 시작 시각)"""
+        if len(value) == 8:
+            return self._epoch(date(int(value[:4]), int(value[4:6]), int(value[6:])), zone=zone)
+        if value.endswith('Z'):
+            return price_engine.to_epoch(datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc))
+        local = datetime.strptime(value, '%Y%m%dT%H%M%S')
+        return self._epoch(local.date(), local.time(), zone)
+
+    def _parse_times(self, line):
+        head, _, values = line.partition(':')
+        params = dict(part.split('=', 1) for part in head.split(';')[1:] if '=' in part)
+        zone = _zone(params.get('TZID'), self.zone)
+        return [self._parse_time(value, zone) for value in values.split(',') if value]
+
+    def _until(self, value):
+        """UNTIL → 회차 시작이 이 값 이상이면 끝 (날짜만 있으면 그날까지 포함)"""
+        if value is None:
+            return None
+        if len(value) == 8:
+            day = date(int(value[:4]), int(value[4:6]), int(value[6:])) + timedelta(days=1)
+            return self._epoch(day, clock=datetime.min.time())
+        return self._parse_time(value) + 1
+
+    def _rule_starts(self, rule):
+        limit = self._until(rule.until)
+        emitted = 0
+        for day in rule.dates(self.first):
+            start = self._epoch(day)
+            if start < self.start:
+                continue
+            if limit is not None and start >= limit:
+                return
+            yield start
+            emitted += 1
+            if rule.count is not None and emitted >= rule.count:
+                return
+
+    def iter_starts(self):
+        """회차 시작 epoch 를 순서대로 (RRULE 여러 줄 + RDATE 병합, EXDATE 제외, lazy)"""
+        streams = [self._rule_starts(rule) for rule in self.rules]
+        if self.rdates:
+            streams.append(iter(sorted(self.rdates)))
+        last = None
+        for start in heapq.merge(*streams):
+            if start == last or start in self.exdates:
+                continue
+            last = start
+            yield start
+
+    def instance(self, start):
+        """회차 하나 → booking_events 모양 레코드"""
+        moment = datetime.fromtimestamp(start, timezone.utc)
+        if self.all_day:
+            suffix = moment.strftime('%Y%m%d')
+            start_time = moment.date().isoformat()
+            end_time = datetime.fromtimestamp(start + self.duration, timezone.utc).date().isoformat()
+        else:
+            suffix = moment.strftime('%Y%m%dT%H%M%SZ')
+            start_time = moment.isoformat()
+            end_time = datetime.fromtimestamp(start + self.duration, timezone.utc).isoformat()
+        record = self.record
+        return {
+            'google_event_id': f'{self.id}_{suffix}',
+            'room_id': record.get('room_id'),
+            'title': record.get('title'),
+            'description': record.get('description'),
+            'start_time': start_time,
+            'end_time': end_time,
+            'created_at': record.get('created_at'),
+            'updated_at': record.get('updated_at'),
+            'recurring_event_id': self.id,
+        }
+
+    def instances(self, start, end):
+        """[start, end) 와 겹치는 회차 (시작 epoch, 레코드), 시작 시각 순"""
+        for first in _expansion(self).between(start - self.duration, end):
+            if first + self.duration > start and first not in self.exceptions:
+                yield first, self.instance(first)
+
+
+class RecurringStore:
+    """연습실별 반복 원본 + 예외 회차 (recurring_events 전체를 메모리에)"""
+
+    def __init__(self, room_ids):
+        self.rooms = {room_id: {} for room_id in room_ids}   # 연습실 → 원본 id → Series
+        self.exceptions = {}   # 원본 id → {예외 id: 원래 시작 epoch}
+        self.exception_master = {}   # 예외 id → 원본 id
+        self.failed = {}       # 펼칠 수 없는 원본 id → 오류 (상태 출력용)
+        self.lock = threading.Lock()
+
+    def load(self, rows):
+        masters = []
+        with self.lock:
+            for row in rows:
+                if row.get('recurrence'):
+                    masters.append(row)
+                else:
+                    self._put_exception(row)
+            for row in masters:
+                self._put_master(row)
+
+    def apply(self, room_id, records=(), deleted_ids=()):
+        """동기화 변경분 반영 (원본은 교체, 예외는 해당 원본의 회차에서 제외)"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        with self.lock:
+            for event_id in deleted_ids:
+                room.pop(event_id, None)
+                self.failed.pop(event_id, None)
+                for exception_id in self.exceptions.pop(event_id, {}):
+                    self.exception_master.pop(exception_id, None)
+                master_id = self.exception_master.pop(event_id, None)
+                if master_id is not None:
+                    exceptions = self.exceptions.get(master_id, {})
+                    exceptions.pop(event_id, None)
+                    if master_id in room:
+                        room[master_id].exceptions = set(exceptions.values())
+            masters = [record for record in records if record.get('recurrence')]
+            for record in records:
+                if not record.get('recurrence'):
+                    self._put_exception(record)
+            for record in masters:
+                self._put_master(record)
+
+    def _put_master(self, record):
+        room = self.rooms.get(record.get('room_id'))
+        if room is None:
+            return
+        event_id = record['google_event_id']
+        try:
+            room[event_id] = Series(record, self.exceptions.get(event_id, {}).values())
+            self.failed.pop(event_id, None)
+        except (UnsupportedRule, ValueError) as e:
+            # 펼칠 수 없는 규칙은 첫 회차만 보여주지 않도록 빼고 기록 (sync 에서 경고)
+            room.pop(event_id, None)
+            self.failed[event_id] = str(e)
+
+    def _put_exception(self, record):
+        master_id = record.get('recurring_event_id')
+        original = record.get('original_start_time')
+        if not master_id or not original:
+            return
+        exceptions = self.exceptions.setdefault(master_id, {})
+        exceptions[record['google_event_id']] = price_engine.to_epoch(original)
+        self.exception_master[record['google_event_id']] = master_id
+        series = self.rooms.get(record.get('room_id'), {}).get(master_id)
+        if series is not None:
+            series.exceptions = set(exceptions.values())
+
+    def instances(self, start, end, room_ids=None):
+        """[start, end) 와 겹치는 회차 레코드 (모든 연습실 합쳐 시작 시각 순)"""
+        with self.lock:
+            series = [s for room_id in (room_ids or self.rooms) for s in self.rooms.get(room_id, {}).values()]
+        streams = [s.instances(start, end) for s in series]
+        for _, record in heapq.merge(*streams, key=itemgetter(0)):
+            yield record
+
+    def count(self):
+        with self.lock:
+            return sum(len(room) for room in self.rooms.values())
+
+
+def with_prices(records):
+    """회차 레코드에 event_prices(calculated_price, price_type) 를 그 자리에서 계산해 붙임
+
+    회차는 booking_events 행이 없어 price_materializer 가 미리 계산해 둘 수 없음
+    """
+    from price_policy import get_price_policy_service
+    from sync_calendar import is_naver_booking
+
+    service = get_price_policy_service()
+    for record in records:
+        start = price_engine.to_epoch(record['start_time'])
+        end = price_engine.to_epoch(record['end_time'])
+        record['event_prices'] = {
+            'calculated_price': service.price_booking(
+                record['room_id'], start, end, is_naver_booking(record.get('description'))),
+            'price_type': price_engine.price_type(start, end),
+        }
+        yield record
+
+
+def enabled():
+    """RECURRENCE_EXPANSION=local 인지 (server 면 반복 예약도 booking_events 에 회차마다 있음)"""
+    import sync_calendar
+    return sync_calendar.RECURRENCE_EXPANSION == 'local'
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def on_sync_changes(room_id, records, deleted_ids):
+    """sync_calendar 반복 예약 변경 알림 → 원본/예외 갱신"""
+    if _store is not None:
+        _store.apply(room_id, records, deleted_ids)
+
+
+def get_recurring_store():
+    """프로세스 공용 RecurringStore (local 모드가 아니면 None, 처음 호출 시 recurring_events 에서 채움)"""
+    global _store
+    if not enabled():
+        return None
+    with _store_lock:
+        if _store is None:
+            import sync_calendar
+
+            _store = RecurringStore([room['id'] for room in sync_calendar.ROOMS])
+            sync_calendar.add_recurring_listener(on_sync_changes)
+            try:
+                _store.load(sync_calendar.fetch_rows(RECURRING_TABLE, {'select': RECURRING_COLUMNS, 'order': 'google_event_id'}))
+            except Exception:
+                _store = None
+                raise
+        return _store
+
+
+def window_instances(start, end, room_ids=None, prices=False):
+    """[start, end) 반복 예약 회차 (local 모드가 아니면 빈 generator)"""
+    store = get_recurring_store()
+    if store is None:
+        return iter(())
+    records = store.instances(start, end, room_ids)
+    return with_prices(records) if prices else records
+
+
+if __name__ == '__main__':
+    import sys
+    from stats_builder import month_range
+
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    year, month = (int(part) for part in args[0].split('-'))
+    if not enabled():
+        print('ℹ️  RECURRENCE_EXPANSION=local 이 아닙니다 (반복 예약도 booking_events 에 회차마다 저장됨)')
+        sys.exit(0)
+    store = get_recurring_store()
+    print(f'🔁 반복 원본 {store.count()}개')
+    for event_id, error in store.failed.items():
+        print(f'  ⚠️  {event_id}: {error}')
+    count = 0
+    for record in window_instances(*month_range(year, month), args[1:] or None):
+        count += 1
+        print(f"  {record['room_id'].upper()}홀 {record['start_time']} ~ {record['end_time']}  {record['title']}")
+    print(f'📅 {year}-{month:02d}: {count}회차')
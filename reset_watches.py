@@ -4,5 +4,11 @@
 from sync_calendar import reset_watch_channels
 
 if __name__ == '__main__':
+    import sys
+    args = sys.argv[1:]
     print('🔔 Watch 채널 재설정 시작...\n')
-    reset_watch_channels()
+    reset_watch_channels(
+        [a for a in args if not a.startswith('--')] or None,
+        force='--force' in args,
+        dry_run='--dry-run' in args,
+    )
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+환경변수 설정 (처음 쓸 때 읽고 캐시)
+
+import 시점에는 아무것도 읽지 않으므로, 키가 없어도 모듈 import 와
+상태 확인 같은 명령은 동작하고 실제로 그 값을 쓰는 순간에만 오류가 난다.
+"""
+
+import os
+import threading
+from functools import cached_property
+
+
+class ConfigError(KeyError):
+    """필수 환경변수 없음"""
+
+    def __str__(self):
+        return f'환경변수 {self.args[0]} 가 설정되지 않았습니다'
+
+
+class Settings:
+    def __init__(self, environ=None):
+        self.environ = os.environ if environ is None else environ
+
+    def required(self, name):
+        value = self.environ.get(name)
+        if not value:
+            raise ConfigError(name)
+        return value
+
+    @cached_property
+    def google_api_key(self):
+        return self.required('GOOGLE_CALENDAR_API_KEY')
+
+    @cached_property
+    def supabase_url(self):
+        return self.required('SUPABASE_URL').rstrip('/')
+
+    @cached_property
+    def supabase_key(self):
+        return self.required('SUPABASE_SERVICE_ROLE_KEY')
+
+    @cached_property
+    def google_calendar_api_url(self):
+        # 로컬 테스트/벤치마크 때 fake_services 로 교체
+        return self.environ.get('GOOGLE_CALENDAR_API_URL', 'https://www.googleapis.com/calendar/v3').rstrip('/')
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    """프로세스 공용 Settings"""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = Settings()
+        return _settings
+
+
+def reset_settings():
+    """환경변수를 바꾼 뒤 다시 읽게 할 때 (테스트/벤치마크용)"""
+    global _settings
+    with _settings_lock:
+        _settings = None
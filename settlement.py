@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+월 정산 (연습실 × 날짜별 매출, 네이버/직접 예약 구분) → CSV / JSON
+
+한 달치 booking_events(+event_prices)를 시작 시각 순으로 한 번만 훑으면서
+날짜가 넘어갈 때마다 그날 행을 바로 내보낸다. (전체를 메모리에 모으지 않음)
+- 정산액: event_prices.calculated_price (수수료 적용 후, 없으면 그 자리에서 계산)
+- 정가: 예약 날짜 price_history 요금으로 계산한 수수료 적용 전 금액
+- 네이버 여부는 설명의 예약번호로 판단 (sync_calendar.is_naver_booking)
+- RECURRENCE_EXPANSION=local 이면 반복 예약은 그 달 회차만 펼쳐서 합산 (recurrence)
+끝난 달 결과는 디스크에 캐시해 두고 다시 받을 때는 파일만 읽는다 (stats_builder 의 frozen 과 같은 기준).
+동기화로 예약이 바뀌면 그 예약이 원래 있던 달과 새로 들어간 달의 캐시를 지운다 (sync_calendar.main 이 구독).
+
+사용법:
+  python3 settlement.py                    # 이번 달 CSV 를 stdout 으로
+  python3 settlement.py 2025 3 --json      # 2025년 3월 JSON
+  python3 settlement.py 2025 3 --refresh   # 캐시 무시하고 다시 계산
+"""
+
+import heapq
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+import price_engine
+import recurrence
+from price_policy import get_price_policy_service
+from stats_builder import KST, ROOM_IDS, month_of, month_range, stored_months, to_utc_iso
+from sync_calendar import fetch_rows, is_naver_booking
+
+SETTLEMENT_CACHE_DIR = os.environ.get(
+    'SETTLEMENT_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.settlement_cache')
+)
+
+SETTLEMENT_COLUMNS = 'id,room_id,start_time,end_time,description,event_prices(calculated_price)'
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json; charset=utf-8',
+}
+
+# 집계 항목 (JSON 키, CSV 헤더)
+FIELDS = (
+    ('bookings', '예약 수'),
+    ('naverBookings', '네이버 예약'),
+    ('directBookings', '직접 예약'),
+    ('hours', '이용 시간'),
+    ('naverGross', '네이버 정가'),
+    ('naverNet', '네이버 정산액'),
+    ('directGross', '직접 정가'),
+    ('directNet', '직접 정산액'),
+    ('gross', '정가 합계'),
+    ('net', '정산 합계'),
+)
+
+
+class Totals:
+    """예약 수 / 이용 초 / 네이버·직접 정가·정산액 누적"""
+
+    __slots__ = ('bookings', 'naver_bookings', 'seconds', 'naver_gross', 'naver_net', 'direct_gross', 'direct_net')
+
+    def __init__(self):
+        self.bookings = self.naver_bookings = self.seconds = 0
+        self.naver_gross = self.naver_net = self.direct_gross = self.direct_net = 0
+
+    def add(self, seconds, gross, net, is_naver):
+        self.bookings += 1
+        self.seconds += seconds
+        if is_naver:
+            self.naver_bookings += 1
+            self.naver_gross += gross
+            self.naver_net += net
+        else:
+            self.direct_gross += gross
+            self.direct_net += net
+
+    def merge(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self):
+        return {
+            'bookings': self.bookings,
+            'naverBookings': self.naver_bookings,
+            'directBookings': self.bookings - self.naver_bookings,
+            'hours': round(self.seconds / 3600, 2),
+            'naverGross': self.naver_gross,
+            'naverNet': self.naver_net,
+            'directGross': self.direct_gross,
+            'directNet': self.direct_net,
+            'gross': self.naver_gross + self.direct_gross,
+            'net': self.naver_net + self.direct_net,
+        }
+
+
+def stream_month_bookings(year, month):
+    """해당 월(KST)에 시작하는 예약 + 계산된 가격 (시작 시각 순)
+
+    RECURRENCE_EXPANSION=local 이면 그 달 반복 예약 회차를 펼쳐 시작 시각 순으로 끼워 넣음
+    (회차는 event_prices 가 없어 booking_amounts 에서 그 자리에서 계산)
+    """
+    start, end = month_range(year, month)
+    params = {
+        'select': SETTLEMENT_COLUMNS,
+        'and': f'(start_time.gte.{to_utc_iso(start)},start_time.lt.{to_utc_iso(end)})',
+        'order': 'start_time,id',
+    }
+    rows = fetch_rows('booking_events', params)
+    instances = recurrence.window_instances(start, end)
+    yield from heapq.merge(rows, instances, key=lambda row: price_engine.to_epoch(row['start_time']))
+
+
+def booking_amounts(service, row):
+    """(KST 날짜 ordinal, 이용 초, 정가, 정산액, 네이버 여부)"""
+    start = price_engine.to_epoch(row['start_time'])
+    end = price_engine.to_epoch(row['end_time'])
+    is_naver = is_naver_booking(row.get('description'))
+    policy = service.policy_for_booking(row['room_id'], start)
+    gross = round(price_engine.gross_price(start, end, policy.tariff)) if policy else 0
+
+    prices = row.get('event_prices') or {}
+    # 1:1 관계라 객체지만, 배열로 오는 경우도 처리
+    if isinstance(prices, list):
+        prices = prices[0] if prices else {}
+    net = prices.get('calculated_price')
+    if net is None:
+        # 아직 가격이 계산 안 된 예약 (price_materializer 실행 전)
+        net = price_engine.price_booking(start, end, policy.tariff, is_naver) if policy else 0
+    day = price_engine.EPOCH_ORDINAL + int((start + price_engine.KST_OFFSET) // price_engine.DAY_SECONDS)
+    return day, end - start, gross, int(net), is_naver
+
+
+def settle_month(year, month, rows=None):
+    """정산 generator: 날짜마다 ('day', 'YYYY-MM-DD', {room: Totals}, Totals), 끝에 ('month', {room: Totals}, Totals)
+
+    rows 를 안 주면 booking_events 에서 시작 시각 순으로 읽음. 예약이 없는 날도 빈 행으로 나옴.
+    """
+    service = get_price_policy_service()
+    rows = stream_month_bookings(year, month) if rows is None else rows
+    first_day = datetime(year, month, 1).toordinal()
+    last_day = datetime(year + (month == 12), month % 12 + 1, 1).toordinal()
+
+    room_totals = {room_id: Totals() for room_id in ROOM_IDS}
+    month_total = Totals()
+    current = first_day
+    day_rooms = {}
+
+    def close_day(ordinal):
+        day_total = Totals()
+        for room_id, totals in day_rooms.items():
+            day_total.merge(totals)
+            room_totals[room_id].merge(totals)
+        month_total.merge(day_total)
+        rooms = {room_id: day_rooms[room_id] for room_id in ROOM_IDS if room_id in day_rooms}
+        return 'day', datetime.fromordinal(ordinal).strftime('%Y-%m-%d'), rooms, day_total
+
+    for row in rows:
+        if row.get('room_id') not in room_totals:
+            continue
+        day, seconds, gross, net, is_naver = booking_amounts(service, row)
+        if not first_day <= day < last_day:
+            continue
+        while current < day:
+            yield close_day(current)
+            day_rooms = {}
+            current += 1
+        totals = day_rooms.get(row['room_id'])
+        if totals is None:
+            totals = day_rooms[row['room_id']] = Totals()
+        totals.add(seconds, gross, net, is_naver)
+
+    while current < last_day:
+        yield close_day(current)
+        day_rooms = {}
+        current += 1
+    yield 'month', room_totals, month_total
+
+
+def is_closed(year, month, now=None):
+    """이미 끝난 달인지 (KST 기준)"""
+    now = now or datetime.now(KST)
+    return (year, month) < (now.year, now.month)
+
+
+def render_csv(year, month, entries):
+    """CSV 문자열 조각 generator (엑셀에서 한글이 깨지지 않도록 BOM 포함)"""
+    yield '\ufeff' + ','.join(['날짜', '연습실'] + [header for _, header in FIELDS]) + '\n'
+
+    def line(label, room, totals):
+        values = totals.to_dict()
+        return ','.join([label, room] + [str(values[key]) for key, _ in FIELDS]) + '\n'
+
+    for entry in entries:
+        if entry[0] == 'day':
+            _, label, rooms, _ = entry
+            chunk = ''.join(line(label, f'{room_id.upper()}홀', totals) for room_id, totals in rooms.items())
+            if chunk:
+                yield chunk
+        else:
+            _, room_totals, month_total = entry
+            yield ''.join(line('합계', f'{room_id.upper()}홀', totals) for room_id, totals in room_totals.items())
+            yield line('합계', '전체', month_total)
+
+
+def render_json(year, month, entries):
+    """JSON 문자열 조각 generator (날짜 배열을 하루씩 이어 씀)"""
+    meta = {
+        'year': year,
+        'month': month,
+        'frozen': is_closed(year, month),
+        'generatedAt': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+    yield json.dumps(meta, ensure_ascii=False)[:-1] + ', "days": ['
+    separator = ''
+    for entry in entries:
+        if entry[0] == 'day':
+            _, label, rooms, day_total = entry
+            day = {
+                'date': label,
+                'rooms': {room_id: totals.to_dict() for room_id, totals in rooms.items()},
+                'total': day_total.to_dict(),
+            }
+            yield separator + json.dumps(day, ensure_ascii=False)
+            separator = ', '
+        else:
+            _, room_totals, month_total = entry
+            rooms = {room_id: totals.to_dict() for room_id, totals in room_totals.items()}
+            yield '], "rooms": ' + json.dumps(rooms, ensure_ascii=False)
+            yield ', "total": ' + json.dumps(month_total.to_dict(), ensure_ascii=False) + '}'
+
+
+RENDERERS = {'csv': render_csv, 'json': render_json}
+
+
+def cache_path(year, month, fmt):
+    return os.path.join(SETTLEMENT_CACHE_DIR, f'{year}-{month:02d}.{fmt}')
+
+
+def iter_cached(path, chunk_size=64 * 1024):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+# (year, month) → 캐시 무효화 횟수: 계산하는 동안 그 달이 바뀌었으면 결과를 캐시로 남기지 않음
+_generations = {}
+# 지금 캐시 파일을 만들고 있는 (year, month) 별 개수
+_writing = Counter()
+_cache_lock = threading.Lock()
+# 기록 직전에 찾아 둔, 바뀔 예약이 원래 있던 달 (room_id → (year, month) 집합)
+_stale_months = {}
+
+
+def _write_through(path, chunks, key):
+    """chunks 를 그대로 내보내면서 임시 파일에 기록, 끝까지 가면 캐시 파일로 교체
+
+    그 사이 key 달이 무효화되면 (동기화 변경) 결과는 내보내기만 하고 캐시로 남기지 않음
+    """
+    with _cache_lock:
+        generation = _generations.get(key, 0)
+        _writing[key] += 1
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        with _cache_lock:
+            if _generations.get(key, 0) == generation:
+                os.replace(tmp_path, path)
+    finally:
+        with _cache_lock:
+            _writing[key] -= 1
+            if not _writing[key]:
+                del _writing[key]
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def cached_months():
+    """디스크 캐시가 있는 (year, month) 집합"""
+    try:
+        names = os.listdir(SETTLEMENT_CACHE_DIR)
+    except FileNotFoundError:
+        return set()
+    months = set()
+    for name in names:
+        stem, _, fmt = name.partition('.')
+        if fmt in RENDERERS:
+            year, month = stem.split('-')
+            months.add((int(year), int(month)))
+    return months
+
+
+def invalidate_months(months):
+    """해당 달 캐시 파일 삭제 (다음 요청에서 새로 계산)"""
+    with _cache_lock:
+        for key in months:
+            _generations[key] = _generations.get(key, 0) + 1
+            for fmt in RENDERERS:
+                try:
+                    os.remove(cache_path(*key, fmt))
+                except FileNotFoundError:
+                    pass
+
+
+def before_sync_changes(room_id, records, deleted_ids):
+    """sync_calendar 기록 직전: 바뀌거나 지워질 예약이 원래 있던 달을 찾아 둠 (캐시가 없으면 조회 안 함)"""
+    with _cache_lock:
+        writing = bool(_writing)
+    if not writing and not cached_months():
+        return
+    event_ids = list(deleted_ids) + [record['google_event_id'] for record in records]
+    _stale_months[room_id] = stored_months(event_ids)
+
+
+def on_sync_changes(room_id, records, deleted_ids):
+    """sync_calendar 변경 알림: 예약이 원래 있던 달과 새로 들어간 달의 캐시 무효화"""
+    months = _stale_months.pop(room_id, set())
+    months.update(month_of(price_engine.to_epoch(record['start_time'])) for record in records)
+    invalidate_months(months)
+
+
+def settlement_chunks(year, month, fmt='csv', refresh=False):
+    """정산 결과 bytes 조각 generator (끝난 달은 디스크 캐시 사용/저장)"""
+    if fmt not in RENDERERS:
+        raise ValueError(f'지원하지 않는 형식: {fmt!r} (csv, json)')
+    if not 1 <= month <= 12:
+        raise ValueError(f'잘못된 월: {month}')
+    closed = is_closed(year, month)
+    path = cache_path(year, month, fmt)
+    if closed and not refresh and os.path.exists(path):
+        return iter_cached(path)
+    chunks = (text.encode('utf-8') for text in RENDERERS[fmt](year, month, settle_month(year, month)))
+    return _write_through(path, chunks, (year, month)) if closed else chunks
+
+
+if __name__ == '__main__':
+    import sys
+    args = sys.argv[1:]
+    fmt = 'json' if '--json' in args else 'csv'
+    numbers = [int(a) for a in args if not a.startswith('--')]
+    now = datetime.now(KST)
+    year, month = numbers if len(numbers) == 2 else (now.year, now.month)
+    for chunk in settlement_chunks(year, month, fmt, refresh='--refresh' in args):
+        sys.stdout.buffer.write(chunk)
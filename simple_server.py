@@ -2,17 +2,29 @@
 import os
 import sys
 import json
+import shutil
 import subprocess
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+from availability import get_availability_index, parse_duration, parse_time
+from static_cache import StaticFileCache, etag_matches
+from sync_jobs import get_sync_manager, handle_google_notification
+from week_index import get_week_index, kst_iso
+
+# 개발 모드: 캐시 완전 비활성화 (예전 동작). --dev 또는 SERVER_DEV=1
+DEV_MODE = '--dev' in sys.argv or os.environ.get('SERVER_DEV') == '1'
 
 class UnifiedHandler(SimpleHTTPRequestHandler):
-    sync_script: str = ''
     watch_script: str = ''
+    dev_mode: bool = DEV_MODE
+    static_cache = StaticFileCache()
     
-    # ETag 완전 비활성화 (캐싱 방지)
     def send_header(self, keyword, value):
-        # ETag와 Last-Modified 헤더 차단
-        if keyword.lower() not in ('etag', 'last-modified'):
+        # 개발 모드: ETag와 Last-Modified 헤더 차단 (캐싱 방지)
+        if not self.dev_mode or keyword.lower() not in ('etag', 'last-modified'):
             SimpleHTTPRequestHandler.send_header(self, keyword, value)
     
     def do_OPTIONS(self):
@@ -22,51 +34,71 @@ class UnifiedHandler(SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
     
+    def send_json(self, status, data):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(data, ensure_ascii=False).encode())
+    
+    def send_chunked(self, status, content_type, chunks, filename=None):
+        """bytes 조각을 Transfer-Encoding: chunked 로 전송 (HTTP/1.0 요청이면 연결 종료로 끝 표시)"""
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            # 이 응답만 HTTP/1.1 로 보내고 연결은 닫음
+            self.protocol_version = 'HTTP/1.1'
+        self.close_connection = True
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Connection', 'close')
+        if filename:
+            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if chunked:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            else:
+                self.wfile.write(chunk)
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+    
+    def read_json_body(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        if content_length <= 0:
+            return {}
+        body = self.rfile.read(content_length)
+        try:
+            data = json.loads(body.decode('utf-8'))
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    
     def do_POST(self):
         if self.path == '/api/sync':
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            # 동기화는 백그라운드 worker 에서 실행, job id 바로 반환
+            # (대기 중인 job 이 있으면 그 job 에 합쳐짐)
+            data = self.read_json_body()
+            job = get_sync_manager().submit(data.get('rooms'), full=bool(data.get('full')))
             
-            try:
-                # 요청 body에서 선택된 연습실 확인
-                content_length = int(self.headers.get('Content-Length', 0))
-                selected_rooms = None
-                
-                if content_length > 0:
-                    body = self.rfile.read(content_length)
-                    try:
-                        data = json.loads(body.decode('utf-8'))
-                        selected_rooms = data.get('rooms')
-                    except:
-                        pass
-                
-                # Python 스크립트 실행
-                cmd = [sys.executable, self.sync_script]
-                if selected_rooms:
-                    cmd.extend(selected_rooms)
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=300
-                )
-                
-                response = {
-                    'success': result.returncode == 0,
-                    'output': result.stdout,
-                    'error': result.stderr
-                }
-                
-            except Exception as e:
-                response = {
-                    'success': False,
-                    'error': str(e)
-                }
+            if data.get('wait'):
+                # 예전처럼 끝날 때까지 기다린 뒤 결과 반환
+                job.done.wait(timeout=300)
+                self.send_json(200, job.to_dict())
+            else:
+                self.send_json(202, dict(job.to_dict(), success=True))
             
-            self.wfile.write(json.dumps(response).encode())
+        elif self.path == '/api/google-webhook':
+            # Google Calendar push 알림 → 해당 연습실만 모아서 증분 동기화
+            response = handle_google_notification(
+                self.headers.get('X-Goog-Channel-Token'),
+                self.headers.get('X-Goog-Resource-State'),
+            )
+            self.send_json(200, response)
             
         elif self.path == '/api/setup-watches':
             self.send_response(200)
@@ -100,16 +132,162 @@ class UnifiedHandler(SimpleHTTPRequestHandler):
             self.send_error(404)
     
     def end_headers(self):
+        path = urlsplit(self.path).path
         # 이미지 및 폰트 파일: 긴 캐시 (1년)
-        if self.path.endswith(('.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2', '.ttf', '.eot')):
+        if path.endswith(('.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2', '.ttf', '.eot')):
             self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
-        # CSS, JS, HTML 파일: 캐시 방지 (개발 중)
-        elif self.path.endswith(('.css', '.js', '.html')):
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
+        # CSS, JS, HTML 파일: 개발 모드는 캐시 방지, 운영 모드는 ETag 로 매번 재검증
+        elif path.endswith(('.css', '.js', '.html')) or path.endswith('/'):
+            if self.dev_mode:
+                self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+                self.send_header('Pragma', 'no-cache')
+                self.send_header('Expires', '0')
+            else:
+                self.send_header('Cache-Control', 'no-cache')
         SimpleHTTPRequestHandler.end_headers(self)
     
+    def static_file_path(self):
+        """요청 경로 → 보낼 파일 (디렉토리는 index.html, 없으면 None)"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not urlsplit(self.path).path.endswith('/'):
+                return None  # 슬래시 리다이렉트는 기본 핸들러에 맡김
+            path = os.path.join(path, 'index.html')
+        return path if os.path.isfile(path) else None
+    
+    def send_static(self, head_only=False):
+        """운영 모드 정적 파일: 내용 해시 ETag + 304, 미리 압축한 .br/.gz, 메모리 LRU"""
+        path = self.static_file_path()
+        if path is None:
+            return SimpleHTTPRequestHandler.do_HEAD(self) if head_only else SimpleHTTPRequestHandler.do_GET(self)
+        
+        try:
+            variant, encoding = self.static_cache.pick_variant(path, self.headers.get('Accept-Encoding'))
+            entry = self.static_cache.get(variant, encoding)
+        except OSError:
+            self.send_error(404, 'File not found')
+            return
+        
+        if etag_matches(self.headers.get('If-None-Match'), entry.etag):
+            self.send_response(304)
+            self.send_header('ETag', entry.etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(entry.size))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', entry.etag)
+        self.send_header('Last-Modified', formatdate(entry.mtime / 1e9, usegmt=True))
+        self.end_headers()
+        if head_only:
+            return
+        if entry.body is not None:
+            self.wfile.write(entry.body)
+        else:
+            # 큰 파일은 메모리에 올리지 않고 그대로 전송
+            with open(variant, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile)
+    
+    def send_week_events(self):
+        """주간 예약 (메모리 인덱스에서 응답, Google 호출 없음)
+        
+        ?start=<해당 주 아무 시각>&rooms=a,b (get-week-events 의 startDate/roomIds 도 허용)
+        """
+        query = parse_qs(urlsplit(self.path).query)
+        # 인코딩 안 된 '+09:00' 은 쿼리 파싱에서 공백이 됨
+        start = (query.get('start') or query.get('startDate') or [''])[0].replace(' ', '+')
+        rooms = (query.get('rooms') or query.get('roomIds') or [''])[0]
+        if not start:
+            self.send_json(400, {'success': False, 'error': 'Missing required parameter: start'})
+            return
+        try:
+            room_ids = [r.strip() for r in rooms.split(',') if r.strip()] or None
+            week_start, week_end, events = get_week_index().week_events(start, room_ids)
+        except ValueError as e:
+            self.send_json(400, {'success': False, 'error': str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {'success': False, 'error': str(e)})
+            return
+        self.send_json(200, {
+            'success': True,
+            'startDate': kst_iso(week_start),
+            'endDate': kst_iso(week_end),
+            'events': events,
+        })
+    
+    def send_availability(self):
+        """연습실별 빈 시간 + 견적 (메모리 인덱스에서 응답)
+        
+        ?from=<시각|날짜>&to=<시각|날짜>&min_duration=<분|HH:MM>&rooms=a,b
+        날짜만 주면 KST 기준 from 은 그날 0시, to 는 그날 끝까지
+        """
+        query = parse_qs(urlsplit(self.path).query)
+        # 인코딩 안 된 '+09:00' 은 쿼리 파싱에서 공백이 됨
+        start = (query.get('from') or [''])[0].replace(' ', '+')
+        end = (query.get('to') or [''])[0].replace(' ', '+')
+        if not start or not end:
+            self.send_json(400, {'success': False, 'error': 'Missing required parameter: from, to'})
+            return
+        try:
+            start_epoch = parse_time(start)
+            end_epoch = parse_time(end, end=True)
+            min_duration = parse_duration((query.get('min_duration') or [''])[0])
+            rooms = (query.get('rooms') or [''])[0]
+            room_ids = [r.strip() for r in rooms.split(',') if r.strip()] or None
+            slots = get_availability_index().availability(start_epoch, end_epoch, min_duration, room_ids)
+        except ValueError as e:
+            self.send_json(400, {'success': False, 'error': str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {'success': False, 'error': str(e)})
+            return
+        self.send_json(200, {
+            'success': True,
+            'from': kst_iso(start_epoch),
+            'to': kst_iso(end_epoch),
+            'minDuration': min_duration // 60,
+            'rooms': slots,
+        })
+    
+    def send_settlement(self):
+        """월 정산 CSV/JSON 다운로드 (끝난 달은 디스크 캐시)
+        
+        ?month=YYYY-MM&format=csv|json[&refresh=1]
+        """
+        import settlement
+        
+        query = parse_qs(urlsplit(self.path).query)
+        month = (query.get('month') or [''])[0]
+        fmt = (query.get('format') or ['csv'])[0]
+        try:
+            year, month = (int(part) for part in month.split('-'))
+            chunks = iter(settlement.settlement_chunks(year, month, fmt, refresh=bool(query.get('refresh'))))
+            # 첫 조각까지 만들어 봐야 조회 오류를 500 으로 돌려줄 수 있음
+            first = next(chunks, b'')
+        except ValueError as e:
+            self.send_json(400, {'success': False, 'error': f'month=YYYY-MM 과 format=csv|json 이 필요합니다 ({e})'})
+            return
+        except Exception as e:
+            self.send_json(500, {'success': False, 'error': str(e)})
+            return
+        
+        def body():
+            yield first
+            yield from chunks
+        
+        self.send_chunked(200, settlement.FORMATS[fmt], body(), f'settlement-{year}-{month:02d}.{fmt}')
+    
+    def do_HEAD(self):
+        if self.dev_mode:
+            return SimpleHTTPRequestHandler.do_HEAD(self)
+        self.send_static(head_only=True)
+    
     def do_GET(self):
         if self.path == '/api/health':
             self.send_response(200)
@@ -117,8 +295,30 @@ class UnifiedHandler(SimpleHTTPRequestHandler):
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             self.wfile.write(json.dumps({'status': 'ok'}).encode())
-        else:
+        elif self.path.startswith('/api/sync/'):
+            job = get_sync_manager().get(self.path[len('/api/sync/'):])
+            if job is None:
+                self.send_json(404, {'success': False, 'error': 'job not found'})
+            else:
+                self.send_json(200, job.to_dict())
+        elif self.path == '/api/metrics':
+            # Prometheus 수집용 (동기화는 이 프로세스의 worker 에서 돌므로 같은 값)
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith('/api/week-events'):
+            self.send_week_events()
+        elif self.path.startswith('/api/availability'):
+            self.send_availability()
+        elif self.path.startswith('/api/settlement'):
+            self.send_settlement()
+        elif self.dev_mode:
             return SimpleHTTPRequestHandler.do_GET(self)
+        else:
+            self.send_static()
 
 if __name__ == '__main__':
     # 스크립트 절대 경로 저장
@@ -126,14 +326,19 @@ if __name__ == '__main__':
     base_path = pathlib.Path(__file__).parent
     
     # UnifiedHandler에서 사용할 수 있도록 클래스 변수로 설정
-    UnifiedHandler.sync_script = str(base_path / 'sync_calendar.py')
     UnifiedHandler.watch_script = str(base_path / 'reset_watches.py')
     
     os.chdir('www')
-    server = HTTPServer(('0.0.0.0', 5000), UnifiedHandler)
-    print('Server started on port 5000')
+    server = ThreadingHTTPServer(('0.0.0.0', 5000), UnifiedHandler)
+    print(f'Server started on port 5000 ({"dev: 캐시 비활성화" if DEV_MODE else "production: ETag/압축/메모리 캐시"})')
     print('API endpoints:')
-    print('  POST /api/sync - 동기화 실행')
+    print('  POST /api/sync - 동기화 시작 (job id 반환)')
+    print('  GET /api/sync/<job_id> - 동기화 진행 상황')
+    print('  GET /api/week-events?start=... - 주간 예약 (메모리 인덱스)')
+    print('  GET /api/settlement?month=YYYY-MM&format=csv|json - 월 정산 다운로드')
+    print('  GET /api/availability?from=...&to=...&min_duration=... - 연습실별 빈 시간 + 견적')
+    print('  POST /api/google-webhook - Google push 알림 (연습실별 증분 동기화)')
     print('  POST /api/setup-watches - Watch 채널 재설정')
+    print('  GET /api/metrics - 동기화/HTTP 계측 (Prometheus)')
     print('  GET /api/health - 헬스 체크')
     server.serve_forever()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+정적 파일 캐시 (simple_server 운영 모드용)
+
+- 파일 내용 해시로 ETag 생성 (파일 버전당 한 번만 계산)
+- 미리 압축해 둔 .br / .gz 파일이 있으면 Accept-Encoding 에 맞춰 선택
+- 작은 파일은 메모리 LRU 에 본문까지 보관
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# 메모리에 본문까지 올릴 최대 파일 크기 / 전체 용량 / 항목 수
+MAX_CACHED_FILE = 1024 * 1024
+MAX_CACHE_BYTES = int(os.environ.get('STATIC_CACHE_BYTES', str(32 * 1024 * 1024)))
+MAX_ENTRIES = 4096
+
+# 선호 순서대로 (Content-Encoding, 파일 확장자)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class StaticEntry:
+    __slots__ = ('path', 'encoding', 'size', 'mtime', 'etag', 'body')
+
+    def __init__(self, path, encoding, size, mtime, etag, body):
+        self.path = path
+        self.encoding = encoding
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+        self.body = body
+
+
+def accepted_encodings(header):
+    """Accept-Encoding 헤더 → 허용 인코딩 집합 (q=0 제외)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticFileCache:
+    """(경로, 인코딩) → StaticEntry LRU"""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES, max_entries=MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def pick_variant(self, path, accept_encoding):
+        """보낼 파일 선택: 원본보다 새로운 압축본이 있고 클라이언트가 받으면 그것"""
+        accepted = accepted_encodings(accept_encoding)
+        original_mtime = os.stat(path).st_mtime_ns
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                stat = os.stat(path + suffix)
+            except OSError:
+                continue
+            if stat.st_mtime_ns >= original_mtime:
+                return path + suffix, encoding
+        return path, None
+
+    def get(self, path, encoding=None):
+        """파일 메타데이터/본문 (파일이 바뀌었으면 다시 읽음)"""
+        stat = os.stat(path)
+        key = (path, encoding)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.mtime == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.entries.move_to_end(key)
+                return entry
+
+        digest = hashlib.sha1()
+        body = bytearray() if stat.st_size <= MAX_CACHED_FILE else None
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(chunk)
+                if body is not None:
+                    body += chunk
+        etag = f'"{digest.hexdigest()[:20]}{"-" + encoding if encoding else ""}"'
+        entry = StaticEntry(path, encoding, stat.st_size, stat.st_mtime_ns, etag,
+                            bytes(body) if body is not None else None)
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None and old.body is not None:
+                self.bytes -= len(old.body)
+            self.entries[key] = entry
+            if entry.body is not None:
+                self.bytes += len(entry.body)
+            while self.entries and (self.bytes > self.max_bytes or len(self.entries) > self.max_entries):
+                _, evicted = self.entries.popitem(last=False)
+                if evicted.body is not None:
+                    self.bytes -= len(evicted.body)
+        return entry
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return etag in tags or f'W/{etag}' in tags
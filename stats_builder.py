@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+월별 통계 → stats_cache 저장
+
+한 달치 booking_events(+event_prices)를 페이지 단위로 한 번만 훑으면서
+연습실 × 시간대(KST) 배열에 매출, 예약 수, 이용 시간을 누적하고
+stats_cache 에 monthly / room / hourly 세 종류로 upsert 한다.
+지난달 통계는 frozen 으로 저장되어 다시 계산하지 않는다.
+동기화와 함께 돌 때는 (sync_calendar --stats) 이번 달 누적 배열을 메모리에 두고 변경분만 더하고 빼며,
+끝난 달에 수정/취소가 들어오면 그 달만 다시 계산해 frozen 으로 덮어쓴다 (MonthStats).
+
+사용법:
+  python3 stats_builder.py                 # 이번 달 갱신 (+ 아직 없는 지난달)
+  python3 stats_builder.py 2025            # 2025년 전체 (frozen 달은 건너뜀)
+  python3 stats_builder.py 2025 3          # 2025년 3월
+  python3 stats_builder.py 2025 --rebuild  # frozen 무시하고 다시 계산
+"""
+
+import calendar
+import threading
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+
+import http_client
+import price_engine
+import recurrence
+from price_policy import get_price_policy_service
+from settings import get_settings
+from sync_calendar import (
+    DELETE_BATCH_SIZE, ROOMS,
+    add_before_change_listener, add_change_listener, add_recurring_listener,
+    chunked, fetch_rows, is_naver_booking, supabase_headers,
+)
+
+KST = timezone(timedelta(hours=9))
+ROOM_IDS = [room['id'] for room in ROOMS]
+HOURS = 24
+
+
+def month_range(year, month):
+    """KST 기준 해당 월 [시작, 끝) epoch 초"""
+    start = datetime(year, month, 1, tzinfo=KST)
+    end = datetime(year + (month == 12), month % 12 + 1, 1, tzinfo=KST)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def to_utc_iso(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def month_of(epoch):
+    """epoch 초가 속한 KST (year, month)"""
+    moment = datetime.fromtimestamp(epoch, KST)
+    return moment.year, moment.month
+
+
+class MonthAccumulator:
+    """연습실 × 시간대 누적 배열 (index = room_index * 24 + hour)"""
+
+    def __init__(self, year, month):
+        self.year = year
+        self.month = month
+        self.start, self.end = month_range(year, month)
+        self.days = calendar.monthrange(year, month)[1]
+        size = len(ROOM_IDS) * HOURS
+        self.revenue = array('q', [0]) * size
+        self.bookings = array('q', [0]) * size
+        self.occupied = array('q', [0]) * size   # 이용 초
+        self.by_price_type = [{} for _ in ROOM_IDS]
+        self.price_type_counts = [{} for _ in ROOM_IDS]
+        self.room_index = {room_id: i for i, room_id in enumerate(ROOM_IDS)}
+
+    def add(self, room_id, start, end, price, price_type=None, sign=1):
+        """예약 하나 누적 (sign=-1 이면 예전에 더한 같은 값을 뺌)"""
+        room = self.room_index.get(room_id)
+        if room is None:
+            return
+        base = room * HOURS
+        start_hour = int((start + price_engine.KST_OFFSET) // 3600 % HOURS)
+        self.revenue[base + start_hour] += sign * price
+        self.bookings[base + start_hour] += sign
+        kind = price_type or '일반'
+        counts = self.price_type_counts[room]
+        counts[kind] = counts.get(kind, 0) + sign
+        if counts[kind]:
+            self.by_price_type[room][kind] = self.by_price_type[room].get(kind, 0) + sign * price
+        else:
+            # 그 타입 예약이 다 빠지면 처음부터 만든 것과 같도록 키도 없앰
+            del counts[kind]
+            self.by_price_type[room].pop(kind, None)
+
+        # 이용 시간은 이번 달 범위 안에서 시간대별로 나눠 누적
+        t = max(start, self.start)
+        stop = min(end, self.end)
+        while t < stop:
+            next_hour = (t // 3600 + 1) * 3600
+            hour = int((t + price_engine.KST_OFFSET) // 3600 % HOURS)
+            self.occupied[base + hour] += sign * (min(next_hour, stop) - t)
+            t = next_hour
+
+    def room_totals(self, values, room):
+        base = room * HOURS
+        return sum(values[base:base + HOURS])
+
+    def build(self, frozen):
+        """stats_cache 에 넣을 stat_type → data"""
+        month_seconds = self.days * 86400
+        hour_seconds = self.days * 3600
+        rooms = {}
+        for i, room_id in enumerate(ROOM_IDS):
+            revenue = self.room_totals(self.revenue, i)
+            bookings = self.room_totals(self.bookings, i)
+            occupied = self.room_totals(self.occupied, i)
+            rooms[room_id] = {
+                'name': f'{room_id.upper()}홀',
+                'bookings': bookings,
+                'revenue': revenue,
+                'averagePrice': round(revenue / bookings) if bookings else 0,
+                'hours': round(occupied / 3600, 2),
+                'occupancy': round(occupied / month_seconds, 4),
+                'byPriceType': self.by_price_type[i],
+            }
+
+        hourly = []
+        for hour in range(HOURS):
+            cells = [i * HOURS + hour for i in range(len(ROOM_IDS))]
+            occupied = sum(self.occupied[c] for c in cells)
+            hourly.append({
+                'hour': hour,
+                'revenue': sum(self.revenue[c] for c in cells),
+                'bookings': sum(self.bookings[c] for c in cells),
+                'occupancy': round(occupied / (hour_seconds * len(ROOM_IDS)), 4),
+                'byRoom': {room_id: self.revenue[i * HOURS + hour] for i, room_id in enumerate(ROOM_IDS)},
+            })
+
+        total_revenue = sum(self.revenue)
+        total_bookings = sum(self.bookings)
+        monthly = {
+            'year': self.year,
+            'month': self.month,
+            'revenue': total_revenue,
+            'bookings': total_bookings,
+            'averagePrice': round(total_revenue / total_bookings) if total_bookings else 0,
+            'hours': round(sum(self.occupied) / 3600, 2),
+            'occupancy': round(sum(self.occupied) / (month_seconds * len(ROOM_IDS)), 4),
+            'byRoom': {room_id: rooms[room_id]['revenue'] for room_id in ROOM_IDS},
+        }
+
+        meta = {'frozen': frozen, 'generated_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+        return {
+            'monthly': dict(monthly, **meta),
+            'room': dict(rooms=rooms, **meta),
+            'hourly': dict(hours=hourly, **meta),
+        }
+
+
+def stream_month_events(year, month):
+    """해당 월(KST)에 시작하는 예약 + 계산된 가격
+
+    RECURRENCE_EXPANSION=local 이면 그 달에 시작하는 반복 예약 회차도 (가격은 그 자리에서 계산)
+    """
+    start, end = month_range(year, month)
+    params = {
+        'select': 'id,google_event_id,room_id,start_time,end_time,description,event_prices(calculated_price,price_type)',
+        'and': f'(start_time.gte.{to_utc_iso(start)},start_time.lt.{to_utc_iso(end)})',
+        'order': 'id',
+    }
+    yield from fetch_rows('booking_events', params)
+    for record in recurrence.window_instances(start, end, prices=True):
+        if start <= price_engine.to_epoch(record['start_time']) < end:
+            yield record
+
+
+def row_contribution(service, row):
+    """누적 배열에 더할 (room_id, 시작, 종료, 가격, 가격 타입)
+
+    event_prices 가 아직 없으면 (price_materializer 실행 전, 동기화 변경분) 그 자리에서 계산
+    """
+    start = price_engine.to_epoch(row['start_time'])
+    end = price_engine.to_epoch(row['end_time'])
+    prices = row.get('event_prices') or {}
+    # 1:1 관계라 객체지만, 배열로 오는 경우도 처리
+    if isinstance(prices, list):
+        prices = prices[0] if prices else {}
+    price = prices.get('calculated_price')
+    if price is None:
+        price = service.price_booking(row['room_id'], start, end, is_naver_booking(row.get('description')))
+        return row['room_id'], start, end, int(price), price_engine.price_type(start, end)
+    return row['room_id'], start, end, int(price), prices.get('price_type')
+
+
+def load_month(year, month):
+    """(누적 배열, booking_events 예약별 누적분 {google_event_id: row_contribution})"""
+    service = get_price_policy_service()
+    acc = MonthAccumulator(year, month)
+    entries = {}
+    for row in stream_month_events(year, month):
+        contribution = row_contribution(service, row)
+        acc.add(*contribution)
+        # 반복 예약 회차(id 없음)는 recurring_events 가 바뀌면 달 전체를 다시 적재
+        if 'id' in row:
+            entries[row['google_event_id']] = contribution
+    return acc, entries
+
+
+def build_month(year, month, frozen=False):
+    return load_month(year, month)[0].build(frozen)
+
+
+def stored_months(google_event_ids):
+    """booking_events 에 지금 저장된 예약들이 시작하는 (year, month) 집합"""
+    months = set()
+    for batch in chunked(list(google_event_ids), DELETE_BATCH_SIZE):
+        id_list = ','.join(f'"{event_id}"' for event_id in batch)
+        params = {'select': 'start_time', 'google_event_id': f'in.({id_list})', 'order': 'id'}
+        for row in fetch_rows('booking_events', params):
+            months.add(month_of(price_engine.to_epoch(row['start_time'])))
+    return months
+
+
+def frozen_months(year):
+    """stats_cache 에 frozen 으로 저장된 (year, month) 목록"""
+    response = http_client.get(
+        f'{get_settings().supabase_url}/rest/v1/stats_cache',
+        headers=supabase_headers(),
+        params={'select': 'month', 'year': f'eq.{year}', 'stat_type': 'eq.monthly', 'data->>frozen': 'eq.true'},
+    )
+    response.raise_for_status()
+    return {(year, row['month']) for row in response.json()}
+
+
+def upsert_stats(year, month, stats):
+    url = f'{get_settings().supabase_url}/rest/v1/stats_cache?on_conflict=year,month,stat_type'
+    headers = dict(supabase_headers(), Prefer='resolution=merge-duplicates,return=minimal')
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    records = [
+        {'year': year, 'month': month, 'stat_type': stat_type, 'data': data, 'updated_at': now}
+        for stat_type, data in stats.items()
+    ]
+    response = http_client.post(url, headers=headers, json=records)
+    response.raise_for_status()
+
+
+def refresh_months(months, rebuild=False, now=None):
+    """여러 달 통계 갱신 (끝난 달은 frozen 으로 저장, 이미 frozen 이면 건너뜀)"""
+    now = now or datetime.now(KST)
+    current = (now.year, now.month)
+    skip = set()
+    if not rebuild:
+        for year in {y for y, _ in months}:
+            skip |= frozen_months(year)
+
+    built = []
+    for year, month in sorted(months):
+        if (year, month) > current or (year, month) in skip:
+            continue
+        closed = (year, month) < current
+        upsert_stats(year, month, build_month(year, month, frozen=closed))
+        built.append((year, month))
+    return built
+
+
+class MonthStats:
+    """동기화 변경분을 이번 달 누적 배열에 바로 반영하고, 바뀐 다른 달을 모아 둠
+
+    - 이번 달: 예약별 누적분을 들고 있다가 바뀌거나 지워지면 예전 값을 빼고 새 값을 더함
+      → 처음 한 번만 한 달을 훑고, 그 뒤 갱신은 변경분만큼만 일함
+    - 다른 달: 예약이 원래 있던 달(기록 전에 조회)과 새로 들어간 달을 changed 에 모음
+      → refresh 때 끝난 달은 다시 계산해 frozen 으로 덮어씀 (늦은 수정/취소도 반영)
+    변경 알림을 구독하므로 동기화 전에 만들어야 함 (get_month_stats)
+    """
+
+    def __init__(self):
+        self.accumulator = None
+        self.entries = {}
+        self.changed = set()
+        self._lock = threading.Lock()
+
+    def before_changes(self, room_id, records, deleted_ids):
+        """이번 달 누적분에 없는 예약은 지워지거나 옮겨지기 전에 원래 달을 읽어 둠"""
+        event_ids = chain(deleted_ids, (record['google_event_id'] for record in records))
+        with self._lock:
+            unknown = [event_id for event_id in event_ids if event_id not in self.entries]
+        if unknown:
+            months = stored_months(unknown)
+            with self._lock:
+                self.changed |= months
+
+    def on_changes(self, room_id, records, deleted_ids):
+        service = get_price_policy_service()
+        contributions = [row_contribution(service, record) for record in records]
+        with self._lock:
+            acc = self.accumulator
+            for event_id in chain(deleted_ids, (record['google_event_id'] for record in records)):
+                entry = self.entries.pop(event_id, None)
+                if entry is not None:
+                    acc.add(*entry, sign=-1)
+            for record, contribution in zip(records, contributions):
+                month = month_of(contribution[1])
+                if acc is not None and month == (acc.year, acc.month):
+                    acc.add(*contribution)
+                    self.entries[record['google_event_id']] = contribution
+                else:
+                    self.changed.add(month)
+
+    def on_recurring_changes(self, room_id, records, deleted_ids):
+        """반복 예약 회차는 예약별로 따라가지 않으므로 다음 갱신 때 이번 달을 다시 적재"""
+        with self._lock:
+            self.accumulator = None
+            self.entries = {}
+
+    def refresh(self, now=None):
+        """이번 달 + 바뀐 끝난 달 (+ 아직 frozen 이 아닌 지난달) stats_cache 갱신, 갱신한 달 목록"""
+        now = now or datetime.now(KST)
+        current = (now.year, now.month)
+        previous = (now.year - (now.month == 1), (now.month - 2) % 12 + 1)
+        with self._lock:
+            changed, self.changed = self.changed, set()
+        # 아직 안 온 달은 이번 달이 될 때 처음부터 적재함
+        closed = {month for month in changed if month < current}
+        if previous not in closed and previous not in frozen_months(previous[0]):
+            closed.add(previous)
+
+        built = []
+        try:
+            for year, month in sorted(closed):
+                upsert_stats(year, month, build_month(year, month, frozen=True))
+                built.append((year, month))
+            with self._lock:
+                acc = self.accumulator
+                if acc is None or (acc.year, acc.month) != current:
+                    # 처음이거나 달이 바뀜: 한 번 훑어 적재 (적재 중 온 변경은 잠금이 풀린 뒤 다시 반영됨)
+                    self.accumulator, self.entries = load_month(*current)
+                stats = self.accumulator.build(frozen=False)
+            upsert_stats(*current, stats)
+            built.append(current)
+        except Exception:
+            # 못 쓴 끝난 달은 다음 갱신 때 다시
+            with self._lock:
+                self.changed |= closed.difference(built)
+            raise
+        return built
+
+
+_month_stats = None
+_month_stats_lock = threading.Lock()
+
+
+def get_month_stats():
+    """프로세스 공용 MonthStats (처음 부를 때 booking_events / recurring_events 변경 알림 구독)"""
+    global _month_stats
+    with _month_stats_lock:
+        if _month_stats is None:
+            stats = MonthStats()
+            add_before_change_listener(stats.before_changes)
+            add_change_listener(stats.on_changes)
+            add_recurring_listener(stats.on_recurring_changes)
+            _month_stats = stats
+        return _month_stats
+
+
+def refresh_current_month(now=None):
+    """동기화 후 호출: 이번 달 (변경분만 반영) + 동기화로 바뀐 끝난 달 + 아직 frozen 이 아닌 지난달"""
+    return get_month_stats().refresh(now)
+
+
+if __name__ == '__main__':
+    import sys
+    args = sys.argv[1:]
+    rebuild = '--rebuild' in args
+    numbers = [int(a) for a in args if not a.startswith('--')]
+
+    if not numbers:
+        built = refresh_current_month()
+    elif len(numbers) == 1:
+        built = refresh_months([(numbers[0], m) for m in range(1, 13)], rebuild=rebuild)
+    else:
+        built = refresh_months([(numbers[0], numbers[1])], rebuild=rebuild)
+
+    print(f'✅ 통계 갱신 완료: {", ".join(f"{y}-{m:02d}" for y, m in built) or "변경 없음"}')
@@ -0,0 +1,28 @@
+-- 반복 예약 원본 + 예외 회차 (RECURRENCE_EXPANSION=local 일 때만 사용)
+-- 회차는 저장하지 않고 recurrence.py 가 조회 기간만 펼친다
+CREATE TABLE IF NOT EXISTS recurring_events (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  google_event_id TEXT UNIQUE NOT NULL,
+  room_id TEXT NOT NULL REFERENCES rooms(id),
+  title TEXT,
+  description TEXT,
+  start_time TEXT,              -- Google 원본 그대로 (종일은 날짜만)
+  end_time TEXT,
+  time_zone TEXT,
+  recurrence JSONB,             -- ["RRULE:...", "EXDATE;TZID=...:..."] (원본만)
+  recurring_event_id TEXT,      -- 예외 회차의 원본 id
+  original_start_time TEXT,     -- 예외 회차의 원래 시작 시각
+  status TEXT,                  -- confirmed / cancelled (취소된 회차도 남겨서 펼칠 때 제외)
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_recurring_events_room_id ON recurring_events(room_id);
+CREATE INDEX IF NOT EXISTS idx_recurring_events_recurring_event_id ON recurring_events(recurring_event_id);
+
+ALTER TABLE recurring_events ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access to recurring_events" ON recurring_events
+  FOR SELECT USING (true);
+
+COMMENT ON TABLE recurring_events IS '반복 예약 원본(RRULE)과 예외 회차 - 회차는 booking_events 에 저장하지 않음';
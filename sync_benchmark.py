@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+동기화 벤치마크 (fake_services 대상, 네트워크 없음)
+
+연습실당 예약 수별로 아래 시나리오를 돌려 소요 시간, 처리량, 요청 수, 주고받은 바이트,
+최대 RSS 를 출력한다. 각 동기화는 새 프로세스에서 실행 (import 비용/RSS 분리).
+  full         빈 DB 에 전체 동기화
+  noop         변경 없이 증분 동기화
+  incremental  1% 수정 + 0.2% 삭제 + 0.2% 추가 후 증분 동기화
+  resync-fullfields  DB 가 채워진 상태에서 --full 재동기화, 부분 응답 없이 (전체 필드, 압축 없이)
+  resync         같은 재동기화를 기본 설정으로 (fields= 부분 응답 + gzip)
+재동기화는 끝에 부분 응답 효과(resync-fullfields → resync)를 비교해 출력한다.
+--recurring N 을 주면 연습실마다 매주 반복 예약 N 개(예외 회차 포함)를 더 넣고 아래 둘을 추가로 돌린다
+  switch-local   RECURRENCE_EXPANSION=local 로 바꾼 뒤 첫 증분 동기화 (모드가 바뀌어 전체 동기화로 전환, 펼친 회차 행 삭제)
+  resync-local   local 로 --full 재동기화 (원본만 받고 회차는 조회 때 펼침)
+  noop-local     local 상태에서 변경 없이 증분 동기화
+끝에 resync 대비 booking_events 행 수/Google 응답 바이트/시간을 비교해 출력한다.
+--google-latency 초 를 주면 가짜 Google 응답마다 그만큼 지연 (실제 API 왕복 시간 흉내).
+--import 는 대신 시작 시간(import / --status 명령)만 측정한다 (환경변수 없이).
+
+사용법:
+  python3 sync_benchmark.py                          # 1k, 10k (연습실 5개)
+  python3 sync_benchmark.py --sizes 1000,100000 --rooms 2
+  python3 sync_benchmark.py --json bench.json        # 결과 저장 (회귀 비교용)
+  python3 sync_benchmark.py --sizes 20000 --google-latency 0.3
+  python3 sync_benchmark.py --sizes 1000 --recurring 200
+  python3 sync_benchmark.py --import                 # 시작 시간
+"""
+
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_services import start_fake_services
+
+DEFAULT_SIZES = [1000, 10000]
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 시작 시간 측정 대상 (이름, python 인자)
+STARTUP_COMMANDS = [
+    ('python -c pass', ['-c', 'pass']),
+    ('import sync_calendar', ['-c', 'import sync_calendar']),
+    ('import sync_jobs', ['-c', 'import sync_jobs']),
+    ('sync_calendar.py --status', ['sync_calendar.py', '--status']),
+    ('watch_channels.py --dry-run', ['watch_channels.py', '--dry-run']),
+]
+
+
+def peak_rss_mb():
+    """이 프로세스의 최대 RSS (Linux 는 exec 이후 기준인 VmHWM, 그 외 ru_maxrss)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss 는 fork 한 부모(가짜 서버 데이터 포함)의 값을 물려받을 수 있음
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _sync_worker(env, rooms, full, verbose, conn):
+    """자식 프로세스: 환경변수 설정 후 sync_calendar.main 실행"""
+    os.environ.update(env)
+    if not verbose:
+        sys.stdout = open(os.devnull, 'w')
+    started = time.perf_counter()
+    import sync_calendar
+    imported = time.perf_counter()
+    results = sync_calendar.main(rooms, full=full)
+    finished = time.perf_counter()
+    conn.send({
+        'import_seconds': imported - started,
+        'seconds': finished - imported,
+        'errors': {room_id: r['error'] for room_id, r in results.items() if 'error' in r},
+        'max_rss_mb': peak_rss_mb(),
+    })
+    conn.close()
+
+
+def run_sync(env, rooms, full=False, verbose=False):
+    context = multiprocessing.get_context('spawn')
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=_sync_worker, args=(env, rooms, full, verbose, child))
+    process.start()
+    child.close()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def run_size(services, env, rooms, size, verbose=False, recurring=0):
+    """연습실당 size 개 예약 (+ recurring 개 반복 예약)으로 시나리오 전체 실행 → 결과 목록"""
+    with services.lock:
+        services.reset()
+        for room in rooms:
+            services.seed(room['calendar_id'], room['id'], size, recurring=recurring)
+    if os.path.exists(env['SYNC_STATE_FILE']):
+        os.remove(env['SYNC_STATE_FILE'])
+    shutil.rmtree(env['EVENT_SNAPSHOT_DIR'], ignore_errors=True)
+
+    room_ids = [room['id'] for room in rooms]
+    changed = max(1, size // 100) + 2 * max(1, size // 500)
+    scenarios = [
+        ('full', None, size * len(rooms), False, {}),
+        ('noop', None, 0, False, {}),
+        ('incremental', {'updated': max(1, size // 100), 'deleted': max(1, size // 500), 'added': max(1, size // 500)},
+         changed * len(rooms), False, {}),
+        ('resync-fullfields', None, size * len(rooms), True, {'GOOGLE_PARTIAL_RESPONSE': '0'}),
+        ('resync', None, size * len(rooms), True, {}),
+    ]
+    if recurring:
+        local = {'RECURRENCE_EXPANSION': 'local'}
+        scenarios += [
+            ('switch-local', None, size * len(rooms), False, local),
+            ('resync-local', None, size * len(rooms), True, local),
+            ('noop-local', None, 0, False, local),
+        ]
+
+    results = []
+    for name, mutation, events, full, overrides in scenarios:
+        with services.lock:
+            if mutation:
+                for room in rooms:
+                    services.mutate(room['calendar_id'], room['id'], **mutation)
+            services.reset_stats()
+        result = run_sync(dict(env, **overrides), room_ids, full=full, verbose=verbose)
+        with services.lock:
+            stats = services.stats()
+            local = overrides.get('RECURRENCE_EXPANSION') == 'local'
+            stored = (len(services.postgrest.table('booking_events').rows),
+                      len(services.postgrest.table('recurring_events').rows))
+            expected = tuple(map(sum, zip(*(services.expected_rows(r['calendar_id'], local) for r in rooms))))
+        results.append(dict(
+            result,
+            scenario=name,
+            events_per_room=size,
+            events=events,
+            events_per_second=round(events / result['seconds']) if result['seconds'] and events else 0,
+            google_requests=sum(v for k, v in stats['requests'].items() if k.startswith('google')),
+            supabase_requests=sum(v for k, v in stats['requests'].items() if k.startswith('supabase')),
+            requests=stats['requests'],
+            bytes_in=stats['bytes_in'],
+            bytes_out=stats['bytes_out'],
+            google_bytes=stats['google_bytes_out'],
+            booking_rows=stored[0],
+            recurring_rows=stored[1],
+            consistent=stored == expected,
+        ))
+    return results
+
+
+def print_results(results):
+    print(f"{'시나리오':<17} {'예약/연습실':>10} {'시간(s)':>8} {'건/s':>9} {'Google':>7} {'Supabase':>9} "
+          f"{'받음(KB)':>10} {'Google(KB)':>10} {'보냄(KB)':>10} {'RSS(MB)':>8} {'import':>7}  일치")
+    for r in results:
+        print(f"{r['scenario']:<17} {r['events_per_room']:>10} {r['seconds']:>8.2f} {r['events_per_second']:>9} "
+              f"{r['google_requests']:>7} {r['supabase_requests']:>9} {r['bytes_out'] / 1024:>10.0f} "
+              f"{r['google_bytes'] / 1024:>10.0f} {r['bytes_in'] / 1024:>10.0f} {r['max_rss_mb']:>8.1f} "
+              f"{r['import_seconds']:>7.3f}  "
+              f"{'✅' if r['consistent'] and not r['errors'] else '❌ ' + json.dumps(r['errors'], ensure_ascii=False)}")
+
+
+# 재동기화 비교 (기준, 대상, 설명): 한 번에 한 가지 설정만 다름
+RESYNC_COMPARISONS = (
+    ('resync-fullfields', 'resync', '부분 응답+gzip'),
+)
+
+
+def print_resync_gains(results):
+    """예약 수별로 설정 하나만 바꾼 재동기화끼리 시간/Google 바이트 비교"""
+    by_key = {(r['scenario'], r['events_per_room']): r for r in results}
+    lines = []
+    for size in dict.fromkeys(r['events_per_room'] for r in results):
+        for base_name, name, label in RESYNC_COMPARISONS:
+            base, r = by_key.get((base_name, size)), by_key.get((name, size))
+            if not base or not r:
+                continue
+            lines.append(f"  {label:<12} {size:>8}개 ({base_name} → {name}): 시간 {base['seconds']:.2f}s → "
+                         f"{r['seconds']:.2f}s ({base['seconds'] / r['seconds']:.1f}배), Google 응답 "
+                         f"{base['google_bytes'] / 1024:.0f}KB → {r['google_bytes'] / 1024:.0f}KB "
+                         f"({100 * r['google_bytes'] / base['google_bytes'] - 100:+.0f}%)")
+    if lines:
+        print('\n⚡ 재동기화')
+        print('\n'.join(lines))
+
+
+def print_recurrence_gains(results):
+    """예약 수별로 resync(서버 펼침) 대비 resync-local 의 booking_events 행 수/Google 바이트/시간"""
+    servers = {r['events_per_room']: r for r in results if r['scenario'] == 'resync'}
+    lines = []
+    for r in results:
+        base = servers.get(r['events_per_room'])
+        if not base or r['scenario'] != 'resync-local':
+            continue
+        lines.append(f"  {r['events_per_room']:>8}개: booking_events {base['booking_rows']}행 → {r['booking_rows']}행 "
+                     f"(+ recurring_events {r['recurring_rows']}행), Google 응답 {base['google_bytes'] / 1024:.0f}KB → "
+                     f"{r['google_bytes'] / 1024:.0f}KB, 시간 {base['seconds']:.2f}s → {r['seconds']:.2f}s")
+    if lines:
+        print('\n🔁 반복 예약 로컬 펼침 (resync 대비)')
+        print('\n'.join(lines))
+
+
+def measure_startup(runs=10):
+    """명령별 실행 시간 (ms, 최소/중앙값). 필수 환경변수 없이 실행해 import 시 오류가 없는지도 확인"""
+    env = {k: v for k, v in os.environ.items()
+           if k not in ('GOOGLE_CALENDAR_API_KEY', 'SUPABASE_URL', 'SUPABASE_SERVICE_ROLE_KEY')}
+    env['SYNC_STATE_FILE'] = os.path.join(tempfile.mkdtemp(prefix='sync-bench-'), 'sync_state.json')
+    env['WATCH_STATE_FILE'] = env['SYNC_STATE_FILE'] + '.watch'
+    env['EVENT_SNAPSHOT_DIR'] = env['SYNC_STATE_FILE'] + '.snapshot'
+    results = []
+    print(f"{'명령':<30} {'최소(ms)':>9} {'중앙(ms)':>9}  결과")
+    for name, command in STARTUP_COMMANDS:
+        times = []
+        returncode = 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            completed = subprocess.run([sys.executable] + command, cwd=BASE_DIR, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            times.append((time.perf_counter() - started) * 1000)
+            returncode = returncode or completed.returncode
+        result = {'command': name, 'min_ms': min(times), 'median_ms': statistics.median(times), 'ok': returncode == 0}
+        results.append(result)
+        print(f"{name:<30} {result['min_ms']:>9.1f} {result['median_ms']:>9.1f}  "
+              f"{'✅' if result['ok'] else '❌ ' + completed.stderr.decode(errors='replace').strip().splitlines()[-1]}")
+    return results
+
+
+def main(sizes=None, room_count=5, json_path=None, verbose=False, google_latency=0.0, recurring=0):
+    server, base_url = start_fake_services()
+    state_dir = tempfile.mkdtemp(prefix='sync-bench-')
+    env = {
+        'GOOGLE_CALENDAR_API_KEY': 'bench',
+        'GOOGLE_CALENDAR_API_URL': f'{base_url}/calendar/v3',
+        'SUPABASE_URL': base_url,
+        'SUPABASE_SERVICE_ROLE_KEY': 'bench',
+        'SYNC_STATE_FILE': os.path.join(state_dir, 'sync_state.json'),
+        'EVENT_SNAPSHOT_DIR': os.path.join(state_dir, 'snapshot'),
+        'HTTP_RATE_LIMIT': '0',
+    }
+    # ROOMS 를 읽으려면 sync_calendar import 가 필요 (환경변수 먼저)
+    os.environ.update(env)
+    from sync_calendar import ROOMS
+    rooms = ROOMS[:room_count]
+    services = server.RequestHandlerClass.services
+    services.google_latency = google_latency
+
+    results = []
+    try:
+        for size in sizes or DEFAULT_SIZES:
+            print(f'⏱️  연습실 {len(rooms)}개 × {size}개 예약...', flush=True)
+            results.extend(run_size(services, env, rooms, size, verbose, recurring))
+    finally:
+        server.shutdown()
+
+    print()
+    print_results(results)
+    print_resync_gains(results)
+    print_recurrence_gains(results)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'\n💾 {json_path} 저장')
+    return results
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    if '--import' in args:
+        measure_startup(int(option('--runs', '10')))
+        sys.exit(0)
+
+    sizes = [int(s) for s in option('--sizes', '').split(',') if s] or None
+    main(sizes, int(option('--rooms', '5')), option('--json'), '--verbose' in args,
+         float(option('--google-latency', '0')), int(option('--recurring', '0')))
@@ -1,20 +1,72 @@
 #!/usr/bin/env python3
 """
 Google Calendar → Supabase 동기화 스크립트
-사용법: python3 sync_calendar.py
+사용법: python3 sync_calendar.py [연습실...] [--full] [--prices] [--stats]
+        python3 sync_calendar.py --status    # 저장된 sync token 상태만 출력 (네트워크 없음)
 """
 
 import os
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 import re
-import uuid
 import json
+import queue
+import threading
+import time
 
-# 환경변수에서 읽기
-GOOGLE_API_KEY = os.environ['GOOGLE_CALENDAR_API_KEY']
-SUPABASE_URL = os.environ['SUPABASE_URL']
-SUPABASE_KEY = os.environ['SUPABASE_SERVICE_ROLE_KEY']
+import http_client
+import metrics
+import price_engine
+import sync_coordinator
+from settings import get_settings
+
+# API 키/주소는 import 시점이 아니라 처음 쓸 때 읽음 (settings 참고)
+_LAZY_SETTINGS = {
+    'GOOGLE_API_KEY': 'google_api_key',
+    'SUPABASE_URL': 'supabase_url',
+    'SUPABASE_KEY': 'supabase_key',
+    'GOOGLE_CALENDAR_API_URL': 'google_calendar_api_url',
+}
+
+def __getattr__(name):
+    # 예전 모듈 상수 이름(sync_calendar.SUPABASE_URL 등)도 계속 동작하도록
+    if name in _LAZY_SETTINGS:
+        return getattr(get_settings(), _LAZY_SETTINGS[name])
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+# 동시에 동기화할 연습실 수
+SYNC_MAX_WORKERS = int(os.environ.get('SYNC_MAX_WORKERS', '5'))
+
+# Supabase REST 조회/쓰기 단위
+READ_PAGE_SIZE = 1000
+WRITE_BATCH_SIZE = 500
+DELETE_BATCH_SIZE = 100
+
+# 동기화가 끝날 때마다 연습실별 예약 스냅샷(event_snapshot) 갱신 (0 이면 끄기)
+EVENT_SNAPSHOT = os.environ.get('EVENT_SNAPSHOT', '1') != '0'
+
+# 전체 동기화 조회 기간 (끝은 올해 + 2년 말)
+FULL_SYNC_START = '2020-01-01T00:00:00Z'
+
+# events.list 부분 응답(fields=) + gzip (0 이면 전체 필드, 압축 없이)
+GOOGLE_PARTIAL_RESPONSE = os.environ.get('GOOGLE_PARTIAL_RESPONSE', '1') != '0'
+# event_to_record 와 취소 판단에 쓰는 필드만
+EVENT_FIELDS = ('items(id,status,summary,description,start(date,dateTime),end(date,dateTime),created,updated),'
+                'nextPageToken,nextSyncToken')
+# Google 은 User-Agent 에 gzip 이 있어야 압축해서 보냄
+GZIP_HEADERS = {'Accept-Encoding': 'gzip', 'User-Agent': 'rhythmandjoy-sync (gzip)'}
+
+# 반복 예약 펼치기: server (singleEvents=true, Google 이 회차마다 펼쳐 booking_events 에 회차별로 저장)
+# / local (반복 원본과 예외만 recurring_events 에 저장하고 recurrence 모듈이 조회 기간만 펼침)
+RECURRENCE_EXPANSION = os.environ.get('RECURRENCE_EXPANSION', 'server')
+RECURRING_FIELDS = ('items(id,status,summary,description,start(date,dateTime,timeZone),end(date,dateTime),'
+                    'created,updated,recurrence,recurringEventId,originalStartTime(date,dateTime)),'
+                    'nextPageToken,nextSyncToken')
+
+# 증분 동기화용 sync token 저장 파일 (연습실별)
+SYNC_STATE_FILE = os.environ.get(
+    'SYNC_STATE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sync_state.json')
+)
 
 ROOMS = [
     {'id': 'a', 'calendar_id': '752f7ab834fd5978e9fc356c0b436e01bd530868ab5e46534c82820086c5a3d3@group.calendar.google.com'},
@@ -24,23 +76,8 @@ ROOMS = [
     {'id': 'e', 'calendar_id': 'aaf61e2a8c25b5dc6cdebfee3a4b2ba3def3dd1b964a9e5dc71dc91afc2e14d6@group.calendar.google.com'},
 ]
 
-# 가격 정책
-ROOM_PRICES = {
-    'a': {'before16': 10000, 'after16': 13000, 'overnight': 30000},
-    'b': {'before16': 9000, 'after16': 11000, 'overnight': 20000},
-    'c': {'before16': 4000, 'after16': 6000, 'overnight': 15000},
-    'd': {'before16': 3000, 'after16': 5000, 'overnight': 15000},
-    'e': {'before16': 8000, 'after16': 10000, 'overnight': 20000},
-}
-
-# 2025년 한국 법정 공휴일
-KOREAN_HOLIDAYS_2025 = [
-    '2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30',
-    '2025-03-01', '2025-03-03', '2025-05-05', '2025-05-06',
-    '2025-06-06', '2025-08-15', '2025-09-06', '2025-09-07',
-    '2025-09-08', '2025-09-09', '2025-10-03', '2025-10-09',
-    '2025-12-25'
-]
+# 계측 라벨용 calendar_id → 연습실 id
+ROOM_BY_CALENDAR = {room['calendar_id']: room['id'] for room in ROOMS}
 
 def is_naver_booking(description):
     """네이버 예약 체크"""
@@ -50,212 +87,714 @@ def is_naver_booking(description):
 
 def is_weekend_or_holiday(dt):
     """주말 또는 공휴일 체크 (KST 기준)"""
-    date_str = dt.strftime('%Y-%m-%d')
-    weekday = dt.weekday()  # 0=월요일, 6=일요일
-    return weekday >= 5 or date_str in KOREAN_HOLIDAYS_2025
-
-def calculate_price(start_time_str, end_time_str, room_id, description=''):
-    """가격 계산"""
-    # UTC를 KST로 변환 (+9시간)
-    start_utc = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-    end_utc = datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
-    
-    start_kst = start_utc + timedelta(hours=9)
-    end_kst = end_utc + timedelta(hours=9)
-    
-    prices = ROOM_PRICES.get(room_id)
-    if not prices:
-        return 0
-    
-    is_naver = is_naver_booking(description)
-    commission = 0.9802 if is_naver else 0.9
-    
-    start_hour = start_kst.hour
-    end_hour = end_kst.hour
-    duration_hours = (end_kst - start_kst).total_seconds() / 3600
-    
-    # 새벽 통대관: 0~6시 정확히 6시간
-    if start_hour == 0 and end_hour == 6 and duration_hours == 6:
-        return round(prices['overnight'] * commission)
-    
-    # 시간별 계산
-    total_price = 0
-    current = start_kst
-    
-    while current < end_kst:
-        hour = current.hour
-        
-        # 새벽 시간 (0~6시)
-        if 0 <= hour < 6:
-            hourly_price = prices['overnight'] / 6
-        # 주말 또는 공휴일
-        elif is_weekend_or_holiday(current):
-            hourly_price = prices['after16']
-        # 평일
-        else:
-            if hour < 16:
-                hourly_price = prices['before16']
-            else:
-                hourly_price = prices['after16']
-        
-        total_price += hourly_price
-        current += timedelta(hours=1)
-    
-    return round(total_price * commission)
+    return price_engine.is_weekend_or_holiday_ordinal(dt.toordinal())
+
+class SyncTokenExpired(Exception):
+    """Google이 410 Gone 반환 (sync token 만료 → 전체 동기화 필요)"""
+
+def load_sync_state():
+    """로컬에 저장된 연습실별 sync token 읽기"""
+    try:
+        with open(SYNC_STATE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+_sync_state_lock = threading.Lock()
+
+def save_sync_token(room_id, sync_token, **info):
+    """연습실 sync token 저장 (임시 파일 → rename 으로 원자적 교체)
+
+    info(mode, count, started_at) 는 같은 연습실을 기다리던 다른 요청이 결과를 재사용할 때 쓰임
+    """
+    # 여러 연습실이 동시에 동기화되므로 읽기-수정-쓰기를 잠금으로 보호
+    with _sync_state_lock:
+        state = load_sync_state()
+        state[room_id] = {
+            'sync_token': sync_token,
+            'synced_at': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'finished_at': time.time(),
+            **info,
+        }
+        tmp_path = f'{SYNC_STATE_FILE}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, SYNC_STATE_FILE)
+
+def full_sync_window():
+    """전체 동기화 조회 기간 (timeMin, timeMax)"""
+    return FULL_SYNC_START, f'{datetime.now().year + 2}-12-31T23:59:59Z'
+
+def iter_calendar_pages(calendar_id, sync_token=None, page_token=None):
+    """Google Calendar events.list 페이지 단위 generator (nextPageToken 순회)
 
-def fetch_calendar_events(calendar_id):
-    """Google Calendar API로 이벤트 가져오기"""
-    url = f'https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events'
+    sync_token 이 없으면 전체 기간 조회, 있으면 변경분(삭제 포함)만 조회.
+    page_token 을 주면 그 페이지부터 이어서 조회 (체크포인트 재개).
+    (items, nextSyncToken, nextPageToken) 을 yield 하며, nextSyncToken 은 마지막 페이지에만 있음
+    """
+    settings = get_settings()
+    url = f'{settings.google_calendar_api_url}/calendars/{calendar_id}/events'
+    local = RECURRENCE_EXPANSION == 'local'
     params = {
-        'key': GOOGLE_API_KEY,
-        'timeMin': '2020-01-01T00:00:00Z',
-        'timeMax': f'{datetime.now().year + 2}-12-31T23:59:59Z',
-        'singleEvents': 'true',
-        'orderBy': 'startTime',
+        'key': settings.google_api_key,
+        'singleEvents': 'false' if local else 'true',
         'maxResults': 2500
     }
+    headers = None
+    if GOOGLE_PARTIAL_RESPONSE:
+        params['fields'] = RECURRING_FIELDS if local else EVENT_FIELDS
+        headers = GZIP_HEADERS
+    if sync_token:
+        # syncToken 과 timeMin/timeMax/orderBy 는 함께 쓸 수 없음
+        params['syncToken'] = sync_token
+    else:
+        params['timeMin'], params['timeMax'] = full_sync_window()
+    if page_token:
+        params['pageToken'] = page_token
     
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+    room_id = ROOM_BY_CALENDAR.get(calendar_id, calendar_id)
+    while True:
+        with metrics.timed('fetch', room_id):
+            response = http_client.get(url, params=params, headers=headers)
+            if response.status_code == 410:
+                raise SyncTokenExpired(calendar_id)
+            response.raise_for_status()
+            data = response.json()
+        
+        items = data.get('items', [])
+        metrics.SYNC_EVENTS.inc(len(items), room=room_id, kind='fetched')
+        page_token = data.get('nextPageToken')
+        yield items, data.get('nextSyncToken'), page_token
+        
+        if not page_token:
+            break
+        params['pageToken'] = page_token
+
+def prefetch(iterable, depth=2):
+    """백그라운드 스레드에서 iterable 을 미리 읽어두는 generator
+
+    다음 페이지를 내려받는 동안 현재 페이지를 저장할 수 있음.
+    메모리에는 최대 depth 개 항목만 대기하며, 생산 측 예외는 소비 측에서 다시 발생.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    done = object()
+    
+    def put(entry):
+        # 소비 측이 중간에 멈추면 생산 스레드도 빠져나오도록
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as e:
+            put((done, e))
+        else:
+            put((done, None))
     
-    return response.json().get('items', [])
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+
+# checkpoint 를 넘긴 iter_calendar_events 가 페이지마다 끝에 yield 하는 표시
+PAGE_END = object()
 
-def save_to_supabase(room_id, events):
-    """Supabase에 저장 (가격 계산 없이 이벤트 데이터만 저장)"""
-    headers = {
-        'apikey': SUPABASE_KEY,
-        'Authorization': f'Bearer {SUPABASE_KEY}',
+def iter_calendar_events(calendar_id, sync_token=None, result=None, checkpoint=None):
+    """이벤트를 하나씩 yield (페이지는 미리 받아둠)
+
+    result dict 를 넘기면 순회가 끝난 뒤 'next_sync_token', 'pages' 가 채워짐
+    checkpoint(SyncCheckpoint) 를 넘기면 그 page_token 부터 이어서 받고, 페이지마다
+    checkpoint.page_end() 를 부른 뒤 PAGE_END 를 yield (소비 측이 기록 후 checkpoint.flushed())
+    """
+    if result is None:
+        result = {}
+    result['pages'] = 0
+    page_token = checkpoint.page_token if checkpoint else None
+    for items, next_sync_token, next_page_token in prefetch(
+            iter_calendar_pages(calendar_id, sync_token, page_token)):
+        result['pages'] += 1
+        if next_sync_token:
+            result['next_sync_token'] = next_sync_token
+        yield from items
+        if checkpoint:
+            # 증분은 upsert/삭제가 멱등이라 id 를 남길 필요 없음
+            ids = [e.get('id') for e in items if e.get('status') != 'cancelled'] if checkpoint.mode == 'full' else ()
+            checkpoint.page_end(next_page_token, ids)
+            yield PAGE_END
+
+def list_calendar_events(calendar_id, sync_token=None):
+    """events.list 전체 결과를 리스트로 반환: (items, nextSyncToken)"""
+    result = {}
+    items = list(iter_calendar_events(calendar_id, sync_token, result))
+    return items, result.get('next_sync_token')
+
+def supabase_headers():
+    """Supabase REST 공통 헤더"""
+    key = get_settings().supabase_key
+    return {
+        'apikey': key,
+        'Authorization': f'Bearer {key}',
         'Content-Type': 'application/json',
         'Prefer': 'return=minimal'
     }
+
+def event_to_record(room_id, event):
+    """Google 이벤트 → booking_events 레코드"""
+    return {
+        'google_event_id': event.get('id'),
+        'room_id': room_id,
+        'title': event.get('summary', '제목 없음'),
+        'description': event.get('description', ''),
+        'start_time': event.get('start', {}).get('dateTime') or event.get('start', {}).get('date'),
+        'end_time': event.get('end', {}).get('dateTime') or event.get('end', {}).get('date'),
+        'created_at': event.get('created'),
+        'updated_at': event.get('updated'),
+    }
+
+def recurring_record(room_id, event):
+    """반복 원본/예외 이벤트 → recurring_events 레코드 (RECURRENCE_EXPANSION=local)"""
+    start = event.get('start') or {}
+    end = event.get('end') or {}
+    original = event.get('originalStartTime') or {}
+    return {
+        'google_event_id': event.get('id'),
+        'room_id': room_id,
+        'title': event.get('summary', '제목 없음'),
+        'description': event.get('description', ''),
+        'start_time': start.get('dateTime') or start.get('date'),
+        'end_time': end.get('dateTime') or end.get('date'),
+        'time_zone': start.get('timeZone'),
+        'recurrence': event.get('recurrence'),
+        'recurring_event_id': event.get('recurringEventId'),
+        'original_start_time': original.get('dateTime') or original.get('date'),
+        'status': event.get('status', 'confirmed'),
+        'created_at': event.get('created'),
+        'updated_at': event.get('updated'),
+    }
+
+def chunked(items, size):
+    """리스트를 size 단위로 분할"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def parse_timestamp(value):
+    """ISO 시간 문자열 → datetime (Google 'Z' 표기와 Postgres '+00:00' 표기 비교용)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+def fetch_rows(table, params):
+    """PostgREST 페이지 단위 조회 generator"""
+    url = f'{get_settings().supabase_url}/rest/v1/{table}'
+    offset = 0
+    while True:
+        page_params = dict(params, limit=READ_PAGE_SIZE, offset=offset)
+        response = http_client.get(url, headers=supabase_headers(), params=page_params)
+        response.raise_for_status()
+        rows = response.json()
+        yield from rows
+        if len(rows) < READ_PAGE_SIZE:
+            return
+        offset += READ_PAGE_SIZE
+
+def fetch_stored_versions(room_id, table='booking_events'):
+    """저장된 이벤트의 google_event_id → updated_at (페이지 단위 조회)"""
+    with metrics.timed('read_db', room_id):
+        return {
+            row['google_event_id']: row.get('updated_at')
+            for row in fetch_rows(table, {
+                'room_id': f'eq.{room_id}',
+                'select': 'google_event_id,updated_at',
+                'order': 'google_event_id',
+            })
+        }
+
+def upsert_records(records, table='booking_events'):
+    """google_event_id 기준 upsert (기존 행의 id 유지 → event_prices 보존)"""
+    url = f'{get_settings().supabase_url}/rest/v1/{table}?on_conflict=google_event_id'
+    headers = dict(supabase_headers(), Prefer='resolution=merge-duplicates,return=minimal')
+    for batch in chunked(records, WRITE_BATCH_SIZE):
+        response = http_client.post(url, headers=headers, json=batch)
+        response.raise_for_status()
+
+def delete_events(room_id, google_event_ids, table='booking_events'):
+    """연습실의 google_event_id 목록만 삭제 (URL 길이 때문에 작은 단위로)
+
+    google_event_id 는 테이블 전체에서 UNIQUE 지만, 한 연습실 동기화가 다른 연습실 행을 지울 수 없도록 room_id 로도 한정
+    """
+    for batch in chunked(google_event_ids, DELETE_BATCH_SIZE):
+        id_list = ','.join(f'"{event_id}"' for event_id in batch)
+        url = f'{get_settings().supabase_url}/rest/v1/{table}?room_id=eq.{room_id}&google_event_id=in.({id_list})'
+        response = http_client.delete(url, headers=supabase_headers())
+        response.raise_for_status()
+
+# 동기화 변경분 구독자: listener(room_id, upsert 된 레코드 목록, 삭제된 google_event_id 목록)
+_change_listeners = []
+# 기록 직전 구독자 (같은 인자): 바뀌거나 지워질 행의 기록 전 상태를 읽어 둘 때 (stats_builder, settlement)
+_before_change_listeners = []
+
+def add_change_listener(listener):
+    """booking_events 에 변경분이 기록될 때마다 호출될 함수 등록 (중복 등록 무시)"""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+def add_before_change_listener(listener):
+    """booking_events 에 변경분을 기록하기 직전마다 호출될 함수 등록 (중복 등록 무시)"""
+    if listener not in _before_change_listeners:
+        _before_change_listeners.append(listener)
+
+def write_changes(room_id, records=(), deleted_ids=()):
+    """변경분 기록 후 구독자에게 알림 (구독자 오류는 동기화를 멈추지 않음)"""
+    if not records and not deleted_ids:
+        return
+    for listener in list(_before_change_listeners):
+        try:
+            listener(room_id, records, deleted_ids)
+        except Exception as e:
+            print(f'  ⚠️  {room_id.upper()}홀 기록 전 알림 처리 실패: {e}')
+    with metrics.timed('write', room_id, upserted=len(records), deleted=len(deleted_ids)):
+        upsert_records(records)
+        delete_events(room_id, deleted_ids)
+    metrics.SYNC_EVENTS.inc(len(records), room=room_id, kind='upserted')
+    metrics.SYNC_EVENTS.inc(len(deleted_ids), room=room_id, kind='deleted')
+    with metrics.timed('notify', room_id):
+        for listener in list(_change_listeners):
+            try:
+                listener(room_id, records, deleted_ids)
+            except Exception as e:
+                print(f'  ⚠️  {room_id.upper()}홀 변경 알림 처리 실패: {e}')
+
+# 반복 예약(원본/예외) 변경분 구독자: listener(room_id, upsert 된 recurring_events 레코드 목록, 삭제된 id 목록)
+_recurring_listeners = []
+
+def add_recurring_listener(listener):
+    """recurring_events 에 변경분이 기록될 때마다 호출될 함수 등록 (중복 등록 무시)"""
+    if listener not in _recurring_listeners:
+        _recurring_listeners.append(listener)
+
+def write_recurring_changes(room_id, records=(), deleted_ids=()):
+    """recurring_events 변경분 기록 후 구독자에게 알림"""
+    if not records and not deleted_ids:
+        return
+    with metrics.timed('write_recurring', room_id, upserted=len(records), deleted=len(deleted_ids)):
+        upsert_records(records, 'recurring_events')
+        delete_events(room_id, deleted_ids, 'recurring_events')
+    for listener in list(_recurring_listeners):
+        try:
+            listener(room_id, records, deleted_ids)
+        except Exception as e:
+            print(f'  ⚠️  {room_id.upper()}홀 반복 예약 변경 알림 처리 실패: {e}')
+
+class LiveIndex:
+    """booking_events 를 한 번 적재한 뒤 변경 알림으로 따라가는 프로세스 공용 인덱스 (week_index, availability)
+
+    get() 을 처음 부를 때 변경 알림을 먼저 구독하고 load() 로 적재한다. 적재하는 동안 온 변경은
+    모아뒀다가 새 인덱스에 다시 반영한 뒤 공개하므로, 적재 결과가 그 변경 이전 상태여도 놓치지 않는다.
+    구독은 bound method 라 중복 등록이 무시됨 → 적재가 실패해 get() 이 다시 불려도 알림이 겹치지 않음.
+    - load(): 새 인덱스
+    - apply(index, room_id, records, deleted_ids): booking_events 변경분 반영
+    - on_recurring(index, room_id, records, deleted_ids): recurring_events 변경분 반영 (없으면 구독 안 함)
+    """
+
+    def __init__(self, load, apply, on_recurring=None):
+        self._load = load
+        self._apply = apply
+        self._on_recurring = on_recurring
+        self.index = None
+        self._lock = threading.Lock()
+        # 적재 중에 온 변경 (room_id, records, deleted_ids), None 이면 적재 중 아님
+        self._pending = None
+        self._pending_lock = threading.Lock()
+
+    def on_changes(self, room_id, records, deleted_ids):
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending.append((room_id, records, deleted_ids))
+                return
+            index = self.index
+        if index is not None:
+            self._apply(index, room_id, records, deleted_ids)
+
+    def on_recurring_changes(self, room_id, records, deleted_ids):
+        index = self.index
+        if index is not None:
+            self._on_recurring(index, room_id, records, deleted_ids)
+
+    def get(self):
+        with self._lock:
+            if self.index is None:
+                with self._pending_lock:
+                    self._pending = []
+                add_change_listener(self.on_changes)
+                try:
+                    index = self._load()
+                except Exception:
+                    with self._pending_lock:
+                        self._pending = None
+                    raise
+                with self._pending_lock:
+                    for change in self._pending:
+                        self._apply(index, *change)
+                    self.index, self._pending = index, None
+                if self._on_recurring is not None:
+                    # 새 인덱스는 반복 예약 쪽 캐시가 비어 있으므로 적재 뒤에 구독해도 놓치는 변경 없음
+                    # (load 에서 recurrence 저장소가 먼저 구독하면 저장소가 갱신된 뒤에 불림)
+                    add_recurring_listener(self.on_recurring_changes)
+            return self.index
+
+def divert_recurring(room_id, events, full=False, seen=None):
+    """RECURRENCE_EXPANSION=local: 반복 원본과 예외를 recurring_events 로 나눠 기록하고 나머지만 흘려보냄
+
+    원본(recurrence 있음)은 booking_events 로 보내지 않고, 예외(recurringEventId 있음, 취소 포함)는
+    회차 제외용으로 recurring_events 에 남기면서 실제 예약이므로 booking_events 쪽으로도 그대로 보낸다.
+    모은 변경은 PAGE_END 앞과 스트림 끝에서 기록 (체크포인트보다 먼저).
+    full 이면 바뀐 것만 upsert 하고 끝에서 이번에 안 보인 행을 삭제 (seen: 체크포인트 이전 실행까지 본 id),
+    증분이면 취소 알림에는 recurrence 가 없어 원본인지 모르므로 취소된 id 는 recurring_events 에서도 삭제.
+    """
+    stored = fetch_stored_versions(room_id, 'recurring_events') if full else {}
+    recurring_seen = set()
+    pending, deleted = [], []
+    for event in events:
+        if event is PAGE_END:
+            write_recurring_changes(room_id, pending, deleted)
+            pending, deleted = [], []
+            yield event
+            continue
+        event_id = event.get('id')
+        if event.get('recurrence') or event.get('recurringEventId'):
+            recurring_seen.add(event_id)
+            if not (event_id in stored and parse_timestamp(stored[event_id]) == parse_timestamp(event.get('updated'))):
+                pending.append(recurring_record(room_id, event))
+            if event.get('recurrence'):
+                continue
+        elif not full and event.get('status') == 'cancelled':
+            deleted.append(event_id)
+        yield event
+    if full:
+        deleted.extend(event_id for event_id in stored
+                       if event_id not in recurring_seen and event_id not in (seen or ()))
+    write_recurring_changes(room_id, pending, deleted)
+
+def save_to_supabase(room_id, events, checkpoint=None, seen=None, on_event=None):
+    """Supabase에 저장 (가격 계산 없이 이벤트 데이터만 저장)
+
+    전체 삭제 후 재입력 대신 google_event_id 기준으로 저장된 updated_at 과 비교해
+    새로 생기거나 바뀐 이벤트만 upsert, 캘린더에서 사라진 이벤트만 삭제한다.
+    events 는 generator 여도 되며, 변경분은 WRITE_BATCH_SIZE 단위로 바로 기록.
+    체크포인트에서 이어서 할 때는 이전 실행이 본 이벤트 id 를 seen 으로 넘긴다.
+    on_event(record) 는 바뀌지 않은 것까지 캘린더의 모든 이벤트마다 호출됨 (스냅샷용)
+    (total, upserted, deleted) 반환
+    """
+    stored = fetch_stored_versions(room_id)
     
-    # 기존 데이터 삭제
-    delete_url = f'{SUPABASE_URL}/rest/v1/booking_events?room_id=eq.{room_id}'
-    requests.delete(delete_url, headers=headers)
+    pending = []
+    upserted = 0
+    seen = set() if seen is None else seen
+    for event in events:
+        if event is PAGE_END:
+            write_changes(room_id, pending)
+            upserted += len(pending)
+            pending = []
+            checkpoint.flushed()
+            continue
+        if event.get('status') == 'cancelled':
+            continue
+        event_id = event.get('id')
+        seen.add(event_id)
+        if on_event:
+            on_event(event_to_record(room_id, event))
+        if event_id in stored and parse_timestamp(stored[event_id]) == parse_timestamp(event.get('updated')):
+            continue
+        pending.append(event_to_record(room_id, event))
+        if len(pending) >= WRITE_BATCH_SIZE:
+            write_changes(room_id, pending)
+            upserted += len(pending)
+            pending = []
+    
+    write_changes(room_id, pending)
+    upserted += len(pending)
     
-    # 새 데이터 입력
-    records = []
+    # 스트림을 끝까지 받은 뒤에만 삭제 (중간 실패 시 멀쩡한 행을 지우지 않도록)
+    removed = [event_id for event_id in stored if event_id not in seen]
+    write_changes(room_id, deleted_ids=removed)
+    
+    return len(seen), upserted, len(removed)
+
+def apply_changes_to_supabase(room_id, events, checkpoint=None):
+    """증분 변경분 반영: 취소된 이벤트는 삭제, 나머지는 google_event_id 기준 upsert"""
+    pending = []
+    cancelled_ids = []
+    upserted = 0
+    deleted = 0
     for event in events:
-        records.append({
-            'google_event_id': event.get('id'),
-            'room_id': room_id,
-            'title': event.get('summary', '제목 없음'),
-            'description': event.get('description', ''),
-            'start_time': event.get('start', {}).get('dateTime') or event.get('start', {}).get('date'),
-            'end_time': event.get('end', {}).get('dateTime') or event.get('end', {}).get('date'),
-            'created_at': event.get('created'),
-            'updated_at': event.get('updated'),
-        })
+        if event is PAGE_END:
+            write_changes(room_id, pending, cancelled_ids)
+            upserted += len(pending)
+            deleted += len(cancelled_ids)
+            pending, cancelled_ids = [], []
+            checkpoint.flushed()
+            continue
+        if event.get('status') == 'cancelled':
+            cancelled_ids.append(event['id'])
+            continue
+        pending.append(event_to_record(room_id, event))
+        if len(pending) >= WRITE_BATCH_SIZE:
+            write_changes(room_id, pending)
+            upserted += len(pending)
+            pending = []
     
-    if records:
-        insert_url = f'{SUPABASE_URL}/rest/v1/booking_events'
-        response = requests.post(insert_url, headers=headers, json=records)
-        response.raise_for_status()
+    write_changes(room_id, pending, cancelled_ids)
+    upserted += len(pending)
     
-    return len(records)
+    return upserted, deleted + len(cancelled_ids)
+
+def sync_room(room, full=False, piggyback=True):
+    """연습실 하나 동기화 (sync token 있으면 증분, 없거나 만료되면 전체)
 
-def reset_watch_channels():
-    """Watch 채널 자동 재설정"""
+    같은 연습실을 다른 스레드/프로세스가 동기화 중이면 끝날 때까지 기다리고,
+    그 실행이 이 요청 뒤에 시작해서 성공적으로 끝났으면 다시 돌리지 않고 그 결과를 쓴다 (--full 은 전체 동기화 결과만).
+    요청 전에 시작한 실행은 Google 을 요청 전에 읽었을 수 있으므로 재사용하지 않음.
+    piggyback=False 면 기다린 뒤에도 항상 새로 동기화 (push 알림처럼 방금 생긴 변경을 꼭 받아야 할 때)
+    """
+    room_id = room['id']
+    requested_at = time.time()
+    with sync_coordinator.room_lock(SYNC_STATE_FILE, room_id) as waited:
+        started_at = time.time()
+        entry = load_sync_state().get(room_id, {})
+        if (piggyback and waited and entry.get('started_at', 0) >= requested_at
+                and (not full or entry.get('mode') == 'full')):
+            print(f'  🔗 {room_id.upper()}홀: 동시에 실행된 동기화 결과 사용')
+            metrics.SYNC_RUNS.inc(room=room_id, mode=entry.get('mode', ''), result='piggybacked')
+            return entry.get('count', 0)
+        
+        sync_token = None if full else entry.get('sync_token')
+        if sync_token and entry.get('recurrence', 'server') != RECURRENCE_EXPANSION:
+            # 반복 예약 저장 방식이 바뀌면 (회차별 ↔ 원본만) 전체를 다시 받아 정리
+            print(f'  🔁 {room_id.upper()}홀: 반복 예약 펼치기 방식 변경 ({RECURRENCE_EXPANSION}), 전체 동기화 수행')
+            sync_token = None
+        mode = 'incremental' if sync_token else 'full'
+        recorder = None
+        if EVENT_SNAPSHOT:
+            import event_snapshot
+            recorder = event_snapshot.get_snapshot_recorder()
+            # 체크포인트에서 이어서 하면 이전 실행 변경분을 못 모으므로 스냅샷은 다시 만듦
+            exact = sync_coordinator.pending_checkpoint(SYNC_STATE_FILE, room_id) is None
+        try:
+            with metrics.timed('sync', room_id, mode=mode):
+                count = _sync_room(room, sync_token, recorder, started_at)
+        except Exception:
+            metrics.SYNC_RUNS.inc(room=room_id, mode=mode, result='error')
+            if recorder:
+                recorder.invalidate(room_id)
+            raise
+        metrics.SYNC_RUNS.inc(room=room_id, mode=mode, result='ok')
+        if recorder:
+            try:
+                with metrics.timed('snapshot', room_id):
+                    recorder.commit(room_id, entry.get('sync_token'),
+                                    load_sync_state().get(room_id, {}).get('sync_token'), exact)
+            except Exception as e:
+                recorder.invalidate(room_id)
+                print(f'  ⚠️  {room_id.upper()}홀 스냅샷 저장 실패: {e}')
+        return count
+
+def run_resumable(checkpoint, run):
+    """checkpoint 가 있으면 이어서 run(result, seen) 실행
+
+    이어받은 pageToken 으로 첫 페이지부터 실패하면 (토큰 만료 등) 체크포인트를 버리고 처음부터 한 번 더.
+    """
+    room_id = checkpoint.room_id
+    page_token, seen = checkpoint.resume()
+    if page_token:
+        print(f'  ↩️  {room_id.upper()}홀: 중단된 동기화 이어서 ({checkpoint.pages}페이지 이후)')
+        result = {}
+        try:
+            return run(result, seen)
+        except SyncTokenExpired:
+            raise
+        except Exception as e:
+            if result.get('pages'):
+                raise
+            print(f'  ⚠️  {room_id.upper()}홀 체크포인트 재개 실패 ({e}), 처음부터 다시')
+            checkpoint.restart()
+    return run({}, set())
+
+def _sync_room(room, sync_token, recorder=None, started_at=None):
+    room_id = room['id']
+    if sync_token:
+        checkpoint = sync_coordinator.SyncCheckpoint(SYNC_STATE_FILE, room_id, 'incremental', sync_token)
+        
+        def run_incremental(result, seen):
+            events = iter_calendar_events(room['calendar_id'], sync_token, result, checkpoint)
+            if RECURRENCE_EXPANSION == 'local':
+                events = divert_recurring(room_id, events)
+            # fetch 는 스트리밍이라 save 시간에는 마지막 페이지를 기다린 시간도 포함됨
+            with metrics.timed('save', room_id):
+                upserted, deleted = apply_changes_to_supabase(room_id, events, checkpoint)
+            if result.get('next_sync_token'):
+                save_sync_token(room_id, result['next_sync_token'], mode='incremental', count=upserted,
+                                recurrence=RECURRENCE_EXPANSION, started_at=started_at or time.time())
+            print(f'  ✅ {room_id.upper()}홀: 증분 {upserted}개 반영, {deleted}개 삭제')
+            return upserted
+        
+        try:
+            count = run_resumable(checkpoint, run_incremental)
+            checkpoint.clear()
+            return count
+        except SyncTokenExpired:
+            checkpoint.clear()
+            metrics.SYNC_TOKEN_EXPIRED.inc(room=room_id)
+            print(f'  ⚠️  {room_id.upper()}홀 sync token 만료 (410), 전체 동기화 수행')
+    
+    mode = 'full'
+    if RECURRENCE_EXPANSION == 'local':
+        mode += ':local'
+    checkpoint = sync_coordinator.SyncCheckpoint(SYNC_STATE_FILE, room_id, mode)
+    
+    def run_full(result, seen):
+        events = iter_calendar_events(room['calendar_id'], result=result, checkpoint=checkpoint)
+        if RECURRENCE_EXPANSION == 'local':
+            events = divert_recurring(room_id, events, full=True, seen=seen)
+        on_event = recorder.full_collector(room_id) if recorder else None
+        with metrics.timed('save', room_id):
+            count, upserted, deleted = save_to_supabase(room_id, events, checkpoint, seen, on_event)
+        if result.get('next_sync_token'):
+            save_sync_token(room_id, result['next_sync_token'], mode='full', count=count,
+                            recurrence=RECURRENCE_EXPANSION, started_at=started_at or time.time())
+        print(f'  ✅ {room_id.upper()}홀: {count}개 이벤트 (변경 {upserted}개, 삭제 {deleted}개, {result["pages"]}페이지)')
+        return count
+    
+    count = run_resumable(checkpoint, run_full)
+    checkpoint.clear()
+    return count
+
+def reset_watch_channels(selected_rooms=None, force=False, dry_run=False):
+    """Watch 채널 자동 재설정 (만료가 가까운 채널만 갱신, watch_channels 참고)"""
     print('\n🔔 Watch 채널 자동 재설정 시작...')
     
-    # Google Service Account JSON 파싱
-    service_account_json = os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON')
-    if not service_account_json:
+    if not os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON') and not dry_run:
         print('⚠️  GOOGLE_SERVICE_ACCOUNT_JSON 환경 변수 없음, Watch 재설정 건너뛰기')
         return
     
     try:
-        from google.oauth2 import service_account
-        from google.auth.transport.requests import Request
-        
-        credentials = json.loads(service_account_json)
-        
-        # OAuth2 토큰 요청
-        creds = service_account.Credentials.from_service_account_info(
-            credentials,
-            scopes=['https://www.googleapis.com/auth/calendar']
-        )
-        creds.refresh(Request())
-        access_token = creds.token
-        
-        webhook_url = os.environ.get('WEBHOOK_URL', 'https://xn--xy1b23ggrmm5bfb82ees967e.com/.netlify/functions/google-webhook')
-        
-        for room in ROOMS:
-            try:
-                print(f"  🔄 {room['id'].upper()}홀 Watch 등록 중...")
-                
-                # 1. 초기 sync token 가져오기
-                list_url = f"https://www.googleapis.com/calendar/v3/calendars/{room['calendar_id']}/events"
-                list_response = requests.get(
-                    list_url,
-                    headers={'Authorization': f'Bearer {access_token}'},
-                    params={'maxResults': 1, 'singleEvents': True, 'key': GOOGLE_API_KEY}
-                )
-                list_data = list_response.json()
-                initial_sync_token = list_data.get('nextSyncToken')
-                
-                # 2. Watch 채널 등록
-                channel_id = str(uuid.uuid4())
-                channel = {
-                    'id': channel_id,
-                    'type': 'web_hook',
-                    'address': webhook_url,
-                    'token': room['id']
-                }
-                
-                watch_url = f"https://www.googleapis.com/calendar/v3/calendars/{room['calendar_id']}/events/watch"
-                watch_response = requests.post(
-                    watch_url,
-                    headers={
-                        'Authorization': f'Bearer {access_token}',
-                        'Content-Type': 'application/json'
-                    },
-                    params={'key': GOOGLE_API_KEY},
-                    json=channel
-                )
-                
-                if watch_response.status_code != 200:
-                    raise Exception(f"HTTP {watch_response.status_code}: {watch_response.text}")
-                
-                watch_data = watch_response.json()
-                resource_id = watch_data['resourceId']
-                expiration = int(watch_data['expiration'])
-                
-                # ⭐ Watch는 Google에 등록만 하고, DB 저장은 Netlify에서만 처리
-                # (Netlify Functions는 Supabase JS SDK를 사용하여 RLS 우회)
-                print(f"    ✅ {room['id'].upper()}홀 Watch 등록 완료 (Google)")
-                
-            except Exception as e:
-                print(f"    ❌ {room['id'].upper()}홀 Watch 등록 실패: {str(e)}")
-        
+        from watch_channels import manage_watch_channels
+        manage_watch_channels(selected_rooms, force=force, dry_run=dry_run)
         print('✅ Watch 채널 재설정 완료!')
     except Exception as e:
         print(f'⚠️  Watch 재설정 실패: {str(e)}')
 
-def main(selected_rooms=None):
-    """동기화 실행 (선택된 연습실만)"""
+def main(selected_rooms=None, full=False, prices=False, stats=False, progress=None, piggyback=True):
+    """동기화 실행 (선택된 연습실만)
+
+    prices=True 면 바뀐 이벤트의 event_prices 도 바로 다시 계산 (price_materializer)
+    stats=True 면 끝난 뒤 이번 달 stats_cache 갱신 (stats_builder, 변경분만 반영 + 바뀐 끝난 달 재계산)
+    progress(room_id, result) 는 연습실 하나가 끝날 때마다 호출됨
+    piggyback=False 면 다른 실행이 끝나길 기다린 연습실도 그 결과를 쓰지 않고 새로 동기화 (sync_room)
+    연습실별 결과 {room_id: {'count': n} 또는 {'error': 메시지}} 반환
+    """
+    if prices:
+        import price_materializer
+        add_change_listener(price_materializer.on_sync_changes)
+    # 끝난 달 정산 캐시 무효화 (바뀐 예약이 원래 있던 달 / 새로 들어간 달)
+    import settlement
+    add_before_change_listener(settlement.before_sync_changes)
+    add_change_listener(settlement.on_sync_changes)
+    if stats:
+        # 동기화 전에 구독해야 변경분이 이번 달 누적 배열 / 끝난 달 재계산에 반영됨
+        import stats_builder
+        stats_builder.get_month_stats()
+    
     # 선택된 연습실만 필터링
     rooms_to_sync = ROOMS if not selected_rooms else [r for r in ROOMS if r['id'] in selected_rooms]
     
     room_names = ', '.join([r['id'].upper() + '홀' for r in rooms_to_sync])
-    print(f'🔄 Google Calendar → Supabase 동기화 시작: {room_names}\n')
+    mode = '전체' if full else '증분'
+    print(f'🔄 Google Calendar → Supabase 동기화 시작 ({mode}): {room_names}\n')
     
-    total = 0
-    for room in rooms_to_sync:
+    def run(room):
+        # 연습실별 오류는 해당 연습실만 실패 처리
         try:
             print(f'  📥 {room["id"].upper()}홀 동기화 중...')
-            events = fetch_calendar_events(room['calendar_id'])
-            count = save_to_supabase(room['id'], events)
-            total += count
-            print(f'  ✅ {room["id"].upper()}홀: {count}개 이벤트')
+            result = {'count': sync_room(room, full=full, piggyback=piggyback)}
         except Exception as e:
             print(f'  ❌ {room["id"].upper()}홀 실패: {e}')
+            result = {'error': str(e)}
+        if progress:
+            progress(room['id'], result)
+        return room['id'], result
+    
+    from concurrent.futures import ThreadPoolExecutor
     
+    # 연습실별 fetch → save 파이프라인을 병렬 실행 (HTTP 세션은 공유)
+    workers = max(1, min(SYNC_MAX_WORKERS, len(rooms_to_sync)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(executor.map(run, rooms_to_sync))
+    
+    total = sum(r.get('count', 0) for r in results.values())
     print(f'\n✅ 동기화 완료! 총 {total}개 이벤트')
+    
+    if stats:
+        try:
+            built = stats_builder.refresh_current_month()
+            print(f'📊 통계 갱신: {", ".join(f"{y}-{m:02d}" for y, m in built)}')
+        except Exception as e:
+            print(f'⚠️  통계 갱신 실패: {e}')
+    
     print('\n💡 다음 단계: admin.html에서 "2️⃣ Watch 채널 재설정" 버튼을 눌러주세요.')
+    return results
+
+def print_status():
+    """연습실별 마지막 증분 동기화 시각 (로컬 상태 파일만 읽음)"""
+    state = load_sync_state()
+    print(f'📋 동기화 상태 ({SYNC_STATE_FILE})')
+    for room in ROOMS:
+        entry = state.get(room['id'])
+        if entry:
+            print(f"  ✅ {room['id'].upper()}홀: {entry.get('synced_at')} (sync token 있음)")
+            if entry.get('recurrence', 'server') != RECURRENCE_EXPANSION:
+                print(f"     🔁 반복 예약 펼치기 방식이 바뀜 ({entry.get('recurrence', 'server')} → {RECURRENCE_EXPANSION}), 다음 동기화는 전체")
+        else:
+            print(f"  ⚪ {room['id'].upper()}홀: sync token 없음 (다음 동기화는 전체)")
+        checkpoint = sync_coordinator.pending_checkpoint(SYNC_STATE_FILE, room['id'])
+        if checkpoint:
+            updated = datetime.fromtimestamp(checkpoint.get('updated_at', 0)).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"     ↩️  중단된 {checkpoint.get('mode')} 동기화: {checkpoint.get('pages')}페이지까지 ({updated}), 다음 실행에서 이어서")
 
 if __name__ == '__main__':
     # 명령줄 인자로 선택된 연습실 받기 (예: python sync_calendar.py a b c)
+    # --full: 저장된 sync token 무시하고 전체 동기화
+    # --prices: 바뀐 이벤트 가격(event_prices)까지 갱신
+    # --stats: 이번 달 통계(stats_cache) 갱신
+    # --status: 저장된 sync token 상태만 출력
+    # --json-log: 단계별 소요 시간 등을 JSON 한 줄 로그로 stderr 에 출력 (SYNC_LOG_FORMAT=json 과 같음)
     import sys
-    selected = sys.argv[1:] if len(sys.argv) > 1 else None
-    main(selected)
+    args = sys.argv[1:]
+    if '--json-log' in args:
+        os.environ['SYNC_LOG_FORMAT'] = 'json'
+    if '--status' in args:
+        print_status()
+        sys.exit(0)
+    full = '--full' in args
+    prices = '--prices' in args or os.environ.get('SYNC_MATERIALIZE_PRICES') == '1'
+    stats = '--stats' in args or os.environ.get('SYNC_REFRESH_STATS') == '1'
+    selected = [a for a in args if not a.startswith('--')] or None
+    main(selected, full=full, prices=prices, stats=stats)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+연습실별 동기화 조정 (프로세스 간 잠금 + 페이지 단위 체크포인트)
+
+- room_lock: 서버 worker, CLI, cron 이 같은 연습실을 동시에 동기화하지 않도록 파일 잠금(flock)
+  이미 누가 돌리고 있으면 끝날 때까지 기다렸다가, 그 실행이 요청 뒤에 시작했으면 결과를 그대로 쓴다 (piggyback)
+- SyncCheckpoint: 페이지를 DB 에 기록할 때마다 다음 pageToken 과 지금까지 본 이벤트 id 를 남겨,
+  타임아웃 등으로 죽은 실행을 처음부터가 아니라 멈춘 페이지부터 이어서 한다
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만
+    fcntl = None
+
+# 다른 실행이 끝나길 기다리는 최대 시간 (초)
+SYNC_LOCK_TIMEOUT = float(os.environ.get('SYNC_LOCK_TIMEOUT', '600'))
+LOCK_POLL_SECONDS = 0.2
+
+# 이보다 오래된 체크포인트는 버리고 처음부터 (pageToken 이 오래 유효하다는 보장이 없음)
+SYNC_CHECKPOINT_MAX_AGE = float(os.environ.get('SYNC_CHECKPOINT_MAX_AGE', '3600'))
+
+
+class SyncLockTimeout(Exception):
+    """다른 동기화가 SYNC_LOCK_TIMEOUT 안에 끝나지 않음"""
+
+    def __str__(self):
+        return f'{self.args[0].upper()}홀 동기화가 이미 진행 중입니다 ({SYNC_LOCK_TIMEOUT:.0f}초 대기 후 포기)'
+
+
+def state_dir(state_file, name):
+    """sync state 파일 옆 디렉터리 (.sync_state.json → .sync_state.json.<name>/)"""
+    path = f'{state_file}.{name}'
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path):
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+
+@contextmanager
+def room_lock(state_file, room_id, timeout=None):
+    """연습실 잠금. 바로 잡았으면 False, 다른 실행을 기다렸다 잡았으면 True 를 yield"""
+    timeout = SYNC_LOCK_TIMEOUT if timeout is None else timeout
+    path = os.path.join(state_dir(state_file, 'locks'), f'{room_id}.lock')
+    thread_lock = _thread_lock(path)
+    deadline = time.monotonic() + timeout
+    waited = not thread_lock.acquire(blocking=False)
+    if waited and not thread_lock.acquire(timeout=max(0, timeout)):
+        raise SyncLockTimeout(room_id)
+    try:
+        with open(path, 'a') as f:
+            if fcntl is not None:
+                while True:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        waited = True
+                        if time.monotonic() >= deadline:
+                            raise SyncLockTimeout(room_id)
+                        time.sleep(LOCK_POLL_SECONDS)
+            try:
+                yield waited
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        thread_lock.release()
+
+
+def pending_checkpoint(state_file, room_id):
+    """남아 있는 체크포인트 meta (상태 출력용, 없으면 None)"""
+    try:
+        with open(os.path.join(f'{state_file}.checkpoints', f'{room_id}.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class SyncCheckpoint:
+    """연습실 하나의 진행 중인 동기화 체크포인트
+
+    <room>.json  : mode, sync_token(증분 시작 토큰), page_token(다음에 받을 페이지), 갱신 시각
+    <room>.ids   : 기록이 끝난 페이지의 이벤트 id (페이지마다 한 줄씩 append, 전체 동기화 삭제 판단용)
+    page_end() 로 페이지 경계를 알리고, 그 페이지까지의 변경분을 DB 에 기록한 뒤 flushed() 를 부르면 저장된다.
+    """
+
+    def __init__(self, state_file, room_id, mode, sync_token=None):
+        directory = state_dir(state_file, 'checkpoints')
+        self.meta_path = os.path.join(directory, f'{room_id}.json')
+        self.ids_path = os.path.join(directory, f'{room_id}.ids')
+        self.room_id = room_id
+        self.mode = mode
+        self.sync_token = sync_token
+        self.page_token = None       # 이어서 받을 페이지 (None 이면 처음부터)
+        self.pages = 0               # 다 읽은 페이지 수 (이전 실행 포함)
+        self._boundary = None        # 아직 저장 안 한 마지막 페이지 경계 (다음 pageToken)
+        self._unsaved_ids = []       # 그 경계까지 읽은 이벤트 id 중 아직 저장 안 한 것
+
+    def resume(self):
+        """같은 모드/시작 토큰의 최근 체크포인트가 있으면 불러와 (page_token, 본 id 집합) 반환"""
+        try:
+            with open(self.meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.clear()   # meta 없이 남은 id 파일 정리
+            return None, set()
+        if (meta.get('mode') != self.mode or meta.get('sync_token') != self.sync_token
+                or time.time() - meta.get('updated_at', 0) > SYNC_CHECKPOINT_MAX_AGE
+                or not meta.get('page_token')):
+            self.clear()
+            return None, set()
+        seen = set()
+        try:
+            with open(self.ids_path, encoding='utf-8') as f:
+                for line in f:
+                    seen.update(json.loads(line))
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            # 마지막 줄이 쓰다 만 상태 → id 목록을 믿을 수 없으니 처음부터
+            self.clear()
+            return None, set()
+        self.page_token = meta['page_token']
+        self.pages = meta.get('pages', 0)
+        return self.page_token, seen
+
+    def page_end(self, next_page_token, ids=()):
+        """페이지 하나를 다 읽음 (아직 DB 기록 전일 수 있음, 저장은 flushed() 에서)"""
+        self._unsaved_ids.extend(ids)
+        if next_page_token:
+            self._boundary = next_page_token
+            self.pages += 1
+
+    def flushed(self):
+        """지금까지 읽은 페이지의 변경분이 모두 DB 에 기록됨 → 마지막 페이지 경계 저장"""
+        if self._boundary is None:
+            return
+        if self._unsaved_ids:
+            with open(self.ids_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self._unsaved_ids) + '\n')
+            self._unsaved_ids = []
+        meta = {
+            'mode': self.mode,
+            'sync_token': self.sync_token,
+            'page_token': self._boundary,
+            'pages': self.pages,
+            'updated_at': time.time(),
+        }
+        tmp_path = f'{self.meta_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+        self._boundary = None
+
+    def restart(self):
+        """체크포인트를 버리고 처음부터"""
+        self.clear()
+        self.page_token = None
+        self.pages = 0
+        self._boundary = None
+        self._unsaved_ids = []
+
+    def clear(self):
+        for path in (self.meta_path, self.ids_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+프로세스 내 동기화 작업 큐
+
+서버가 요청마다 sync_calendar.py 를 subprocess 로 띄우지 않고,
+백그라운드 worker 스레드에서 sync_calendar.main() 을 직접 실행한다.
+- submit() 은 바로 job 을 돌려주고, 진행 상황은 get(job_id) 로 조회
+- 아직 시작 전인 job 이 있으면 새 요청은 그 job 에 합쳐짐 (연습실은 합집합)
+  → 동시에 몇 번을 눌러도 실행 중 1개 + 대기 1개 이상 쌓이지 않음
+- 실행 중인 job 에는 합치지 않음: main 은 연습실을 병렬로 조회하므로 progress 에 없는 연습실도
+  이미 요청 전에 Google 을 읽었을 수 있음 (요청 뒤 시작한 실행만 재사용 → sync_calendar.sync_room)
+  다른 프로세스와의 연습실별 잠금은 sync_calendar.sync_room 이 담당 (sync_coordinator)
+- Google push 알림은 연습실별로 잠깐 모았다가 그 연습실만 증분 동기화 (WebhookDebouncer)
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+
+# 메모리에 남겨둘 완료된 job 수
+JOB_HISTORY = 50
+
+# 같은 연습실 알림을 모으는 시간 (초). 예약 하나 수정에도 알림이 여러 번 옴
+WEBHOOK_DEBOUNCE_SECONDS = float(os.environ.get('WEBHOOK_DEBOUNCE_SECONDS', '2'))
+
+# 서버 동기화 뒤에도 stats_cache 갱신 (sync_calendar.py --stats 와 같음, 이번 달은 변경분만 반영)
+SYNC_REFRESH_STATS = os.environ.get('SYNC_REFRESH_STATS') == '1'
+
+# sync_calendar 은 실제 실행 시점에만 import (환경변수 없이도 서버는 뜨도록)
+ALL_ROOMS = ('a', 'b', 'c', 'd', 'e')
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+class SyncJob:
+    """동기화 작업 하나 (상태: queued → running → done / failed)"""
+
+    def __init__(self, rooms, full=False, piggyback=True):
+        self.id = uuid.uuid4().hex[:12]
+        self.rooms = set(rooms)
+        self.full = full
+        # False 면 다른 프로세스(CLI/cron)가 돌리던 연습실 동기화 결과도 재사용하지 않음 (sync_calendar.sync_room)
+        self.piggyback = piggyback
+        self.status = 'queued'
+        self.requests = 1
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = {}
+        self.error = None
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    def merge(self, rooms, full, piggyback=True):
+        """대기 중인 job 에 같은 요청 합치기"""
+        with self.lock:
+            self.rooms |= set(rooms)
+            self.full = self.full or full
+            self.piggyback = self.piggyback and piggyback
+            self.requests += 1
+
+    def update(self, room_id, result):
+        """sync_calendar.main 의 progress 콜백"""
+        with self.lock:
+            self.progress[room_id] = result
+
+    @property
+    def success(self):
+        return self.status == 'done' and not any('error' in r for r in self.progress.values())
+
+    def output(self):
+        """사람이 읽을 요약 (이전 subprocess 응답의 output 대용)"""
+        lines = []
+        for room_id in sorted(self.progress):
+            result = self.progress[room_id]
+            if 'error' in result:
+                lines.append(f'❌ {room_id.upper()}홀 실패: {result["error"]}')
+            else:
+                lines.append(f'✅ {room_id.upper()}홀: {result["count"]}개 이벤트')
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'rooms': sorted(self.rooms),
+                'full': self.full,
+                'requests': self.requests,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'progress': dict(self.progress),
+                'completed_rooms': len(self.progress),
+                'total_rooms': len(self.rooms),
+                'success': self.success,
+                'output': self.output(),
+                'error': self.error,
+            }
+
+
+def _run_sync(job):
+    import sync_calendar
+    sync_calendar.main(sorted(job.rooms), full=job.full, progress=job.update, piggyback=job.piggyback,
+                       stats=SYNC_REFRESH_STATS)
+
+
+class SyncJobManager:
+    """동기화 job 큐 + worker 스레드 1개"""
+
+    def __init__(self, runner=_run_sync, history=JOB_HISTORY):
+        self.runner = runner
+        self.history = history
+        self.jobs = {}
+        self.pending = None
+        self.running = None
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._work, name='sync-worker', daemon=True)
+            self.worker.start()
+
+    def submit(self, rooms=None, full=False, piggyback=True):
+        """동기화 요청. 대기 중인 job 이 있으면 거기에 합치고, 없으면 새 job. 그 job 을 반환
+
+        piggyback=False 면 다른 프로세스가 돌리던 연습실 결과도 재사용하지 않음
+        (실행 시작 뒤 생긴 변경을 놓치면 안 되는 push 알림)
+        """
+        rooms = [r for r in (rooms or ALL_ROOMS) if r in ALL_ROOMS]
+        with self.lock:
+            if self.pending is not None:
+                self.pending.merge(rooms, full, piggyback)
+                return self.pending
+            job = SyncJob(rooms, full, piggyback)
+            self.jobs[job.id] = job
+            self.pending = job
+            self._trim()
+            self.queue.put(job)
+            self._ensure_worker()
+            return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _trim(self):
+        finished = [j for j in self.jobs.values() if j.done.is_set()]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job.id]
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                if self.pending is job:
+                    self.pending = None
+                self.running = job
+                job.status = 'running'
+                job.started_at = _now()
+            try:
+                self.runner(job)
+                job.status = 'done'
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+            finally:
+                with self.lock:
+                    self.running = None
+                job.finished_at = _now()
+                job.done.set()
+
+
+class WebhookDebouncer:
+    """연습실별 알림 모으기: 첫 알림 후 delay 초 뒤 그 연습실만 증분 동기화 job 1개 제출"""
+
+    def __init__(self, manager, delay=WEBHOOK_DEBOUNCE_SECONDS):
+        self.manager = manager
+        self.delay = delay
+        self.timers = {}     # room_id → 대기 중 Timer
+        self.counts = {}     # room_id → 모인 알림 수
+        self.lock = threading.Lock()
+
+    def notify(self, room_id):
+        """알림 1건 기록. 이번 묶음에 모인 알림 수 반환"""
+        with self.lock:
+            self.counts[room_id] = self.counts.get(room_id, 0) + 1
+            if room_id not in self.timers:
+                timer = threading.Timer(self.delay, self._fire, args=(room_id,))
+                timer.daemon = True
+                self.timers[room_id] = timer
+                timer.start()
+            return self.counts[room_id]
+
+    def _fire(self, room_id):
+        with self.lock:
+            self.timers.pop(room_id, None)
+            count = self.counts.pop(room_id, 0)
+        job = self.manager.submit([room_id], piggyback=False)
+        print(f'🔔 {room_id.upper()}홀 알림 {count}건 → 증분 동기화 job {job.id}')
+
+
+def handle_google_notification(channel_token, resource_state):
+    """Google Calendar push 알림 처리 (X-Goog-Channel-Token 은 reset_watch_channels 가 넣은 연습실 id)
+
+    Google 은 2xx 가 아니면 재전송하므로 무시하는 알림도 응답은 성공으로 돌려준다.
+    """
+    if resource_state == 'sync':
+        # 채널 등록 확인 메시지
+        return {'success': True, 'message': '채널 등록 확인'}
+    room_id = (channel_token or '').strip().lower()
+    if room_id not in ALL_ROOMS:
+        return {'success': False, 'message': f'알 수 없는 채널 토큰: {channel_token!r}'}
+    count = get_webhook_debouncer().notify(room_id)
+    return {'success': True, 'room': room_id, 'pending_notifications': count}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+_debouncer = None
+
+
+def get_sync_manager():
+    """프로세스 공용 SyncJobManager"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SyncJobManager()
+        return _manager
+
+
+def get_webhook_debouncer():
+    """프로세스 공용 WebhookDebouncer"""
+    global _debouncer
+    manager = get_sync_manager()
+    with _manager_lock:
+        if _debouncer is None:
+            _debouncer = WebhookDebouncer(manager)
+        return _debouncer
@@ -3,37 +3,33 @@
 간단한 동기화 서버 (Flask)
 """
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-import subprocess
-import sys
+
+from sync_jobs import get_sync_manager
 
 app = Flask(__name__)
 CORS(app)  # CORS 허용
 
 @app.route('/sync', methods=['POST', 'GET'])
 def sync():
-    """동기화 실행"""
-    try:
-        # Python 스크립트 실행
-        result = subprocess.run(
-            [sys.executable, 'sync_calendar.py'],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5분 타임아웃
-        )
-        
-        return jsonify({
-            'success': result.returncode == 0,
-            'output': result.stdout,
-            'error': result.stderr
-        })
-        
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    """동기화 시작 (백그라운드 실행, job id 반환)"""
+    data = request.get_json(silent=True) or {}
+    job = get_sync_manager().submit(data.get('rooms'), full=bool(data.get('full')))
+    
+    if data.get('wait'):
+        job.done.wait(timeout=300)
+        return jsonify(job.to_dict())
+    
+    return jsonify(dict(job.to_dict(), success=True)), 202
+
+@app.route('/sync/<job_id>', methods=['GET'])
+def sync_status(job_id):
+    """동기화 진행 상황"""
+    job = get_sync_manager().get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'job not found'}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/health', methods=['GET'])
 def health():
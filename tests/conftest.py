@@ -0,0 +1,33 @@
+"""
+공용 fixture: fake_services 를 띄우고 sync_calendar 가 그쪽을 보게 함 (네트워크 없음)
+"""
+
+import os
+
+# http_client 는 import 시점에 요청 속도 제한을 읽으므로 먼저 (로컬 가짜 서버라 제한 없음)
+os.environ.setdefault('HTTP_RATE_LIMIT', '0')
+
+import pytest
+
+import settings
+from fake_services import start_fake_services
+
+
+@pytest.fixture
+def fake(monkeypatch, tmp_path):
+    """FakeServices (연습실 캘린더/테이블은 비어 있음)"""
+    server, base_url = start_fake_services()
+    monkeypatch.setenv('GOOGLE_CALENDAR_API_KEY', 'test')
+    monkeypatch.setenv('GOOGLE_CALENDAR_API_URL', f'{base_url}/calendar/v3')
+    monkeypatch.setenv('SUPABASE_URL', base_url)
+    monkeypatch.setenv('SUPABASE_SERVICE_ROLE_KEY', 'test')
+    settings.reset_settings()
+
+    import sync_calendar
+    monkeypatch.setattr(sync_calendar, 'SYNC_STATE_FILE', str(tmp_path / 'sync_state.json'))
+    monkeypatch.setattr(sync_calendar, 'EVENT_SNAPSHOT', False)
+    import event_snapshot
+    monkeypatch.setattr(event_snapshot, 'EVENT_SNAPSHOT_DIR', str(tmp_path / 'snapshot'))
+    yield server.RequestHandlerClass.services
+    server.shutdown()
+    settings.reset_settings()
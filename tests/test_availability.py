@@ -0,0 +1,118 @@
+"""
+빈 시간 계산: 바쁜 구간 부분 재병합, 반복 예약 회차, 견적 가격 (user-019)
+"""
+
+import random
+from datetime import datetime
+
+import pytest
+
+import availability
+import price_policy
+from availability import AvailabilityIndex, BusyIntervals, merge_spans
+from week_index import KST, kst_iso
+
+ROOM = 'a'
+HOUR = 3600
+# 2025-06-02 (월) 0시 KST
+MONDAY = int(datetime(2025, 6, 2, tzinfo=KST).timestamp())
+
+
+def at(hour, day=0):
+    return MONDAY + int((day * 24 + hour) * HOUR)
+
+
+def record(event_id, start, end, room_id=ROOM):
+    return {'google_event_id': event_id, 'room_id': room_id, 'start_time': kst_iso(start), 'end_time': kst_iso(end)}
+
+
+def busy(intervals):
+    return list(zip(intervals.starts, intervals.ends))
+
+
+def test_adjacent_and_overlapping_bookings_are_merged_incrementally():
+    intervals = BusyIntervals()
+    intervals.put('x', (at(10), at(11)))
+    intervals.put('y', (at(11), at(12)))      # 맞닿음
+    intervals.put('z', (at(14), at(16)))
+    assert busy(intervals) == [(at(10), at(12)), (at(14), at(16))]
+
+    intervals.put('w', (at(11.5), at(14)))    # 두 구간을 이음
+    assert busy(intervals) == [(at(10), at(16))]
+
+    intervals.put('w', None)
+    assert busy(intervals) == [(at(10), at(12)), (at(14), at(16))]
+
+    intervals.put('x', (at(18), at(19)))      # 옮기면 원래 자리는 y 만 남음
+    assert busy(intervals) == [(at(11), at(12)), (at(14), at(16)), (at(18), at(19))]
+
+
+def test_incremental_remerge_matches_full_merge():
+    rng = random.Random(7)
+    intervals = BusyIntervals()
+    events = {}
+    for _ in range(1000):
+        event_id = f'e{rng.randrange(40)}'
+        if rng.random() < 0.25:
+            span = None
+            events.pop(event_id, None)
+        else:
+            # 30분 단위라 맞닿거나 겹치는 경우가 많음
+            start = at(rng.randrange(48) / 2)
+            span = events[event_id] = (start, start + rng.randrange(1, 8) * 1800)
+        intervals.put(event_id, span)
+        assert busy(intervals) == merge_spans(sorted(events.values()))
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = AvailabilityIndex([ROOM, 'b'])
+    index.load([
+        record('x', at(10), at(12)),
+        record('y', at(15), at(16)),
+        record('z', at(13), at(14), 'b'),
+        # 종일 이벤트는 예약으로 보지 않음
+        {'google_event_id': 'all-day', 'room_id': ROOM, 'start_time': '2025-06-02', 'end_time': '2025-06-03'},
+    ])
+    recurring = [record('r1', at(12), at(13)), record('r2', at(18), at(19)), record('r3', at(8), at(9.5), 'b')]
+    monkeypatch.setattr(availability.recurrence, 'window_instances', lambda start, end, room_ids=None: iter(recurring))
+    monkeypatch.setattr(availability, 'get_price_policy_service',
+                        lambda: price_policy.PricePolicyService(supabase_url='', supabase_key=''))
+    return index
+
+
+def test_free_slots_block_recurring_instances(index):
+    slots = index.free_slots(at(9), at(20), 2 * HOUR)
+
+    # a: 10-12 + 회차 12-13 (맞닿아 한 구간), 15-16, 회차 18-19
+    assert slots[ROOM] == [(at(13), at(15)), (at(16), at(18))]
+    # b: 회차 8-9:30 은 조회 시작 전부터 이어짐
+    assert slots['b'] == [(at(9.5), at(13)), (at(14), at(20))]
+
+
+def test_booking_change_reopens_slot(index):
+    index.apply(ROOM, [record('y', at(16), at(17))], ['x'])
+
+    assert index.free_slots(at(9), at(20), 2 * HOUR)[ROOM] == [(at(9), at(12)), (at(13), at(16))]
+
+
+def test_quote_uses_effective_policy(index):
+    # room a: 16시 이전 10000원, 16시 이후/주말·공휴일 13000원 (data/price_history.json)
+    assert availability.quote(ROOM, at(14), at(17)) == {
+        'start': kst_iso(at(14)), 'end': kst_iso(at(17)), 'price': 33000, 'priceType': '일반',
+    }
+    assert availability.quote(ROOM, at(16.5), at(18))['price'] == 19500
+    # 2025-06-06 (금) 현충일
+    holiday = availability.quote(ROOM, at(10, day=4), at(12, day=4))
+    assert (holiday['price'], holiday['priceType']) == (26000, '주말/공휴일')
+    assert availability.quote('zzz', at(10), at(12)) is None
+
+
+def test_availability_quotes_min_duration_from_slot_start(index):
+    result = index.availability(at(9), at(20), 90 * 60, [ROOM])[ROOM]
+
+    # 9-10, 19-20 은 90분보다 짧음
+    assert [(slot['start'], slot['minutes']) for slot in result] == [(kst_iso(at(13)), 120), (kst_iso(at(16)), 120)]
+    assert result[0]['quote']['start'] == kst_iso(at(13))
+    assert result[0]['quote']['end'] == kst_iso(at(14.5))
+    assert result[0]['quote']['price'] == 15000
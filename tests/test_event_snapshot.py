@@ -0,0 +1,71 @@
+"""
+RoomSnapshot close 시 memoryview 를 모두 놓고 mmap 을 닫는지, 잘린 파일은 다시 만드는지 (user-021)
+"""
+
+import os
+
+import pytest
+
+import event_snapshot
+
+RECORDS = [
+    {'google_event_id': f'e{i}', 'room_id': 'a', 'title': f'합주 {i}', 'description': None,
+     'start_time': f'2025-03-0{i + 1}T10:00:00+09:00', 'end_time': f'2025-03-0{i + 1}T12:00:00+09:00',
+     'updated_at': '2025-02-01T00:00:00+00:00'}
+    for i in range(5)
+]
+
+
+def test_close_releases_views(tmp_path):
+    event_snapshot.write_snapshot('a', [], sync_token='t', directory=str(tmp_path))
+    snapshot = event_snapshot.open_snapshot('a', str(tmp_path))
+    assert snapshot.sync_token == 't'
+
+    snapshot.close()
+    assert snapshot._mmap.closed
+    for view in (snapshot._view, snapshot.starts, snapshot._blob):
+        try:
+            view.tobytes()
+        except ValueError:
+            continue
+        raise AssertionError('memoryview 가 아직 살아 있음')
+
+
+def test_bad_format_is_skipped(tmp_path):
+    path = event_snapshot.snapshot_path('a', str(tmp_path))
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 4096)
+    assert event_snapshot.open_snapshot('a', str(tmp_path)) is None
+
+
+@pytest.fixture
+def written(tmp_path):
+    path = event_snapshot.write_snapshot('a', [event_snapshot.record_to_row(r) for r in RECORDS], 't', str(tmp_path))
+    return path, os.path.getsize(path)
+
+
+@pytest.mark.parametrize('keep', [0, 10, event_snapshot.HEADER.size, 100, -1])
+def test_truncated_file_is_skipped(tmp_path, written, keep):
+    # 빈 파일 (mmap ValueError), 헤더 중간 (struct.error), 헤더만, 열 중간, meta 마지막 바이트 없음
+    path, size = written
+    with open(path, 'r+b') as f:
+        f.truncate(keep if keep >= 0 else size + keep)
+
+    assert event_snapshot.open_snapshot('a', str(tmp_path)) is None
+
+
+def test_truncated_snapshot_is_rebuilt_on_commit(fake, tmp_path, written):
+    path, size = written
+    with open(path, 'r+b') as f:
+        f.truncate(size // 2)
+    fake.postgrest.table('booking_events').upsert(RECORDS, ['google_event_id'])
+
+    recorder = event_snapshot.SnapshotRecorder(str(tmp_path))
+    recorder.commit('a', previous_token='t', sync_token='t2')
+
+    snapshot = event_snapshot.open_snapshot('a', str(tmp_path))
+    try:
+        assert snapshot.sync_token == 't2'
+        assert sorted(snapshot.event_ids()) == [r['google_event_id'] for r in RECORDS]
+    finally:
+        snapshot.close()
@@ -0,0 +1,69 @@
+"""
+http_client 재시도: 429/5xx 는 backoff 후 다시, 4xx 는 바로 돌려줌 (user-004)
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import http_client
+import metrics
+import settings
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """재시도 대기 시간 (실제로 자지는 않음)"""
+    delays = []
+    clock = SimpleNamespace(sleep=delays.append, perf_counter=time.perf_counter, monotonic=time.monotonic)
+    monkeypatch.setattr(http_client, 'time', clock)
+    metrics.reset()
+    return delays
+
+
+@pytest.fixture
+def url(fake):
+    return f'{settings.get_settings().supabase_url}/rest/v1/booking_events'
+
+
+def retries(reason):
+    return sum(value for key, value in metrics.HTTP_RETRIES.values.items() if key[-1] == reason)
+
+
+def test_rate_limit_then_server_error_are_retried(fake, url, sleeps):
+    fake.fail_next.extend([(429, 3), (503, None)])
+
+    response = http_client.get(url)
+
+    assert response.status_code == 200
+    assert fake.requests[('supabase', 'GET booking_events')] == 1
+    assert (fake.requests[('fail', '429')], fake.requests[('fail', '503')]) == (1, 1)
+    # 429 는 Retry-After, 그다음은 full jitter (두 번째 시도: 0 ~ BACKOFF_BASE * 2)
+    assert sleeps[0] == 3
+    assert 0 <= sleeps[1] <= http_client.BACKOFF_BASE * 2
+    assert (retries('429'), retries('503')) == (1, 1)
+
+
+@pytest.mark.parametrize('status', [400, 401, 404, 409])
+def test_client_error_is_not_retried(fake, url, sleeps, status):
+    fake.fail_next.extend([(status, None), (503, None)])
+
+    response = http_client.get(url)
+
+    assert response.status_code == status
+    assert sleeps == []
+    assert fake.fail_next == [(503, None)]
+
+
+def test_gives_up_after_max_retries(fake, url, sleeps, monkeypatch):
+    monkeypatch.setattr(http_client, 'MAX_RETRIES', 3)
+    fake.fail_next.extend([(502, None)] * 5)
+
+    response = http_client.get(url)
+
+    assert response.status_code == 502
+    assert fake.requests[('fail', '502')] == 4
+    # 지수 backoff 상한: attempt 번째 대기는 BACKOFF_BASE * 2^attempt 이하
+    assert len(sleeps) == 3
+    assert all(0 <= delay <= http_client.BACKOFF_BASE * 2 ** attempt for attempt, delay in enumerate(sleeps))
@@ -0,0 +1,103 @@
+"""
+가격 엔진: 일괄 계산(NumPy / 대체 경로)과 예약 하나 계산이 같은지, 분 단위 요금 (user-005)
+"""
+
+import json
+import sys
+
+import pytest
+
+import price_engine
+import price_policy
+
+TARIFF = price_engine.Tariff(dawn=5000, before16=10000, after16=13000, weekend=13000, overnight=30000)
+
+BOOKINGS = [
+    ('2025-03-04T14:00:00+09:00', '2025-03-04T15:30:00+09:00'),   # 90분
+    ('2025-03-04T15:40:00+09:00', '2025-03-04T16:30:00+09:00'),   # 16시 걸침, 50분
+    ('2025-03-04T22:00:00+09:00', '2025-03-05T02:00:00+09:00'),   # 자정 넘김 (평일 → 새벽)
+    ('2025-06-05T22:00:00+09:00', '2025-06-06T08:00:00+09:00'),   # 목요일 밤 → 현충일
+    ('2025-03-08T10:00:00+09:00', '2025-03-08T13:20:00+09:00'),   # 토요일
+    ('2025-03-05T00:00:00+09:00', '2025-03-05T06:00:00+09:00'),   # 새벽 통대관
+]
+NAVER = [False, True, False, True, False, True]
+
+
+def epochs(bookings):
+    return ([price_engine.to_epoch(start) for start, _ in bookings],
+            [price_engine.to_epoch(end) for _, end in bookings])
+
+
+def scalar_prices(bookings, naver):
+    return [price_engine.price_booking(start, end, TARIFF, is_naver) for (start, end), is_naver in zip(bookings, naver)]
+
+
+@pytest.fixture(params=['numpy', 'fallback'])
+def batch_path(request, monkeypatch):
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setitem(sys.modules, 'numpy', None)   # import numpy → ImportError
+    return request.param
+
+
+def test_batch_matches_scalar(batch_path):
+    starts, ends = epochs(BOOKINGS)
+
+    assert price_engine.price_bookings_batch(starts, ends, TARIFF, NAVER) == scalar_prices(BOOKINGS, NAVER)
+    assert price_engine.price_bookings_batch(starts, ends, TARIFF) == scalar_prices(BOOKINGS, [False] * len(BOOKINGS))
+
+
+def test_gross_prices_by_band():
+    starts, ends = epochs(BOOKINGS)
+    gross = [price_engine.gross_price(start, end, TARIFF) for start, end in zip(starts, ends)]
+
+    # gross_price 는 소수점 6자리로 반올림
+    assert gross == pytest.approx([
+        15000,                      # 1.5시간 × 10000
+        9833.333333,                # 20분 × 10000 + 30분 × 13000
+        2 * 13000 + 2 * 5000,
+        2 * 13000 + 6 * 5000 + 2 * 13000,
+        13000 * 10 / 3,             # 3시간 20분
+        30000,
+    ])
+
+
+def test_per_minute_billing():
+    start, end = '2025-03-04T15:40:00+09:00', '2025-03-04T16:30:00+09:00'
+
+    assert price_engine.price_booking(start, end, TARIFF) == round(9833.333333 * price_engine.DIRECT_COMMISSION)
+    assert price_engine.price_booking(start, end, TARIFF, True) == round(9833.333333 * price_engine.NAVER_COMMISSION)
+    # 1분 늘면 16시 이후 요금 1분만큼
+    longer = price_engine.gross_price(price_engine.to_epoch(start), price_engine.to_epoch(end) + 60, TARIFF)
+    assert longer - 9833.333333 == pytest.approx(13000 / 60)
+
+
+@pytest.fixture
+def policy_service(tmp_path):
+    """3/31 까지와 4/1 부터 요금이 다른 연습실 a"""
+    base = {'room_id': 'a', 'price_weekday_after16': 13000, 'price_weekend': 13000,
+            'price_dawn_hourly': 5000, 'price_overnight': 30000}
+    rows = [
+        dict(base, id='old', effective_from='2020-01-01', effective_to='2025-03-31', price_weekday_before16=10000),
+        dict(base, id='new', effective_from='2025-04-01', effective_to=None, price_weekday_before16=12000),
+    ]
+    path = tmp_path / 'price_history.json'
+    path.write_text(json.dumps(rows), encoding='utf-8')
+    return price_policy.PricePolicyService(supabase_url='', supabase_key='', fixture_path=str(path))
+
+
+def test_policy_boundary_batch_matches_scalar(policy_service, batch_path):
+    bookings = [
+        ('2025-03-31T14:00:00+09:00', '2025-03-31T16:00:00+09:00'),
+        ('2025-03-31T23:00:00+09:00', '2025-04-01T01:00:00+09:00'),   # 시작일 정책
+        ('2025-04-01T14:00:00+09:00', '2025-04-01T16:00:00+09:00'),
+    ]
+    starts, ends = epochs(bookings)
+    naver = [False, True, False]
+
+    batch = policy_service.price_batch('a', starts, ends, naver)
+    assert batch == [policy_service.price_booking('a', start, end, is_naver)
+                     for (start, end), is_naver in zip(bookings, naver)]
+    assert batch[0] == round(20000 * price_engine.DIRECT_COMMISSION)
+    assert batch[2] == round(24000 * price_engine.DIRECT_COMMISSION)
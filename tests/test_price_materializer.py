@@ -0,0 +1,115 @@
+"""
+event_prices 갱신: fingerprint 가 바뀐 예약만 다시 계산 (user-008), 정책별 일괄 계산과 price 단계 계측 (user-017)
+"""
+
+import json
+
+import pytest
+
+import metrics
+import price_engine
+import price_materializer
+import price_policy
+
+
+def booking(event_id, day, start_hour, hours=2, room_id='a', description=''):
+    return {
+        'google_event_id': event_id,
+        'room_id': room_id,
+        'title': '합주',
+        'description': description,
+        'start_time': f'{day}T{start_hour:02d}:00:00+09:00',
+        'end_time': f'{day}T{start_hour + hours:02d}:00:00+09:00',
+        'updated_at': '2025-01-01T00:00:00+00:00',
+    }
+
+
+BOOKINGS = [
+    booking('e1', '2025-03-04', 14),
+    booking('e2', '2025-03-04', 17, description='네이버 예약번호: 12345'),
+    booking('e3', '2025-03-08', 10, hours=3),
+    booking('e4', '2025-03-05', 0, hours=6),
+]
+
+
+@pytest.fixture
+def service(fake, monkeypatch):
+    service = price_policy.PricePolicyService(supabase_url='', supabase_key='')
+    monkeypatch.setattr(price_materializer, 'get_price_policy_service', lambda: service)
+    fake.postgrest.table('booking_events').upsert(BOOKINGS, ['google_event_id'])
+    return service
+
+
+@pytest.fixture
+def materialized(fake, service):
+    """한 번 계산해 둔 뒤 요청 수 초기화"""
+    price_materializer.materialize_prices()
+    fake.reset_stats()
+    return fake
+
+
+def price_posts(fake):
+    return fake.requests[('supabase', 'POST event_prices')]
+
+
+def stored_prices(fake):
+    events = {row['id']: row['google_event_id'] for row in fake.postgrest.table('booking_events').rows.values()}
+    return {events[row['booking_event_id']]: row['calculated_price']
+            for row in fake.postgrest.table('event_prices').rows.values()}
+
+
+def test_batch_prices_match_scalar_and_are_timed(fake, service):
+    metrics.reset()
+
+    assert price_materializer.materialize_prices(room_ids=['a']) == (4, 4)
+
+    assert stored_prices(fake) == {
+        b['google_event_id']: service.price_booking('a', b['start_time'], b['end_time'], bool(b['description']))
+        for b in BOOKINGS
+    }
+    # 한 번의 일괄 계산 = price 단계 1회 (연습실 라벨 포함)
+    assert metrics.PHASE_SECONDS.values[('a', 'price')][-1] == 1
+
+
+def test_unchanged_events_are_not_upserted_again(materialized):
+    before = stored_prices(materialized)
+
+    assert price_materializer.materialize_prices() == (4, 0)
+    assert price_posts(materialized) == 0
+    assert stored_prices(materialized) == before
+
+
+def test_event_change_reprices_only_that_event(materialized):
+    moved = dict(BOOKINGS[0], end_time='2025-03-04T17:00:00+09:00')
+    materialized.postgrest.table('booking_events').upsert([moved], ['google_event_id'])
+
+    assert price_materializer.materialize_prices() == (4, 1)
+    assert price_posts(materialized) == 1
+    # 14-16시 10000원 + 16-17시 13000원
+    assert stored_prices(materialized)['e1'] == round(33000 * price_engine.DIRECT_COMMISSION)
+
+
+def test_policy_change_reprices_its_events(materialized, monkeypatch, tmp_path):
+    with open(price_policy.FIXTURE_PATH, encoding='utf-8') as f:
+        rows = json.load(f)
+    for row in rows:
+        if row['room_id'] == 'a':
+            row['price_weekday_before16'] = 20000
+    path = tmp_path / 'price_history.json'
+    path.write_text(json.dumps(rows), encoding='utf-8')
+    changed = price_policy.PricePolicyService(supabase_url='', supabase_key='', fixture_path=str(path))
+    monkeypatch.setattr(price_materializer, 'get_price_policy_service', lambda: changed)
+
+    assert price_materializer.materialize_prices() == (4, 4)
+    assert stored_prices(materialized)['e1'] == round(40000 * price_engine.DIRECT_COMMISSION)
+    assert price_materializer.materialize_prices() == (4, 0)
+
+
+def test_sync_changes_price_only_changed_records(materialized):
+    materialized.postgrest.table('booking_events').upsert([booking('e5', '2025-03-06', 14)], ['google_event_id'])
+
+    price_materializer.on_sync_changes('a', [booking('e5', '2025-03-06', 14)], [])
+
+    assert materialized.requests[('supabase', 'GET booking_events')] == 1
+    assert price_posts(materialized) == 1
+    assert set(stored_prices(materialized)) == {'e1', 'e2', 'e3', 'e4', 'e5'}
@@ -0,0 +1,65 @@
+"""
+price_history 캐시: Supabase 조회 실패 뒤 재시도와 updated_at 변경 감지 (user-006)
+"""
+
+import json
+
+import pytest
+
+import price_policy
+import settings
+
+ORDINAL = 739000    # 2024-04-24, 모든 정책의 effective_from 이후
+
+
+def fixture_rows(**changes):
+    with open(price_policy.FIXTURE_PATH, encoding='utf-8') as f:
+        rows = json.load(f)
+    rows[0].update(changes)
+    return rows
+
+
+@pytest.fixture
+def policies(fake):
+    fake.postgrest.table('price_history').upsert(fixture_rows(price_weekday_before16=20000), ['id'])
+    return fake.postgrest.table('price_history')
+
+
+def test_retries_supabase_after_failed_load(policies):
+    service = price_policy.PricePolicyService(check_interval=0)
+    fetch_rows = service._fetch_rows
+
+    def fail_once():
+        service._fetch_rows = fetch_rows
+        raise RuntimeError('supabase down')
+
+    service._fetch_rows = fail_once
+    assert service.policy_at('a', ORDINAL).tariff.before16 == 10000
+    assert service.source == 'fixture'
+
+    assert service.policy_at('a', ORDINAL).tariff.before16 == 20000
+    assert service.source == 'supabase'
+
+
+def test_reloads_when_updated_at_changes(policies):
+    service = price_policy.PricePolicyService(check_interval=0)
+    assert service.policy_at('a', ORDINAL).tariff.before16 == 20000
+
+    policies.upsert(fixture_rows(price_weekday_before16=25000, updated_at='2026-01-01T00:00:00+00:00')[:1], ['id'])
+    assert service.policy_at('a', ORDINAL).tariff.before16 == 25000
+
+
+@pytest.fixture
+def no_supabase(monkeypatch):
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_SERVICE_ROLE_KEY', raising=False)
+    settings.reset_settings()
+    yield
+    settings.reset_settings()
+
+
+def test_without_supabase_settings_uses_fixture(no_supabase):
+    service = price_policy.PricePolicyService(check_interval=0)
+    assert service.policy_at('a', ORDINAL).tariff.before16 == 10000
+    assert service.policy_at('a', ORDINAL).tariff.before16 == 10000
+    assert service.source == 'fixture'
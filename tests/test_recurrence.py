@@ -0,0 +1,120 @@
+"""
+반복 예약 로컬 펼치기 ↔ Google singleEvents=true 결과 (user-023)
+
+기대값은 Google 이 singleEvents=true 로 돌려주는 회차 id (<원본 id>_<UTC 시작>) 목록.
+모두 Asia/Seoul 19:00 (UTC 10:00) 시작, 2시간짜리 예약.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+import recurrence
+
+YEAR_START = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+YEAR_END = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    recurrence.clear_cache()
+    yield
+    recurrence.clear_cache()
+
+
+def master(lines, day, event_id='m'):
+    return {
+        'google_event_id': event_id,
+        'room_id': 'a',
+        'title': '정기 합주',
+        'start_time': f'{day}T19:00:00+09:00',
+        'end_time': f'{day}T21:00:00+09:00',
+        'time_zone': 'Asia/Seoul',
+        'recurrence': lines,
+    }
+
+
+def google_ids(event_id, days):
+    """singleEvents=true 회차 id (19:00 KST = 10:00Z)"""
+    return [f'{event_id}_{day.replace("-", "")}T100000Z' for day in days]
+
+
+def expand(lines, day):
+    series = recurrence.Series(master(lines, day))
+    return [record['google_event_id'] for _, record in series.instances(YEAR_START, YEAR_END)]
+
+
+def test_count():
+    assert expand(['RRULE:FREQ=WEEKLY;BYDAY=TU,TH;COUNT=5'], '2025-03-04') == google_ids(
+        'm', ['2025-03-04', '2025-03-06', '2025-03-11', '2025-03-13', '2025-03-18'])
+
+
+@pytest.mark.parametrize('until', ['20250309T100000Z', '20250309'])
+def test_until_is_inclusive(until):
+    # UTC 시각이든 날짜든 마지막 회차(3/9) 포함
+    assert expand([f'RRULE:FREQ=DAILY;INTERVAL=2;UNTIL={until}'], '2025-03-01') == google_ids(
+        'm', ['2025-03-01', '2025-03-03', '2025-03-05', '2025-03-07', '2025-03-09'])
+
+
+def test_last_friday_of_month():
+    assert expand(['RRULE:FREQ=MONTHLY;BYDAY=-1FR;COUNT=4'], '2025-01-31') == google_ids(
+        'm', ['2025-01-31', '2025-02-28', '2025-03-28', '2025-04-25'])
+
+
+def test_monthday_skips_short_months():
+    assert expand(['RRULE:FREQ=MONTHLY;BYMONTHDAY=31;COUNT=4'], '2025-01-31') == google_ids(
+        'm', ['2025-01-31', '2025-03-31', '2025-05-31', '2025-07-31'])
+
+
+@pytest.mark.parametrize('wkst, days', [
+    ('MO', ['2025-08-05', '2025-08-10', '2025-08-19', '2025-08-24']),
+    ('SU', ['2025-08-05', '2025-08-17', '2025-08-19', '2025-08-31']),
+])
+def test_biweekly_depends_on_wkst(wkst, days):
+    # RFC 5545 3.8.5.3 의 WKST 예시와 같은 요일 배치 (2025-08-05 화요일)
+    assert expand([f'RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=4;BYDAY=TU,SU;WKST={wkst}'], '2025-08-05') == google_ids('m', days)
+
+
+def test_exdate_still_counts_toward_count():
+    lines = ['RRULE:FREQ=WEEKLY;BYDAY=TU,TH;COUNT=5', 'EXDATE;TZID=Asia/Seoul:20250311T190000']
+    assert expand(lines, '2025-03-04') == google_ids('m', ['2025-03-04', '2025-03-06', '2025-03-13', '2025-03-18'])
+
+
+def test_moved_instance_matches_google():
+    # Google singleEvents=true: 3/13 회차는 같은 id 로 3/14 20:00 에 나옴
+    moved = {
+        'google_event_id': 'm_20250313T100000Z',
+        'room_id': 'a',
+        'title': '정기 합주',
+        'start_time': '2025-03-14T20:00:00+09:00',
+        'end_time': '2025-03-14T22:00:00+09:00',
+        'recurring_event_id': 'm',
+        'original_start_time': '2025-03-13T19:00:00+09:00',
+    }
+    google = [
+        ('m_20250304T100000Z', '2025-03-04T10:00:00+00:00'),
+        ('m_20250306T100000Z', '2025-03-06T10:00:00+00:00'),
+        ('m_20250311T100000Z', '2025-03-11T10:00:00+00:00'),
+        ('m_20250313T100000Z', '2025-03-14T11:00:00+00:00'),
+        ('m_20250318T100000Z', '2025-03-18T10:00:00+00:00'),
+    ]
+    store = recurrence.RecurringStore(['a'])
+    store.load([moved, master(['RRULE:FREQ=WEEKLY;BYDAY=TU,TH;COUNT=5'], '2025-03-04')])
+
+    # 바뀐 회차는 booking_events 에 보통 예약으로 들어가므로 합쳐서 비교
+    local = list(store.instances(YEAR_START, YEAR_END)) + [dict(moved, start_time='2025-03-14T11:00:00+00:00')]
+    local.sort(key=lambda record: record['start_time'])
+    assert [(record['google_event_id'], record['start_time']) for record in local] == google
+
+
+def test_expansion_is_cached_per_rule(monkeypatch):
+    monkeypatch.setattr(recurrence, 'RULE_CACHE_SIZE', 2)
+    lines = ['RRULE:FREQ=DAILY;COUNT=3']
+    first = recurrence.Series(master(lines, '2025-03-01', 'x'))
+    second = recurrence.Series(master(lines, '2025-03-01', 'y'))
+    list(first.instances(YEAR_START, YEAR_END))
+    assert recurrence._expansion(first) is recurrence._expansion(second)
+
+    for day in ('2025-04-01', '2025-05-01'):
+        list(recurrence.Series(master(lines, day)).instances(YEAR_START, YEAR_END))
+    assert first.key not in recurrence._expansions
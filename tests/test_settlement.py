@@ -0,0 +1,89 @@
+"""
+끝난 달 정산 캐시: 동기화로 그 달 예약이 바뀌면 무효화 (user-020)
+"""
+
+import json
+
+import pytest
+
+import price_policy
+import settlement
+import sync_calendar
+
+
+def booking(event_id, day, start_hour, room_id='a'):
+    return {
+        'google_event_id': event_id,
+        'room_id': room_id,
+        'title': '합주',
+        'description': '',
+        'start_time': f'{day}T{start_hour:02d}:00:00+09:00',
+        'end_time': f'{day}T{start_hour + 2:02d}:00:00+09:00',
+        'updated_at': '2025-01-01T00:00:00+00:00',
+    }
+
+
+BOOKINGS = [
+    booking('jan-1', '2025-01-10', 14),
+    booking('feb-1', '2025-02-11', 10),
+    booking('feb-2', '2025-02-20', 18, room_id='b'),
+]
+
+
+@pytest.fixture
+def cache(fake, monkeypatch, tmp_path):
+    """BOOKINGS 가 들어 있고 정산 캐시 무효화만 구독한 상태"""
+    monkeypatch.setattr(settlement, 'SETTLEMENT_CACHE_DIR', str(tmp_path / 'settlement'))
+    monkeypatch.setattr(sync_calendar, '_change_listeners', [])
+    monkeypatch.setattr(sync_calendar, '_before_change_listeners', [])
+    sync_calendar.add_before_change_listener(settlement.before_sync_changes)
+    sync_calendar.add_change_listener(settlement.on_sync_changes)
+    service = price_policy.PricePolicyService(supabase_url='', supabase_key='')
+    monkeypatch.setattr(settlement, 'get_price_policy_service', lambda: service)
+    fake.postgrest.table('booking_events').upsert(BOOKINGS, ['google_event_id'])
+    return fake
+
+
+def settle(year, month):
+    return json.loads(b''.join(settlement.settlement_chunks(year, month, 'json')))
+
+
+def test_cancellation_invalidates_closed_month(cache):
+    assert settle(2025, 2)['total']['bookings'] == 2
+    settle(2025, 1)
+    assert settlement.cached_months() == {(2025, 1), (2025, 2)}
+
+    sync_calendar.write_changes('b', [], ['feb-2'])
+
+    assert settlement.cached_months() == {(2025, 1)}
+    assert settle(2025, 2)['total']['bookings'] == 1
+
+
+def test_moved_booking_invalidates_both_months(cache):
+    settle(2025, 1)
+    settle(2025, 2)
+
+    # 1월 예약을 2월로 옮김: 원래 달은 기록 전에 조회해 둠
+    sync_calendar.write_changes('a', [booking('jan-1', '2025-02-25', 14)], [])
+
+    assert settlement.cached_months() == set()
+    assert settle(2025, 1)['total']['bookings'] == 0
+    assert settle(2025, 2)['total']['bookings'] == 3
+
+
+def test_no_lookup_without_cached_months(cache):
+    sync_calendar.write_changes('a', [booking('jan-1', '2025-01-10', 15)], [])
+
+    assert cache.requests[('supabase', 'GET booking_events')] == 0
+
+
+def test_result_invalidated_while_streaming_is_not_cached(cache):
+    chunks = settlement.settlement_chunks(2025, 2, 'csv')
+    first = next(chunks)
+    settlement.invalidate_months({(2025, 2)})
+    body = first + b''.join(chunks)
+
+    assert '합계'.encode() in body
+    assert settlement.cached_months() == set()
+    settle(2025, 2)
+    assert settlement.cached_months() == {(2025, 2)}
@@ -0,0 +1,130 @@
+"""
+월 통계: 동기화 변경분을 이번 달 누적 배열에 더하고 빼기, 바뀐 끝난 달 다시 계산 (user-009)
+"""
+
+from datetime import datetime
+
+import pytest
+
+import price_policy
+import stats_builder
+import sync_calendar
+from stats_builder import KST
+
+NOW = datetime(2025, 3, 15, 12, tzinfo=KST)
+
+
+def booking(event_id, day, start_hour, hours=2, room_id='a', description=''):
+    return {
+        'google_event_id': event_id,
+        'room_id': room_id,
+        'title': '합주',
+        'description': description,
+        'start_time': f'{day}T{start_hour:02d}:00:00+09:00',
+        'end_time': f'{day}T{start_hour + hours:02d}:00:00+09:00',
+        'updated_at': '2025-01-01T00:00:00+00:00',
+    }
+
+
+BOOKINGS = [
+    booking('jan-1', '2025-01-10', 14),
+    booking('feb-1', '2025-02-11', 10),
+    booking('feb-2', '2025-02-20', 18, room_id='b'),
+    booking('mar-1', '2025-03-04', 14),
+    booking('mar-2', '2025-03-05', 19, description='네이버 예약번호: 12345'),
+    booking('mar-3', '2025-03-08', 10, hours=3, room_id='c'),
+]
+
+
+@pytest.fixture
+def stats(fake, monkeypatch):
+    """booking_events 에 BOOKINGS 를 넣고 새로 구독한 MonthStats"""
+    for name in ('_change_listeners', '_before_change_listeners', '_recurring_listeners'):
+        monkeypatch.setattr(sync_calendar, name, [])
+    monkeypatch.setattr(stats_builder, '_month_stats', None)
+    service = price_policy.PricePolicyService(supabase_url='', supabase_key='')
+    monkeypatch.setattr(stats_builder, 'get_price_policy_service', lambda: service)
+    fake.postgrest.table('booking_events').upsert(BOOKINGS, ['google_event_id'])
+    return stats_builder.get_month_stats()
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """load_month 로 한 달을 훑은 (year, month) 목록"""
+    months = []
+    load_month = stats_builder.load_month
+
+    def spy(year, month):
+        months.append((year, month))
+        return load_month(year, month)
+
+    monkeypatch.setattr(stats_builder, 'load_month', spy)
+    return months
+
+
+def cached(fake, year, month):
+    """stats_cache 의 stat_type → data (generated_at 제외)"""
+    rows = fake.postgrest.table('stats_cache').rows.values()
+    return {
+        row['stat_type']: {key: value for key, value in row['data'].items() if key != 'generated_at'}
+        for row in rows if (row['year'], row['month']) == (year, month)
+    }
+
+
+def rebuilt(year, month, frozen):
+    built = stats_builder.build_month(year, month, frozen)
+    return {stat_type: {key: value for key, value in data.items() if key != 'generated_at'}
+            for stat_type, data in built.items()}
+
+
+def test_changes_update_current_month_without_rescanning(fake, stats, loads):
+    assert stats.refresh(NOW) == [(2025, 2), (2025, 3)]
+    assert cached(fake, 2025, 3)['monthly']['bookings'] == 3
+
+    sync_calendar.write_changes('a', [
+        booking('mar-1', '2025-03-04', 20, hours=3),     # 같은 달 안에서 옮김
+        booking('mar-4', '2025-03-10', 0, hours=6),      # 새 예약 (새벽통대관)
+    ], ['mar-2'])
+    sync_calendar.write_changes('c', [booking('mar-3', '2025-03-08', 10, hours=3, room_id='c')], [])
+
+    assert stats.refresh(NOW) == [(2025, 3)]
+    assert loads == [(2025, 2), (2025, 3)]
+    assert cached(fake, 2025, 3) == rebuilt(2025, 3, frozen=False)
+    room_a = cached(fake, 2025, 3)['room']['rooms']['a']
+    assert room_a['bookings'] == 2
+    assert set(room_a['byPriceType']) == {'새벽통대관', '저녁'}
+
+
+def test_unchanged_frozen_months_are_skipped(fake, stats, loads):
+    stats.refresh(NOW)
+    loads.clear()
+
+    assert stats.refresh(NOW) == [(2025, 3)]
+    assert loads == []
+
+
+def test_change_in_closed_month_rebuilds_it_frozen(fake, stats):
+    stats_builder.refresh_months([(2025, 1)], now=NOW)
+    stats.refresh(NOW)
+    assert cached(fake, 2025, 2)['monthly']['bookings'] == 2
+
+    # 지난달 예약 취소, 1월 예약을 3월로 옮김 (원래 달은 기록 전에 조회)
+    sync_calendar.write_changes('b', [], ['feb-2'])
+    sync_calendar.write_changes('a', [booking('jan-1', '2025-03-21', 14)], [])
+
+    assert stats.refresh(NOW) == [(2025, 1), (2025, 2), (2025, 3)]
+    for month, bookings in ((1, 0), (2, 1), (3, 4)):
+        assert cached(fake, 2025, month)['monthly']['bookings'] == bookings
+        assert cached(fake, 2025, month) == rebuilt(2025, month, frozen=month < 3)
+    assert cached(fake, 2025, 2)['monthly']['frozen'] is True
+
+
+def test_month_rollover_reloads_new_month(fake, stats, loads):
+    stats.refresh(NOW)
+    sync_calendar.write_changes('a', [booking('apr-1', '2025-04-02', 14)], [])
+
+    april = datetime(2025, 4, 1, 9, tzinfo=KST)
+    assert stats.refresh(april) == [(2025, 3), (2025, 4)]
+    assert loads[-2:] == [(2025, 3), (2025, 4)]
+    assert cached(fake, 2025, 3)['monthly']['frozen'] is True
+    assert cached(fake, 2025, 4)['monthly']['bookings'] == 1
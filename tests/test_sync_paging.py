@@ -0,0 +1,79 @@
+"""
+events.list 페이지 순회(nextPageToken)와 Supabase 스트리밍 기록 (user-003)
+"""
+
+import pytest
+
+import http_client
+import sync_calendar
+
+ROOM = sync_calendar.ROOMS[0]
+EVENT_COUNT = 6000     # maxResults=2500 → 3페이지
+
+
+@pytest.fixture
+def seeded(fake, monkeypatch):
+    fake.seed(ROOM['calendar_id'], ROOM['id'], EVENT_COUNT)
+    return fake
+
+
+@pytest.fixture
+def posts(monkeypatch):
+    """booking_events upsert 요청마다 보낸 행 수"""
+    sizes = []
+    original = http_client.post
+
+    def spy(url, **kwargs):
+        if '/rest/v1/booking_events' in url:
+            sizes.append(len(kwargs['json']))
+        return original(url, **kwargs)
+
+    monkeypatch.setattr(http_client, 'post', spy)
+    return sizes
+
+
+def test_iter_calendar_pages_follows_next_page_token(seeded):
+    pages = list(sync_calendar.iter_calendar_pages(ROOM['calendar_id']))
+
+    assert len(pages) == 3
+    assert seeded.requests[('google', 'events.list')] == 3
+    ids = [event['id'] for items, _, _ in pages for event in items]
+    assert len(ids) == len(set(ids)) == EVENT_COUNT
+    # nextPageToken 은 마지막 페이지 전까지만, nextSyncToken 은 마지막 페이지에만
+    assert [bool(next_page) for _, _, next_page in pages] == [True, True, False]
+    assert [bool(token) for _, token, _ in pages] == [False, False, True]
+
+
+def test_full_sync_upserts_every_event_in_batches(seeded, posts):
+    count = sync_calendar.sync_room(ROOM, full=True)
+
+    assert count == EVENT_COUNT
+    assert seeded.requests[('google', 'events.list')] == 3
+    assert len(seeded.postgrest.table('booking_events').rows) == EVENT_COUNT
+    assert sum(posts) == EVENT_COUNT
+    assert max(posts) <= sync_calendar.WRITE_BATCH_SIZE
+    assert len(posts) >= EVENT_COUNT // sync_calendar.WRITE_BATCH_SIZE
+
+
+def test_sync_token_comes_from_last_page(seeded):
+    calendar = seeded.calendar(ROOM['calendar_id'])
+    sync_calendar.sync_room(ROOM, full=True)
+
+    entry = sync_calendar.load_sync_state()[ROOM['id']]
+    assert entry['sync_token'] == f'seq-{calendar.seq}'
+    assert entry['mode'] == 'full'
+
+
+def test_incremental_sync_applies_changes_after_full(seeded, posts):
+    sync_calendar.sync_room(ROOM, full=True)
+    seeded.mutate(ROOM['calendar_id'], ROOM['id'], updated=30, deleted=10, added=5)
+    del posts[:]
+
+    sync_calendar.sync_room(ROOM)
+
+    calendar = seeded.calendar(ROOM['calendar_id'])
+    stored = {row['google_event_id'] for row in seeded.postgrest.table('booking_events').rows.values()}
+    assert stored == {event['id'] for event in calendar.active()}
+    assert sum(posts) == 35
+    assert sync_calendar.load_sync_state()[ROOM['id']]['mode'] == 'incremental'
+
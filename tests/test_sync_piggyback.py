@@ -0,0 +1,117 @@
+"""
+연습실 잠금을 기다린 동기화가 다른 실행 결과를 재사용하는 조건 (user-018)
+"""
+
+import threading
+import time
+
+import pytest
+
+import sync_calendar
+import sync_coordinator
+from sync_jobs import SyncJobManager
+
+ROOM = sync_calendar.ROOMS[0]
+
+
+@pytest.fixture
+def synced(fake, monkeypatch):
+    fake.seed(ROOM['calendar_id'], ROOM['id'], 20)
+    sync_calendar.sync_room(ROOM, full=True)
+    return fake
+
+
+def stored_ids(fake):
+    return {row['google_event_id'] for row in fake.postgrest.table('booking_events').rows.values()}
+
+
+def sync_behind_other_run(fake, other_started_late, **kwargs):
+    """다른 실행이 잠금을 잡고 있는 동안 예약을 추가하고 sync_room 을 요청
+
+    other_started_late 면 그 실행이 요청 뒤에 시작한 것처럼, 아니면 요청 전에 시작한 것처럼 상태를 남김
+    """
+    locked, requested = threading.Event(), threading.Event()
+    entry = sync_calendar.load_sync_state()[ROOM['id']]
+
+    def other_run():
+        with sync_coordinator.room_lock(sync_calendar.SYNC_STATE_FILE, ROOM['id']):
+            started_at = time.time()
+            locked.set()
+            requested.wait(5)
+            if other_started_late:
+                started_at = time.time()
+            sync_calendar.save_sync_token(ROOM['id'], entry['sync_token'], mode='incremental', count=0,
+                                          recurrence=sync_calendar.RECURRENCE_EXPANSION, started_at=started_at)
+
+    holder = threading.Thread(target=other_run)
+    holder.start()
+    locked.wait(5)
+    fake.mutate(ROOM['calendar_id'], ROOM['id'], added=3)
+    waiter = threading.Thread(target=sync_calendar.sync_room, args=(ROOM,), kwargs=kwargs)
+    waiter.start()
+    time.sleep(0.3)     # waiter 가 요청 시각을 찍고 잠금을 기다리는 중
+    requested.set()
+    holder.join()
+    waiter.join()
+
+
+def test_run_started_before_request_is_not_reused(synced):
+    sync_behind_other_run(synced, other_started_late=False)
+
+    assert stored_ids(synced) == {e['id'] for e in synced.calendar(ROOM['calendar_id']).active()}
+
+
+def test_run_started_after_request_is_reused(synced):
+    before = stored_ids(synced)
+    sync_behind_other_run(synced, other_started_late=True)
+
+    assert stored_ids(synced) == before
+
+
+def test_piggyback_false_always_syncs(synced):
+    sync_behind_other_run(synced, other_started_late=True, piggyback=False)
+
+    assert stored_ids(synced) == {e['id'] for e in synced.calendar(ROOM['calendar_id']).active()}
+
+
+def test_job_opt_out_survives_merge():
+    release = threading.Event()
+    seen = []
+
+    def runner(job):
+        release.wait(5)
+        seen.append((sorted(job.rooms), job.piggyback))
+
+    manager = SyncJobManager(runner=runner)
+    first = manager.submit(['a'])
+    while manager.running is None:
+        time.sleep(0.01)
+    queued = manager.submit(['b'], piggyback=False)
+    assert manager.submit(['c']) is queued
+    release.set()
+    queued.done.wait(5)
+
+    assert first.piggyback and not queued.piggyback
+    assert seen == [(['a'], True), (['b', 'c'], False)]
+
+
+def test_request_during_run_gets_its_own_job():
+    # 실행 중인 job 은 progress 에 없는 연습실도 이미 Google 을 읽었을 수 있으므로 합치지 않음
+    release = threading.Event()
+    seen = []
+
+    def runner(job):
+        release.wait(5)
+        seen.append(sorted(job.rooms))
+
+    manager = SyncJobManager(runner=runner)
+    first = manager.submit(['a', 'b'])
+    while manager.running is None:
+        time.sleep(0.01)
+    second = manager.submit(['b'])
+    assert second is not first
+    assert first.requests == 1
+    release.set()
+    second.done.wait(5)
+
+    assert seen == [['a', 'b'], ['b']]
@@ -0,0 +1,65 @@
+"""
+Watch 채널 갱신 시 이전 채널 정지 실패 → 상태에 남겨 두고 재시도 (user-014)
+"""
+
+import time
+
+import pytest
+
+import watch_channels
+
+ROOM = watch_channels.ROOMS[0]
+
+
+@pytest.fixture
+def state_file(fake, monkeypatch, tmp_path):
+    path = tmp_path / 'watch_state.json'
+    monkeypatch.setattr(watch_channels, 'WATCH_STATE_FILE', str(path))
+    # 서비스 계정 없이 돌도록 유효한 access token 을 미리 넣어 둠
+    watch_channels.save_state({'channels': {}, 'credentials': {'token': 't', 'expires_at': int(time.time()) + 3600}})
+    return path
+
+
+def renew():
+    return watch_channels.manage_watch_channels([ROOM['id']], force=True)
+
+
+def test_failed_stop_is_kept_and_retried(fake, state_file):
+    renew()
+    old = watch_channels.load_state()['channels'][ROOM['id']]
+
+    fake.stop_failures = 1
+    assert renew()[ROOM['id']] == 'renewed'
+    state = watch_channels.load_state()
+    [stopping] = state['stopping']
+    assert stopping['channel_id'] == old['channel_id']
+    assert stopping['room_id'] == ROOM['id']
+    assert stopping['stop_attempts'] == 1
+    assert old['channel_id'] in fake.channels
+
+    # 다음 실행(갱신할 채널이 없어도)에서 다시 정지
+    watch_channels.manage_watch_channels([ROOM['id']])
+    assert watch_channels.load_state()['stopping'] == []
+    assert old['channel_id'] not in fake.channels
+
+
+def test_retry_failure_counts_attempts(fake, state_file):
+    renew()
+    fake.stop_failures = 2
+    renew()
+    watch_channels.manage_watch_channels([ROOM['id']])
+    [stopping] = watch_channels.load_state()['stopping']
+    assert stopping['stop_attempts'] == 2
+    assert 'HTTP 403' in stopping['stop_error']
+
+
+def test_expired_stopping_channel_is_dropped(fake, state_file):
+    state = watch_channels.load_state()
+    state['stopping'] = [{'channel_id': 'old', 'resource_id': 'r', 'room_id': ROOM['id'],
+                          'expiration': int((time.time() - 60) * 1000), 'stop_attempts': 3}]
+    watch_channels.save_state(state)
+    fake.stop_failures = 1
+
+    renew()
+    assert watch_channels.load_state()['stopping'] == []
+    assert fake.stop_failures == 1     # 만료된 채널은 정지 요청도 안 보냄
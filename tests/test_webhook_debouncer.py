@@ -0,0 +1,76 @@
+"""
+Google 알림 모으기: 연습실별로 delay 뒤 증분 동기화 job 1개 (user-013)
+"""
+
+import threading
+import time
+
+import pytest
+
+import sync_jobs
+from sync_jobs import WebhookDebouncer
+
+DELAY = 0.2
+
+
+class RecordingManager:
+    """submit 호출만 기록하는 SyncJobManager 대역"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def submit(self, rooms, full=False, piggyback=True):
+        with self.lock:
+            self.calls.append((list(rooms), full, piggyback, time.monotonic()))
+        return sync_jobs.SyncJob(rooms, full=full, piggyback=piggyback)
+
+
+@pytest.fixture
+def manager():
+    return RecordingManager()
+
+
+def wait_calls(manager, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(manager.calls) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 늦게 오는 submit 이 더 없는지 한 번 더 기다림
+    time.sleep(DELAY * 2)
+    return manager.calls
+
+
+def test_burst_for_one_room_submits_once_after_delay(manager):
+    debouncer = WebhookDebouncer(manager, delay=DELAY)
+    started = time.monotonic()
+
+    counts = [debouncer.notify('a') for _ in range(5)]
+
+    assert counts == [1, 2, 3, 4, 5]
+    assert not manager.calls
+    calls = wait_calls(manager, 1)
+    assert [call[:3] for call in calls] == [(['a'], False, False)]
+    assert calls[0][3] - started >= DELAY
+    assert debouncer.timers == {} and debouncer.counts == {}
+
+
+def test_rooms_are_debounced_separately(manager):
+    debouncer = WebhookDebouncer(manager, delay=DELAY)
+
+    debouncer.notify('a')
+    debouncer.notify('b')
+    debouncer.notify('a')
+
+    calls = wait_calls(manager, 2)
+    assert sorted(call[0][0] for call in calls) == ['a', 'b']
+    assert all(call[2] is False for call in calls)
+
+
+def test_notification_after_fire_starts_new_batch(manager):
+    debouncer = WebhookDebouncer(manager, delay=DELAY)
+
+    debouncer.notify('a')
+    wait_calls(manager, 1)
+    assert debouncer.notify('a') == 1
+
+    assert [call[0] for call in wait_calls(manager, 2)] == [['a'], ['a']]
@@ -0,0 +1,62 @@
+"""
+주간 인덱스 적재와 변경 알림 구독 (user-012)
+"""
+
+import pytest
+
+import sync_calendar
+import week_index
+
+ROOM = sync_calendar.ROOMS[0]
+
+
+@pytest.fixture
+def synced(fake, monkeypatch):
+    monkeypatch.setattr(sync_calendar, '_change_listeners', [])
+    monkeypatch.setattr(week_index._live, 'index', None)
+    fake.seed(ROOM['calendar_id'], ROOM['id'], 50)
+    sync_calendar.sync_room(ROOM, full=True)
+    return fake
+
+
+def week_ids(start_time):
+    _, _, events = week_index.get_week_index().week_events(start_time, [ROOM['id']])
+    return {event['id'] for event in events[ROOM['id']]}
+
+
+def test_failed_load_does_not_register_listener_twice(synced, monkeypatch):
+    original = sync_calendar.fetch_rows
+    calls = []
+
+    def flaky(table, params):
+        calls.append(table)
+        if len(calls) == 1:
+            raise RuntimeError('Supabase 일시 장애')
+        return original(table, params)
+
+    monkeypatch.setattr(sync_calendar, 'fetch_rows', flaky)
+    with pytest.raises(RuntimeError):
+        week_index.get_week_index()
+    assert week_index.get_week_index() is not None
+
+    assert sync_calendar._change_listeners.count(week_index._live.on_changes) == 1
+
+
+def test_changes_during_load_are_replayed(synced, monkeypatch):
+    rows = list(synced.postgrest.table('booking_events').rows.values())
+    removed = rows[0]
+    added = dict(rows[1], google_event_id='late-event', start_time='2025-06-02T10:00:00+09:00',
+                 end_time='2025-06-02T12:00:00+09:00')
+    added.pop('id', None)
+    original = sync_calendar.fetch_rows
+
+    def racing(table, params):
+        # 조회한 결과를 돌려주기 전에 동기화가 변경을 기록 (적재 결과는 그 이전 상태)
+        stale = list(original(table, params))
+        sync_calendar.write_changes(ROOM['id'], [added], [removed['google_event_id']])
+        return stale
+
+    monkeypatch.setattr(sync_calendar, 'fetch_rows', racing)
+
+    assert 'late-event' in week_ids('2025-06-02')
+    assert removed['google_event_id'] not in week_ids(removed['start_time'])
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Google Calendar Watch 채널 관리
+
+연습실별 채널 상태(channel_id, resource_id, expiration, 등록 주소)를 로컬 파일에 저장해 두고
+- 만료가 가까운 채널(또는 없거나 주소가 바뀐 채널)만 새로 등록 (여러 연습실은 병렬)
+- 새 채널이 등록되면 이전 채널은 channels/stop 으로 정지 → 중복 알림 방지
+  정지에 실패한 채널은 상태 파일의 stopping 목록에 남겨 두고 다음 실행마다 다시 정지 (성공하거나 만료되면 뺌)
+- OAuth access token 도 만료 전까지 저장해 두고 재사용 (갱신할 채널이 없으면 인증도 안 함)
+
+사용법:
+  python3 watch_channels.py              # 필요한 채널만 갱신
+  python3 watch_channels.py --dry-run    # 상태만 출력
+  python3 watch_channels.py --force a    # 선택한 연습실 강제 재등록
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import timezone
+
+import http_client
+import metrics
+from settings import get_settings
+from sync_calendar import ROOMS
+
+WATCH_STATE_FILE = os.environ.get(
+    'WATCH_STATE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.watch_channels.json')
+)
+
+# 만료까지 이 시간(초)보다 적게 남은 채널은 갱신
+WATCH_RENEW_BEFORE = int(os.environ.get('WATCH_RENEW_BEFORE', str(24 * 3600)))
+
+WATCH_MAX_WORKERS = 5
+
+DEFAULT_WEBHOOK_URL = 'https://xn--xy1b23ggrmm5bfb82ees967e.com/.netlify/functions/google-webhook'
+
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+# 이 시간(초) 안에 만료되는 access token 은 쓰지 않음
+TOKEN_MARGIN = 300
+
+_state_lock = threading.Lock()
+
+
+def webhook_url():
+    return os.environ.get('WEBHOOK_URL', DEFAULT_WEBHOOK_URL)
+
+
+def load_state():
+    try:
+        with open(WATCH_STATE_FILE, encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        state = {}
+    state.setdefault('channels', {})
+    return state
+
+
+def save_state(state):
+    """임시 파일 → rename (access token 이 들어 있으므로 본인만 읽기 가능)"""
+    with _state_lock:
+        tmp_path = WATCH_STATE_FILE + '.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, WATCH_STATE_FILE)
+
+
+def access_token(state):
+    """저장된 access token 이 아직 유효하면 재사용, 아니면 서비스 계정으로 새로 발급"""
+    cached = state.get('credentials') or {}
+    if cached.get('token') and cached.get('expires_at', 0) - TOKEN_MARGIN > time.time():
+        return cached['token']
+
+    service_account_json = os.environ.get('GOOGLE_SERVICE_ACCOUNT_JSON')
+    if not service_account_json:
+        raise RuntimeError('GOOGLE_SERVICE_ACCOUNT_JSON 환경 변수 없음')
+
+    from google.oauth2 import service_account
+    from google.auth.transport.requests import Request
+
+    creds = service_account.Credentials.from_service_account_info(
+        json.loads(service_account_json), scopes=SCOPES
+    )
+    creds.refresh(Request())
+    # creds.expiry 는 timezone 없는 UTC datetime
+    expires_at = creds.expiry.replace(tzinfo=timezone.utc).timestamp() if creds.expiry else time.time() + 3000
+    state['credentials'] = {'token': creds.token, 'expires_at': int(expires_at)}
+    return creds.token
+
+
+def channel_status(channel, now=None, address=None):
+    """'ok' / 'expiring' / 'expired' / 'missing' / 'moved' (등록 주소가 바뀜)"""
+    if not channel:
+        return 'missing'
+    now = now or time.time()
+    remaining = channel['expiration'] / 1000 - now
+    if remaining <= 0:
+        return 'expired'
+    if channel.get('address') != (address or webhook_url()):
+        return 'moved'
+    if remaining < WATCH_RENEW_BEFORE:
+        return 'expiring'
+    return 'ok'
+
+
+def register_channel(room, token):
+    """새 Watch 채널 등록 → 저장할 채널 정보"""
+    channel_id = str(uuid.uuid4())
+    address = webhook_url()
+    with metrics.timed('watch_register', room['id']):
+        response = http_client.post(
+            f"{get_settings().google_calendar_api_url}/calendars/{room['calendar_id']}/events/watch",
+            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+            params={'key': get_settings().google_api_key},
+            json={'id': channel_id, 'type': 'web_hook', 'address': address, 'token': room['id']},
+        )
+    if response.status_code != 200:
+        raise Exception(f'HTTP {response.status_code}: {response.text}')
+    data = response.json()
+    return {
+        'channel_id': channel_id,
+        'resource_id': data['resourceId'],
+        'expiration': int(data['expiration']),
+        'address': address,
+        'registered_at': int(time.time()),
+    }
+
+
+def stop_channel(channel, token, room_id=''):
+    """채널 정지 (이미 없어진 채널이면 성공으로 간주)"""
+    with metrics.timed('watch_stop', room_id):
+        response = http_client.post(
+            f'{get_settings().google_calendar_api_url}/channels/stop',
+            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'},
+            json={'id': channel['channel_id'], 'resourceId': channel['resource_id']},
+        )
+    if response.status_code not in (200, 204, 404):
+        raise Exception(f'HTTP {response.status_code}: {response.text}')
+
+
+def is_expired(channel, now=None):
+    return channel['expiration'] / 1000 <= (now or time.time())
+
+
+def retry_stops(state, token):
+    """정지에 실패해 남겨둔 이전 채널 다시 정지. 성공했거나 이미 만료된 채널은 목록에서 뺌"""
+    remaining = []
+    for channel in state.get('stopping', []):
+        room_id = channel.get('room_id', '')
+        if is_expired(channel):
+            continue
+        try:
+            stop_channel(channel, token, room_id)
+            print(f'  🧹 {room_id.upper()}홀 이전 채널 정지 완료 (재시도 {channel.get("stop_attempts", 0)}회 후)')
+        except Exception as e:
+            print(f'  ⚠️  {room_id.upper()}홀 이전 채널 정지 재시도 실패: {e}')
+            remaining.append(dict(channel, stop_error=str(e), stop_attempts=channel.get('stop_attempts', 0) + 1))
+    state['stopping'] = remaining
+
+
+def renew_room(room, old_channel, token):
+    """새 채널 등록 후 이전 채널 정지. (새 채널, 정지 실패 메시지 또는 None)"""
+    channel = register_channel(room, token)
+    stop_error = None
+    if old_channel and channel_status(old_channel) != 'expired':
+        try:
+            stop_channel(old_channel, token, room['id'])
+        except Exception as e:
+            stop_error = str(e)
+    return channel, stop_error
+
+
+def format_expiration(channel):
+    if not channel:
+        return '-'
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(channel['expiration'] / 1000))
+
+
+def manage_watch_channels(selected_rooms=None, force=False, dry_run=False):
+    """필요한 채널만 갱신. 연습실별 결과 {room_id: 상태 또는 'renewed' / 'error: ...'} 반환"""
+    state = load_state()
+    channels = state['channels']
+    rooms = ROOMS if not selected_rooms else [r for r in ROOMS if r['id'] in selected_rooms]
+    now = time.time()
+
+    statuses = {room['id']: channel_status(channels.get(room['id']), now) for room in rooms}
+    targets = [room for room in rooms if force or statuses[room['id']] != 'ok']
+    # 정지 재시도는 선택한 연습실과 상관없이 (만료된 채널은 Google 이 알아서 정리하므로 제외)
+    stopping = [channel for channel in state.get('stopping', []) if not is_expired(channel, now)]
+
+    print(f'🔔 Watch 채널 상태 (주소: {webhook_url()})')
+    for room in rooms:
+        room_id = room['id']
+        mark = '🔄' if room in targets else '✅'
+        print(f'  {mark} {room_id.upper()}홀: {statuses[room_id]} (만료 {format_expiration(channels.get(room_id))})')
+    for channel in stopping:
+        print(f"  🧹 {channel.get('room_id', '').upper()}홀 이전 채널 정지 대기 "
+              f"(실패 {channel.get('stop_attempts', 0)}회, 만료 {format_expiration(channel)}): {channel.get('stop_error')}")
+
+    if dry_run or not (targets or stopping):
+        if not targets:
+            print('✅ 갱신할 채널 없음')
+        if not dry_run and state.get('stopping'):
+            # 만료된 정지 대기 채널만 남아 있던 경우
+            state['stopping'] = []
+            save_state(state)
+        return statuses
+
+    from concurrent.futures import ThreadPoolExecutor
+    
+    token = access_token(state)
+    results = dict(statuses)
+    retry_stops(state, token)
+
+    def run(room):
+        try:
+            return room['id'], renew_room(room, channels.get(room['id']), token), None
+        except Exception as e:
+            return room['id'], None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(WATCH_MAX_WORKERS, len(targets)))) as executor:
+        for room_id, renewed, error in executor.map(run, targets):
+            if error:
+                print(f'  ❌ {room_id.upper()}홀 Watch 등록 실패: {error}')
+                results[room_id] = f'error: {error}'
+                continue
+            channel, stop_error = renewed
+            old_channel = channels.get(room_id)
+            channels[room_id] = channel
+            results[room_id] = 'renewed'
+            print(f'  ✅ {room_id.upper()}홀 Watch 등록 완료 (만료 {format_expiration(channel)})')
+            if stop_error:
+                # 상태에서 지우면 다시는 정지할 수 없으므로 남겨뒀다가 다음 실행에서 재시도
+                print(f'  ⚠️  {room_id.upper()}홀 이전 채널 정지 실패 (다음 실행에서 재시도): {stop_error}')
+                state.setdefault('stopping', []).append(
+                    dict(old_channel, room_id=room_id, stop_error=stop_error, stop_attempts=1))
+
+    save_state(state)
+    return results
+
+
+if __name__ == '__main__':
+    import sys
+    args = sys.argv[1:]
+    selected = [a for a in args if not a.startswith('--')] or None
+    manage_watch_channels(selected, force='--force' in args, dry_run='--dry-run' in args)
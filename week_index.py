@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+주간 예약 조회용 메모리 인덱스 (GET /api/week-events)
+
+연습실별로 예약을 (시작 시각, id) 정렬 배열 + id → (시작, 끝, 응답) 으로 들고 있다가
+주간 범위와 겹치는 예약만 bisect 로 잘라 돌려준다. Google / Supabase 호출 없음.
+- 처음 조회할 때 booking_events 에서 한 번 채우고, 이후에는
+  sync_calendar 변경 알림(write_changes)으로 바뀐 예약만 반영
+- 응답은 (연습실, ISO 주) 단위로 캐시, 연습실에 변경이 오면 그 연습실 캐시만 비움
+- RECURRENCE_EXPANSION=local 이면 반복 예약은 인덱스에 없고, 캐시를 채울 때 그 주 회차만 recurrence 에서 펼쳐 합침
+"""
+
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta, timezone
+
+import price_engine
+import recurrence
+import sync_calendar
+
+KST = timezone(timedelta(hours=9))
+WEEK_SECONDS = 7 * price_engine.DAY_SECONDS
+
+INDEX_COLUMNS = 'google_event_id,room_id,title,description,start_time,end_time'
+
+
+def week_start(value):
+    """ISO 시간/날짜 문자열 → 그 시각이 속한 주 월요일 0시(KST) epoch 초"""
+    if len(value) == 10:
+        # 날짜만 오면 KST 날짜로 해석
+        day = date.fromisoformat(value)
+    else:
+        day = datetime.fromtimestamp(price_engine.to_epoch(value), KST).date()
+    monday = day - timedelta(days=day.weekday())
+    return int(datetime(monday.year, monday.month, monday.day, tzinfo=KST).timestamp())
+
+
+def kst_iso(epoch):
+    return datetime.fromtimestamp(epoch, KST).isoformat()
+
+
+def event_entry(room_id, record):
+    """booking_events 레코드 → (시작, 끝, 응답용 dict), 종일 이벤트(날짜만 있는 경우)는 None"""
+    start_time = record.get('start_time') or ''
+    end_time = record.get('end_time') or ''
+    if 'T' not in start_time:
+        return None
+    start = price_engine.to_epoch(start_time)
+    end = price_engine.to_epoch(end_time) if 'T' in end_time else start
+    return start, end, {
+        'id': record['google_event_id'],
+        'title': record.get('title') or '(제목 없음)',
+        'start': kst_iso(start),
+        'end': kst_iso(end),
+        'description': record.get('description') or None,
+        'roomId': room_id,
+    }
+
+
+class RoomIndex:
+    """한 연습실의 예약 구간 (시작 시각 정렬, 같은 시각은 id 순)"""
+
+    def __init__(self):
+        self.keys = []        # (start, google_event_id) 정렬
+        self.events = {}      # google_event_id → (start, end, 응답용 dict)
+        self.max_length = 0   # 가장 긴 예약 길이 (겹침 탐색 범위)
+
+    def remove(self, event_id):
+        old = self.events.pop(event_id, None)
+        if old is None:
+            return
+        key = (old[0], event_id)
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def put(self, room_id, record, keep_sorted=True):
+        """booking_events 레코드 반영 (기존 예약이면 교체)
+
+        keep_sorted=False 면 keys 끝에 붙이기만 함 (일괄 적재 후 sort_keys 호출)
+        """
+        event_id = record.get('google_event_id')
+        if not event_id:
+            return
+        self.remove(event_id)
+        entry = event_entry(room_id, record)
+        # 종일 이벤트는 주간 화면에 표시하지 않음
+        if entry is None:
+            return
+        start, end, _ = entry
+        self.events[event_id] = entry
+        if keep_sorted:
+            insort(self.keys, (start, event_id))
+        else:
+            self.keys.append((start, event_id))
+        self.max_length = max(self.max_length, end - start)
+
+    def sort_keys(self):
+        self.keys = sorted((start, event_id) for event_id, (start, _, _) in self.events.items())
+
+    def overlapping(self, start, end, recurring=()):
+        """[start, end) 와 겹치는 예약 (시작 시각 순), recurring: 그 기간 반복 예약 회차 레코드"""
+        lo = bisect_left(self.keys, (start - self.max_length,))
+        hi = bisect_left(self.keys, (end,))
+        result = []
+        for _, event_id in self.keys[lo:hi]:
+            event_start, event_end, event = self.events[event_id]
+            if event_end > start or event_start >= start:
+                result.append((event_start, event_id, event))
+        for record in recurring:
+            entry = event_entry(record['room_id'], record)
+            if entry is not None:
+                result.append((entry[0], record['google_event_id'], entry[2]))
+        if recurring:
+            result.sort(key=lambda item: item[:2])
+        return [event for _, _, event in result]
+
+
+class WeekEventsIndex:
+    """연습실별 RoomIndex + (연습실, 주) 응답 캐시"""
+
+    def __init__(self, room_ids):
+        self.rooms = {room_id: RoomIndex() for room_id in room_ids}
+        self.cache = {}   # (room_id, 주 시작 epoch) → 예약 목록
+        self.lock = threading.Lock()
+
+    def load(self, rows):
+        """booking_events 전체로 인덱스 채우기"""
+        with self.lock:
+            for row in rows:
+                room = self.rooms.get(row.get('room_id'))
+                if room is not None:
+                    room.put(row['room_id'], row, keep_sorted=False)
+            for room in self.rooms.values():
+                room.sort_keys()
+            self.cache.clear()
+
+    def apply(self, room_id, records=(), deleted_ids=()):
+        """동기화 변경분 반영 후 해당 연습실 캐시 무효화"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            return
+        with self.lock:
+            for event_id in deleted_ids:
+                room.remove(event_id)
+            for record in records:
+                room.put(room_id, record)
+            self._drop_room_cache(room_id)
+
+    def invalidate(self, room_id):
+        """해당 연습실 캐시만 비우기 (반복 예약 변경)"""
+        with self.lock:
+            self._drop_room_cache(room_id)
+
+    def _drop_room_cache(self, room_id):
+        # self.lock 을 잡은 상태에서 호출
+        for key in [k for k in self.cache if k[0] == room_id]:
+            del self.cache[key]
+
+    def week_events(self, start, room_ids=None):
+        """start 가 속한 주(월~일, KST)의 연습실별 예약"""
+        first = week_start(start)
+        store = recurrence.get_recurring_store()
+        events = {}
+        with self.lock:
+            for room_id in room_ids or self.rooms:
+                room = self.rooms.get(room_id)
+                if room is None:
+                    continue
+                key = (room_id, first)
+                cached = self.cache.get(key)
+                if cached is None:
+                    recurring = list(store.instances(first, first + WEEK_SECONDS, [room_id])) if store else ()
+                    cached = self.cache[key] = room.overlapping(first, first + WEEK_SECONDS, recurring)
+                events[room_id] = cached
+        return first, first + WEEK_SECONDS, events
+
+
+def _load():
+    # 반복 예약 저장소가 먼저 구독해야 저장소가 갱신된 뒤에 주간 캐시가 비워짐
+    recurrence.get_recurring_store()
+    index = WeekEventsIndex([room['id'] for room in sync_calendar.ROOMS])
+    index.load(sync_calendar.fetch_rows('booking_events', {'select': INDEX_COLUMNS, 'order': 'id'}))
+    return index
+
+
+def _on_recurring_changes(index, room_id, records, deleted_ids):
+    """반복 예약 변경 → 그 연습실 주간 캐시만 비움 (회차는 다음 조회 때 다시 펼침)"""
+    index.invalidate(room_id)
+
+
+_live = sync_calendar.LiveIndex(_load, WeekEventsIndex.apply, _on_recurring_changes)
+
+
+def get_week_index():
+    """프로세스 공용 WeekEventsIndex (처음 호출 시 booking_events 에서 채우고 변경 알림 구독)"""
+    return _live.get()